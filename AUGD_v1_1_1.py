@@ -1,35 +1,1617 @@
 import sys
 import os
+import atexit
+import gzip
+import shutil
+import re
+import json
+import math
+import shlex
+import time
+import heapq
+import sqlite3
+import signal
 import logging
-from logging.handlers import RotatingFileHandler
+import asyncio
+import argparse
+import threading
+import queue
+import http.client
+import multiprocessing
+import concurrent.futures
+from collections import deque
+from urllib.parse import quote, urlsplit
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QPushButton,
-    QLabel, QWidget, QHBoxLayout, QStatusBar
+    QLabel, QWidget, QHBoxLayout, QStatusBar, QLineEdit, QPlainTextEdit
 )
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
-from PyQt5.QtCore import QUrl, pyqtSlot
-from datetime import datetime
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from PyQt5.QtWebChannel import QWebChannel
+from PyQt5.QtCore import QUrl, QObject, QFile, QIODevice, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QPainter, QColor
+from datetime import datetime, timedelta
 
 # Set up the logging folder and file paths
 log_folder = os.path.join(os.path.expanduser("~"), "Documents", "AUGD Logs")
 os.makedirs(log_folder, exist_ok=True)  # Create the log folder if it doesn't exist
 log_file_path = os.path.join(log_folder, "automation_log.txt")  # Path to the log file
+action_log_path = os.path.join(log_folder, "actions.jsonl")  # Structured action log (structured_log setting)
+log_index_path = os.path.join(log_folder, "log_segments.json")  # Which rotated segment covers which run
 
-# Configure log rotation: 5MB per file, 2 backups
-log_handler = RotatingFileHandler(
-    log_file_path, maxBytes=5 * 1024 * 1024, backupCount=2
-)
-logging.basicConfig(
-    handlers=[log_handler],
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
-logging.info("Application started with detailed logging.")
+# Log records are written to disk by a background thread. Callers (the GUI
+# thread included) only put them on a bounded queue and never wait on file I/O.
+log_queue_size = 10000
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue. A record repeating the previous one
+    (same level and message) is only counted, and the count is logged once a
+    different record arrives. When the queue is full, JavaScript console
+    messages below WARNING are dropped and counted, and console warnings and
+    errors wait up to a second for room. Every other record (run lines, audit
+    lines such as deleted groups, structured actions, run markers) waits for
+    room however long it takes.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.deduplicated = 0
+        self.last_key = None
+        self.repeats = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if not hasattr(record, "console"):
+                self.queue.put(record)
+                return
+            if record.levelno < logging.WARNING:
+                self.dropped += 1
+                return
+            try:
+                self.queue.put(record, timeout=1)
+            except queue.Full:
+                self.dropped += 1
+
+    def emit(self, record):
+        if hasattr(record, "action"):
+            super().emit(record)  # Structured records are never collapsed
+            return
+        key = None if hasattr(record, "run_marker") else (record.levelno, record.getMessage())
+        if key is not None and key == self.last_key:
+            self.repeats += 1
+            self.deduplicated += 1
+            return
+        if self.repeats:
+            repeated = logging.makeLogRecord({
+                "name": record.name, "levelno": logging.INFO, "levelname": "INFO",
+                "msg": f"Previous message repeated {self.repeats} more times",
+            })
+            super().emit(repeated)
+        self.last_key = key  # A run marker ends the run of repeats
+        self.repeats = 0
+        super().emit(record)
+
+    def counts(self):
+        """Records dropped because the queue was full, and repeats collapsed."""
+        return {"dropped": self.dropped, "deduplicated": self.deduplicated}
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that only flushes once the log queue is drained, so
+    a burst of records is written with one flush instead of one per record."""
+    def __init__(self, filename, log_queue, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.log_queue = log_queue
+
+    def flush(self):
+        if self.log_queue.empty():
+            super().flush()
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a structured action record as one JSON object per line."""
+    def format(self, record):
+        time_text = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        return json.dumps({"time": time_text, **record.action}, ensure_ascii=False)
+
+def log_action(action):
+    """Queue a structured record (a dict of JSON values) for the action log."""
+    logging.info(action.get("event", "action"), extra={"action": action})
+
+class LogSegmentIndex:
+    """
+    Index of rotated log segments (log_segments.json): for each segment its
+    log, file, time span, size and the runs it covers, plus the runs in each
+    log's current file. Segments are gzip-compressed on a background thread,
+    after which the retention policy drops the oldest ones beyond the age
+    limit or the disk budget.
+    """
+    def __init__(self, path=log_index_path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.retention_days = 0
+        self.max_total_bytes = 0
+        self.compressor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-compressor")
+        try:
+            with open(path, "r") as index_file:
+                self.data = json.load(index_file)
+        except (OSError, ValueError):
+            self.data = {"segments": [], "current": {}}
+
+    def save(self):
+        """Write the index atomically. Call with the lock held."""
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w") as index_file:
+            json.dump(self.data, index_file, indent=2)
+        os.replace(temporary_path, self.path)
+
+    def set_current(self, log_name, started, runs):
+        """Record the start time and runs of a log's current file."""
+        with self.lock:
+            self.data["current"][log_name] = {"start": started, "runs": sorted(runs)}
+            self.save()
+
+    def add_segment(self, log_name, path, started, runs):
+        """Index a closed segment and compress it in the background."""
+        with self.lock:
+            self.data["segments"].append({
+                "log": log_name, "file": os.path.basename(path), "start": started,
+                "end": datetime.now().isoformat(timespec="seconds"), "runs": sorted(runs),
+                "bytes": os.path.getsize(path), "compressed": False,
+            })
+            self.save()
+        try:
+            self.compressor.submit(self.compress, path)
+        except RuntimeError:
+            pass  # Shutting down; the segment stays uncompressed and indexed
+
+
+    def compress(self, path):
+        """Gzip a closed segment, then apply the retention policy."""
+        try:
+            with open(path, "rb") as source, gzip.open(path + ".gz", "wb", compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.remove(path)
+        except OSError as error:
+            print(f"Could not compress log segment {path}: {error}", file=sys.stderr)
+            return
+        with self.lock:
+            for segment in self.data["segments"]:
+                if segment["file"] == os.path.basename(path):
+                    segment.update(file=segment["file"] + ".gz", bytes=os.path.getsize(path + ".gz"), compressed=True)
+            self.save()
+        self.apply_retention()
+
+    def apply_retention(self):
+        """Delete segments older than retention_days, then the oldest ones beyond the disk budget."""
+        with self.lock:
+            folder = os.path.dirname(self.path)
+            segments = sorted(self.data["segments"], key=lambda segment: segment["end"])
+            cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat(timespec="seconds")
+            total = sum(segment["bytes"] for segment in segments)
+            kept = []
+            for segment in segments:
+                expired = self.retention_days and segment["end"] < cutoff
+                over_budget = self.max_total_bytes and total > self.max_total_bytes
+                if segment["compressed"] and (expired or over_budget):
+                    try:
+                        os.remove(os.path.join(folder, segment["file"]))
+                    except FileNotFoundError:
+                        pass
+                    total -= segment["bytes"]
+                else:
+                    kept.append(segment)
+            if len(kept) != len(self.data["segments"]):
+                self.data["segments"] = kept
+                self.save()
+
+    def close(self):
+        """Wait for pending compressions."""
+        self.compressor.shutdown(wait=True)
+
+class SegmentedLogHandler(BatchedRotatingFileHandler):
+    """
+    Log file handler that starts a new segment when the file reaches
+    maxBytes and, with per_run set, whenever a run starts. A closed segment
+    is renamed with its start time and handed to the segment index, so no
+    earlier segment is ever overwritten. Rotation stays off (maxBytes 0)
+    until configure_log_rotation is called. Only the main process has these
+    handlers; worker processes send it their records. Runs start and finish through marker records on
+    the log queue, so every record queued before a marker is written to the
+    segment that was current when it was logged.
+    """
+    def __init__(self, filename, log_queue, index, **kwargs):
+        super().__init__(filename, log_queue, maxBytes=0, delay=True, **kwargs)  # Opened on the first record
+        self.index = index
+        self.per_run = False
+        self.active_runs = set()
+        self.segment_runs = set()
+        self.segment_started = datetime.now().isoformat(timespec="milliseconds")
+        current = index.data["current"].get(os.path.basename(self.baseFilename))
+        if current and os.path.exists(self.baseFilename):
+            # Carry on the segment left by the previous session
+            self.segment_runs = set(current["runs"])
+            self.segment_started = current["start"]
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            stem, extension = os.path.splitext(self.baseFilename)
+            closed_path = f"{stem}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}{extension}"
+            os.replace(self.baseFilename, closed_path)
+            self.index.add_segment(os.path.basename(self.baseFilename), closed_path, self.segment_started, self.segment_runs)
+        self.segment_started = datetime.now().isoformat(timespec="milliseconds")  # Identifies the segment
+        self.segment_runs = set(self.active_runs)
+        self.index.set_current(os.path.basename(self.baseFilename), self.segment_started, self.segment_runs)
+        if not self.delay:
+            self.stream = self._open()
+
+    def handle(self, record):
+        marker = getattr(record, "run_marker", None)
+        if marker is None:
+            return super().handle(record)
+        event, run_id = marker  # Applied in queue order and never written
+        if event == "start":
+            self.start_run(run_id)
+        else:
+            self.finish_run(run_id)
+        return False
+
+    def start_run(self, run_id):
+        """Note a run starting; with per_run set it gets a fresh segment."""
+        self.acquire()  # The listener thread may be writing
+        try:
+            self.active_runs.add(run_id)
+            if self.per_run:
+                self.doRollover()
+            else:
+                self.segment_runs.add(run_id)
+                self.index.set_current(os.path.basename(self.baseFilename), self.segment_started, self.segment_runs)
+        finally:
+            self.release()
+
+    def finish_run(self, run_id):
+        """Note a run ending; later segments no longer cover it."""
+        self.acquire()
+        try:
+            self.active_runs.discard(run_id)
+        finally:
+            self.release()
+
+# The log files, opened by setup_logging
+log_record_queue = log_segment_index = log_handler = action_log_handler = log_queue_handler = log_listener = None
+
+def setup_logging():
+    """
+    Open the log files and start writing queued records to them. Called from
+    main(), so only the main process has them: a spawned worker imports this
+    module too, and its records go to the parent through work_queue_worker
+    instead. Rotation is set up by configure_log_rotation.
+    """
+    global log_record_queue, log_segment_index, log_handler, action_log_handler, log_queue_handler, log_listener
+    log_record_queue = queue.Queue(maxsize=log_queue_size)
+    log_segment_index = LogSegmentIndex()
+    log_handler = SegmentedLogHandler(log_file_path, log_record_queue, log_segment_index)
+    log_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    log_handler.addFilter(lambda record: not hasattr(record, "action"))
+    # Structured records go to their own JSON-lines file
+    action_log_handler = SegmentedLogHandler(action_log_path, log_record_queue, log_segment_index, encoding="utf-8")
+    action_log_handler.setFormatter(JsonLinesFormatter())
+    action_log_handler.addFilter(lambda record: hasattr(record, "action"))
+    log_queue_handler = DroppingQueueHandler(log_record_queue)
+    log_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # log_handler adds the time and level
+    logging.basicConfig(handlers=[log_queue_handler], level=logging.INFO, force=True)
+    log_listener = QueueListener(log_record_queue, log_handler, action_log_handler)
+    log_listener.start()
+    atexit.register(log_segment_index.close)  # Runs last: finish compressing closed segments
+    atexit.register(log_listener.stop)  # Write out whatever is still queued
+    logging.info("Application started with detailed logging.")
+
+def configure_log_rotation(settings):
+    """Apply the log_rotation settings to the log files (main process only)."""
+    for handler in (log_handler, action_log_handler):
+        handler.acquire()
+        try:
+            handler.maxBytes = int(settings["max_mb"] * 1024 * 1024)
+            handler.per_run = settings["per_run"]
+        finally:
+            handler.release()
+    log_segment_index.retention_days = settings["retention_days"]
+    log_segment_index.max_total_bytes = int(settings["max_total_mb"] * 1024 * 1024)
+    log_segment_index.compressor.submit(log_segment_index.apply_retention)
+
+def queue_run_marker(event, run_id):
+    """Queue a run start or finish behind the records already waiting to be written."""
+    log_queue_handler.handle(logging.makeLogRecord({
+        "name": "augd.runs", "levelno": logging.INFO, "levelname": "INFO",
+        "msg": f"Run {run_id} {event}", "run_marker": (event, run_id),
+    }))
+
+def start_run_logs(run_id):
+    """Tell the log files a run started, for per-run segments and the index."""
+    queue_run_marker("start", run_id)
+
+def finish_run_logs(run_id):
+    """Tell the log files a run ended."""
+    queue_run_marker("finish", run_id)
+
+# Set up the data folder for settings and saved run state
+data_folder = os.path.join(os.path.expanduser("~"), "Documents", "AUGD Data")
+os.makedirs(data_folder, exist_ok=True)  # Create the data folder if it doesn't exist
+settings_file_path = os.path.join(data_folder, "settings.json")  # Optional user overrides
+
+# Default automation settings; any key in settings.json overrides these
+default_settings = {
+    "start_url": "https://cp.hivepbx.com",
+    # Await "network quiet + DOM settled" instead of sleeping for fixed delays
+    "wait_for_network_idle": True,
+    "network_quiet_ms": 150,    # No request in flight for this long
+    "dom_quiet_ms": 100,        # No DOM mutation for this long
+    "settle_timeout_ms": 10000,  # Give up and use the fallback delay after this
+    # Long-poll and streaming requests never end, so a request stops holding
+    # up a settle once it has been in flight this long. Requests whose URL
+    # contains one of settle_ignore_urls never hold it up.
+    "settle_request_cap_ms": 3000,
+    "settle_ignore_urls": [],
+    # Fixed delays used when idle detection is disabled or times out
+    "fallback_delays_ms": {
+        "navigation": 75,
+        "before_company_change": 500,
+        "after_company_change": 1000,
+    },
+    # Learn step delays and timeouts from observed timings instead of the fixed values
+    "adaptive_latency": True,
+    "latency": {
+        "window": 50,                # Rolling samples kept per step
+        "min_samples": 5,            # Use the fixed value until a step has this many samples
+        "delay_percentile": 90,
+        "delay_margin": 1.25,
+        "delay_ceiling_factor": 4,   # A learned delay never exceeds this multiple of the fixed one
+        "min_delay_ms": 10,
+        "timeout_percentile": 99,
+        "timeout_margin": 3,
+        "min_timeout_ms": 1000,      # Learned timeouts never go below the fixed one or this
+        "max_timeout_ms": 60000,
+    },
+    # Times a spinner that outlasts its timeout is waited for again before the
+    # script carries on anyway; a slow spinner never ends the run
+    "spinner_retries": 2,
+    "page_pool_size": 1,  # Pages processing companies side by side; 1 uses only the visible page
+    # A pool page that has not loaded and answered its health check within
+    # this long counts as unhealthy and is reloaded
+    "pool_health_timeout_ms": 30000,
+    # "production" removes the script's per-group console.log lines before
+    # injection and logs one summary per company (counts and step timings)
+    # instead of a line per inspected group. log_detail_company (a company
+    # value or name) keeps full detail for that one company.
+    "log_verbosity": "full",
+    "log_detail_company": "",
+    # Log files start a new segment at max_mb and, with per_run, for every run.
+    # Closed segments are gzip-compressed and listed in log_segments.json;
+    # segments older than retention_days, or the oldest beyond max_total_mb
+    # on disk, are deleted (0 turns either limit off)
+    "log_rotation": {
+        "max_mb": 20,
+        "per_run": True,
+        "retention_days": 180,
+        "max_total_mb": 2000,
+    },
+    # Write every action (company, group, wait and pause steps, requests) with
+    # its run id, duration and outcome to actions.jsonl in the log folder
+    "structured_log": False,
+    # Scan every company first (read-only, no group panels opened), then
+    # visit only the companies with planned deletions. With
+    # visit_everyone_companies set, every kept 'everyone' group is topped up:
+    # during the inventory visit in the UI, or with direct requests in the
+    # execute phase in API mode. Turning it off skips those top-ups unless the
+    # company is visited anyway. Company cache hits are never topped up.
+    "two_phase": {
+        "enabled": True,
+        "visit_everyone_companies": True,
+    },
+    # Events from the script are sent to Python in batches of this size,
+    # or after this many milliseconds, whichever comes first
+    "bridge_batch_size": 50,
+    "bridge_flush_ms": 250,
+    # "dom" clicks through the UI; "api" learns the page's own endpoints from
+    # the first UI actions and then replays them with concurrent fetch calls
+    # "http" runs the cleanup from Python with the learned endpoints and the
+    # browser session's cookies; the page is then only used for login
+    "execution_mode": "dom",
+    "api_concurrency": 4,
+    # Once the listing endpoint is known, companies processed one at a time
+    # have the listings of this many following companies requested ahead
+    "prefetch_depth": 2,
+    # Endpoint templates that skip learning, e.g.
+    # {"delete": {"method": "POST", "url": "https://.../groups/{group}/delete", "body": null, "headers": {}}}
+    "api_endpoints": {},
+    # Field names tried, in order, when reading API responses
+    "api_fields": {
+        "id": ["id", "group_id", "groupId", "ID"],
+        "name": ["name", "group_name", "groupName", "title"],
+        "members": ["member_count", "members_count", "memberCount", "members"],
+        "user_id": ["id", "user_id", "userId", "ID"],
+    },
+    "http_engine": {
+        "request_concurrency": 16,  # Requests in flight across all companies
+        "company_concurrency": 8,   # Companies processed at the same time
+    },
+    # Worker processes for "http" runs; above 1, companies are shared out
+    # through a durable work queue and each worker runs its own HTTP engine
+    "work_queue": {
+        "workers": 1,
+        "max_attempts": 3,  # Attempts per company, the first one included; it is given up after crashing that many workers
+    },
+    # Only process companies whose value or name is in include (when not
+    # empty), and never those in exclude; names are compared case-insensitively
+    "company_filter": {
+        "include": [],
+        "exclude": [],
+    },
+    # Skip companies whose groups are unchanged since a run last checked
+    # them in full and left them compliant. A skipped company is not topped
+    # up and does not renew its entry, so entries older than max_age_days
+    # are dropped and every company is fully checked again that often.
+    "company_cache": {
+        "enabled": True,
+        "max_age_days": 14,
+    },
+    # Lean mode drops requests the automation never needs while a run is in
+    # progress. A request is blocked if its type is in block_types, or its URL
+    # contains a block_urls entry, unless its URL contains an allow_urls entry.
+    # Page loads and XHR/fetch requests are never blocked by type.
+    "lean_mode": {
+        "enabled": False,
+        "block_types": ["image", "font", "media", "favicon", "ping"],
+        "block_urls": [
+            "google-analytics.com", "googletagmanager.com", "doubleclick.net", "hotjar.com",
+            "segment.io", "facebook.net", "intercom.io", "fullstory.com", "newrelic.com",
+        ],
+        "allow_urls": [],
+    },
+    # Named browser profile kept in the data folder, so the login and the
+    # control panel's static files survive restarts
+    "browser_profile": {
+        "name": "AUGD",
+        "cache_size_mb": 200,
+        # Load the User Groups page in the background after startup so the
+        # first run starts from a warm cache. user_groups_url overrides the
+        # link found in the navigation menu.
+        "warm_up": True,
+        "user_groups_url": "",
+    },
+}
+
+# Overrides applied on top of settings.json, set from the command line
+settings_overrides = {}
+
+def merge_settings(settings, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(settings.get(key), dict):
+            settings[key].update(value)
+        else:
+            settings[key] = value
+
+def load_settings():
+    """Load settings.json and any command-line overrides on top of the defaults (nested dicts are merged)."""
+    settings = json.loads(json.dumps(default_settings))  # Deep copy of the defaults
+    if os.path.exists(settings_file_path):
+        try:
+            with open(settings_file_path, "r", encoding="utf-8") as settings_file:
+                merge_settings(settings, json.load(settings_file))
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read settings from {settings_file_path}: {e}. Using defaults.")
+    merge_settings(settings, settings_overrides)
+    return settings
+
+def company_allowed(value, name, company_filter):
+    """Apply the company_filter setting to one company."""
+    keys = {str(value).lower(), str(name).strip().lower()}
+    include = {str(entry).lower() for entry in company_filter["include"]}
+    exclude = {str(entry).lower() for entry in company_filter["exclude"]}
+    return (not include or bool(keys & include)) and not keys & exclude
+
+def save_json(path, data, description, indent=None):
+    """Atomically write data as JSON. Logs the error and returns False if it could not be saved."""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as json_file:
+            json.dump(data, json_file, indent=indent)
+        os.replace(temp_path, path)
+        return True
+    except (OSError, TypeError) as e:
+        logging.error(f"Could not save {description}: {e}")
+        return False
+
+# Learned step latencies, saved by the script and passed back in on the next run
+latency_profile_path = os.path.join(data_folder, "latency_profile.json")
+
+def load_latency_profile():
+    """Load the saved latency profile, or None if there is none yet."""
+    if not os.path.exists(latency_profile_path):
+        return None
+    try:
+        with open(latency_profile_path, "r", encoding="utf-8") as profile_file:
+            return json.load(profile_file)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read latency profile from {latency_profile_path}: {e}")
+        return None
+
+def save_latency_profile(profile):
+    """Atomically write the latency profile reported by the script."""
+    if save_json(latency_profile_path, profile, "latency profile"):
+        logging.info(f"Saved latency profile for {len(profile.get('steps', {}))} steps.")
 
 # Function to get the current timestamp
 def get_timestamp():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+# Endpoints learned by the API execution mode, reused on later runs
+api_endpoints_path = os.path.join(data_folder, "api_endpoints.json")
+
+# Request headers that carry credentials or anti-forgery tokens. They are never
+# saved with a learned endpoint; replays send the session's current values.
+credential_header_pattern = re.compile(r"^(authorization|proxy-authorization|cookie)$|csrf|xsrf", re.IGNORECASE)
+
+def without_credential_headers(endpoints):
+    """The endpoint templates with their credential and anti-forgery headers removed."""
+    return {
+        kind: dict(template, headers={
+            name: value for name, value in (template.get("headers") or {}).items()
+            if not credential_header_pattern.search(name)
+        }) if template else template
+        for kind, template in endpoints.items()
+    }
+
+def load_api_endpoints():
+    """Load the learned API endpoint templates, or an empty dict."""
+    if not os.path.exists(api_endpoints_path):
+        return {}
+    try:
+        with open(api_endpoints_path, "r", encoding="utf-8") as endpoints_file:
+            return without_credential_headers(json.load(endpoints_file))  # Files saved by older versions may hold some
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read API endpoints from {api_endpoints_path}: {e}")
+        return {}
+
+def save_api_endpoints(endpoints):
+    """Atomically write the learned API endpoint templates."""
+    if save_json(api_endpoints_path, without_credential_headers(endpoints), "API endpoints", indent=2):
+        learned = [kind for kind, template in endpoints.items() if template]
+        logging.info(f"Saved learned API endpoints: {', '.join(learned)}")
+
+# Plan produced by the last inventory phase, kept for review
+inventory_plan_path = os.path.join(data_folder, "inventory_plan.json")
+
+# Transfer sizes of the page's resources, used to estimate lean mode's savings
+resource_sizes_path = os.path.join(data_folder, "resource_sizes.json")
+
+def load_resource_sizes():
+    """Load the known resource sizes ({url: bytes}), or an empty dict."""
+    if not os.path.exists(resource_sizes_path):
+        return {}
+    try:
+        with open(resource_sizes_path, "r", encoding="utf-8") as sizes_file:
+            return json.load(sizes_file)
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read resource sizes from {resource_sizes_path}: {e}")
+        return {}
+
+def save_resource_sizes(sizes):
+    """Atomically write the known resource sizes."""
+    save_json(resource_sizes_path, sizes, "resource sizes")
+
+# Crash-safe journal of finished companies and deleted groups
+journal_path = os.path.join(data_folder, "run_journal.sqlite")
+
+class RunJournal:
+    """
+    SQLite journal written as the run goes, so an interrupted run can be
+    resumed without re-processing companies that were already finished.
+    """
+    def __init__(self, path=journal_path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")  # Survives crashes mid-write
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                started_at TEXT,
+                updated_at TEXT,
+                status TEXT
+            );
+            CREATE TABLE IF NOT EXISTS companies (
+                run_id TEXT,
+                company_value TEXT,
+                company_name TEXT,
+                status TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                groups_inspected INTEGER,
+                groups_deleted INTEGER,
+                PRIMARY KEY (run_id, company_value)
+            );
+            CREATE TABLE IF NOT EXISTS deleted_groups (
+                run_id TEXT,
+                company_value TEXT,
+                company_name TEXT,
+                group_name TEXT,
+                group_index INTEGER,
+                deleted_at TEXT
+            );
+        """)
+        self.connection.commit()
+
+    def start_run(self):
+        """Start a new run; any older unfinished run can no longer be resumed."""
+        run_id = datetime.now().strftime("run-%Y%m%d-%H%M%S")
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET status = 'abandoned' WHERE status NOT IN ('completed', 'abandoned')"
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, 'running')",
+                (run_id, get_timestamp(), get_timestamp())
+            )
+        return run_id
+
+    def resumable_run(self):
+        """Return the id of the most recent unfinished run, or None."""
+        row = self.connection.execute(
+            "SELECT run_id FROM runs WHERE status NOT IN ('completed', 'abandoned') "
+            "ORDER BY started_at DESC LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def resume_run(self, run_id):
+        """Mark an unfinished run as running again and return its finished companies."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET status = 'running', updated_at = ? WHERE run_id = ?",
+                (get_timestamp(), run_id)
+            )
+        rows = self.connection.execute(
+            "SELECT company_value FROM companies WHERE run_id = ? AND status = 'finished'", (run_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def company_started(self, run_id, company_value, company_name):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, 'started', ?, NULL, 0, 0)",
+                (run_id, company_value, company_name, get_timestamp())
+            )
+
+    def company_finished(self, run_id, company_value, groups_inspected, groups_deleted):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE companies SET status = 'finished', finished_at = ?, groups_inspected = ?, groups_deleted = ? "
+                "WHERE run_id = ? AND company_value = ?",
+                (get_timestamp(), groups_inspected, groups_deleted, run_id, company_value)
+            )
+            self.connection.execute(
+                "UPDATE runs SET updated_at = ? WHERE run_id = ?", (get_timestamp(), run_id)
+            )
+
+    def group_deleted(self, run_id, company_value, company_name, group_name, group_index):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO deleted_groups VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, company_value, company_name, group_name, group_index, get_timestamp())
+            )
+
+    def finish_run(self, run_id, status):
+        """Record how the run ended; only 'completed' runs are not resumable."""
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                (status, get_timestamp(), run_id)
+            )
+
+# Fingerprints of companies that were left compliant, so later runs can
+# skip the ones whose groups have not changed
+company_cache_path = os.path.join(data_folder, "company_cache.db")
+
+class CompanyCache:
+    """SQLite store of per-company group fingerprints, with age-based eviction."""
+    def __init__(self, path=company_cache_path):
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS companies (
+                company_value TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                verified_at TEXT NOT NULL
+            );
+        """)
+
+    def evict(self, max_age_days):
+        """Drop entries not verified within max_age_days; returns how many were dropped."""
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        with self.db:
+            return self.db.execute("DELETE FROM companies WHERE verified_at < ?", (cutoff,)).rowcount
+
+    def fingerprints(self):
+        """{company value: fingerprint} for every cached company."""
+        return dict(self.db.execute("SELECT company_value, fingerprint FROM companies"))
+
+    def store(self, company_value, fingerprint):
+        """Record a company's fingerprint after a full check."""
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO companies (company_value, fingerprint, verified_at) VALUES (?, ?, ?)",
+                (company_value, fingerprint, datetime.now().isoformat())
+            )
+
+# Full-text search index over the text log, kept in step with the log files
+log_search_path = os.path.join(data_folder, "log_search.db")
+
+# What a text log message records, and the run, company and group it names
+log_line_format = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d+ - (\w+) - (.*)$")
+log_message_patterns = [
+    ("deleted", re.compile(r"^Group deleted: (?P<company>.+?) / (?P<group>.+) \(group ID (?P<ref>[^)]*)\)$")),
+    ("inspected", re.compile(r"^Group inspected: (?P<company>.+?) / (?P<group>.+) \(\d+ members\)$")),
+    ("company_started", re.compile(r"^Company started \(\d+/\d+\): (?P<company>.+)$")),
+    ("company_finished", re.compile(r"^Company finished: (?P<company>.+?) - \d+ groups inspected")),
+    ("error", re.compile(r"^Script error \(company: (?P<company>.+?)\): ")),
+    ("run_started", re.compile(r"^Script started\. Run ID: (?P<run>\S+)$")),
+    ("run_resumed", re.compile(r"^Resuming run (?P<run>\S+);")),
+    ("run_finished", re.compile(r"^Run (completed|failed|stopped):")),
+]
+
+class LogSearchIndex:
+    """
+    SQLite full-text index of the text log, by run, company, group and
+    action. Every log file is a source with a byte offset: closed segments
+    are read once, and the current file only from where the last update
+    stopped. A segment continues the current file it was rotated from (same
+    start time), so nothing is indexed twice.
+    """
+    def __init__(self, path=log_search_path, log_path=log_file_path):
+        self.log_path = log_path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                segment TEXT PRIMARY KEY,
+                indexed_bytes INTEGER NOT NULL,
+                last_run TEXT,
+                complete INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                time TEXT,
+                run TEXT,
+                level TEXT,
+                action TEXT,
+                company TEXT COLLATE NOCASE,
+                group_name TEXT COLLATE NOCASE,
+                group_ref TEXT,
+                message TEXT
+            );
+            CREATE INDEX IF NOT EXISTS entries_company ON entries (company, group_name);
+            CREATE INDEX IF NOT EXISTS entries_run ON entries (run);
+            CREATE INDEX IF NOT EXISTS entries_action ON entries (action, time);
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries_text USING fts5(message, content='entries', content_rowid='id');
+        """)
+
+    def log_sources(self):
+        """(segment key, path, runs, closed) for each text log file, oldest first."""
+        folder, name = os.path.split(self.log_path)
+        sources = []
+        for entry in sorted(os.listdir(folder), reverse=True):  # Numbered backups from before segmented rotation
+            if entry.startswith(name + ".") and entry[len(name) + 1:].isdigit():
+                sources.append(("legacy:" + entry, os.path.join(folder, entry), [], True))
+        try:
+            with open(os.path.join(folder, os.path.basename(log_index_path)), "r") as index_file:
+                segment_index = json.load(index_file)
+        except (OSError, ValueError):
+            segment_index = {"segments": [], "current": {}}
+        for segment in sorted(segment_index["segments"], key=lambda segment: segment["start"]):
+            path = os.path.join(folder, segment["file"])
+            if segment["log"] != name:
+                continue
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                path += ".gz"  # Compressed since the index was read
+            if os.path.exists(path):
+                sources.append((segment["start"], path, segment["runs"], True))
+        current = segment_index["current"].get(name, {"start": "current", "runs": []})
+        if os.path.exists(self.log_path):
+            sources.append((current["start"], self.log_path, current["runs"], False))
+        return sources
+
+    def update(self):
+        """Index what was added to the log files since the last update; returns the number of new entries."""
+        added = 0
+        for key, path, runs, closed in self.log_sources():
+            row = self.db.execute("SELECT indexed_bytes, last_run, complete FROM sources WHERE segment = ?", (key,)).fetchone()
+            if row and row[2]:
+                continue
+            offset, run = (row[0], row[1]) if row else (0, runs[-1] if runs else None)
+            added += self.index_file(key, path, offset, run, closed)
+        return added
+
+    def index_file(self, key, path, offset, run, closed):
+        """Index a file from offset on; a closed file is then marked complete."""
+        entries = []
+        last_time = None
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as log_file:
+                log_file.seek(offset)
+                for raw_line in log_file:
+                    if not raw_line.endswith(b"\n"):
+                        break  # Still being written
+                    offset += len(raw_line)
+                    line = raw_line.decode("utf-8", "replace").rstrip("\r\n")
+                    match = log_line_format.match(line)
+                    time_text, level, message = match.groups() if match else (last_time, None, line)
+                    last_time = time_text
+                    action, company, group, ref = "log", None, None, None
+                    for name, pattern in log_message_patterns:
+                        found = pattern.match(message)
+                        if found:
+                            action = name
+                            fields = found.groupdict()
+                            run = fields.get("run") or run
+                            company = fields.get("company") if fields.get("company") != "-" else None
+                            group, ref = fields.get("group"), fields.get("ref")
+                            break
+                    entries.append((time_text, run, level, action, company, group, ref, message))
+        except (OSError, EOFError) as error:
+            logging.warning(f"Could not index log file {path}: {error}")
+            return 0
+        with self.db:
+            first_id = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM entries").fetchone()[0]
+            self.db.executemany(
+                "INSERT INTO entries (time, run, level, action, company, group_name, group_ref, message) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries
+            )
+            self.db.execute("INSERT INTO entries_text (rowid, message) SELECT id, message FROM entries WHERE id > ?", (first_id,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO sources (segment, indexed_bytes, last_run, complete) VALUES (?, ?, ?, ?)",
+                (key, offset, run, int(closed))
+            )
+        return len(entries)
+
+    def search(self, query, limit=50):
+        """
+        Entries matching query, newest first. Plain words are matched with
+        full-text search; company:, group:, action: and run: terms filter on
+        those fields exactly (case-insensitive). Quote values with spaces.
+        Raises ValueError for unbalanced quotes.
+        """
+        columns = {"company": "company", "group": "group_name", "action": "action", "run": "run"}
+        words, clauses, params = [], [], []
+        for token in shlex.split(query):
+            field, _, value = token.partition(":")
+            if value and field in columns:
+                clauses.append(f"entries.{columns[field]} = ?")
+                params.append(value)
+            else:
+                words.append('"' + token.replace('"', '""') + '"')
+        sql = "SELECT entries.time, run, action, company, group_name, group_ref, entries.message FROM entries"
+        if words:
+            sql += " JOIN entries_text ON entries_text.rowid = entries.id"
+            clauses.insert(0, "entries_text MATCH ?")
+            params.insert(0, " ".join(words))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY entries.id DESC LIMIT ?"
+        return self.db.execute(sql, params + [limit]).fetchall()
+
+    def close(self):
+        self.db.close()
+
+def format_log_results(rows):
+    """One line per search result: time, run, action, company / group and the message."""
+    lines = []
+    for time_text, run, action, company, group, ref, message in rows:
+        subject = " / ".join(part for part in (company, group) if part)
+        lines.append(f"{time_text or '-'}  {run or '-'}  {action:<16} {subject + '  ' if subject else ''}{message}")
+    return "\n".join(lines)
+
+def search_logs(query, limit=50):
+    """Bring the log index up to date, print the entries matching query and return an exit code."""
+    index = LogSearchIndex()
+    try:
+        start_time = time.perf_counter()
+        added = index.update()
+        indexed_at = time.perf_counter()
+        rows = index.search(query, limit)
+    except (ValueError, sqlite3.Error) as error:
+        print(f"Search failed: {error}", file=sys.stderr)
+        return 2
+    finally:
+        index.close()
+    if rows:
+        print(format_log_results(rows))
+    print(f"{len(rows)} results in {(time.perf_counter() - indexed_at) * 1000:.1f} ms "
+          f"({added} new log lines indexed in {(indexed_at - start_time) * 1000:.0f} ms)")
+    return 0
+
+# End-of-run timing breakdowns, saved next to the log as timing_<run ID>.json
+def timing_report_path(run_id):
+    return os.path.join(log_folder, f"timing_{run_id}.json")
+
+def merge_step_timings(timings):
+    """Add up {"wait"|"work": {step: [count, ms, max ms]}} totals, e.g. from several pool pages."""
+    merged = {"wait": {}, "work": {}}
+    for timing in timings:
+        for kind, steps in (timing or {}).items():
+            for step, (count, ms, max_ms) in steps.items():
+                totals = merged[kind].setdefault(step, [0, 0, 0])
+                totals[0] += count
+                totals[1] += ms
+                totals[2] = max(totals[2], max_ms)
+    return merged
+
+def build_timing_report(run_id, result, companies):
+    """
+    The timing breakdown of a run: every step with its kind (wait or work),
+    count, total, mean and maximum; wait time against work time; and each
+    company's duration split the same way. companies holds
+    (name, value, duration ms, [wait ms, work ms] or None) per finished company.
+    """
+    timings = result.get("stepTimings") or {"wait": {}, "work": {}}
+    steps = [
+        {"kind": kind, "step": step, "count": count, "ms": ms, "meanMs": round(ms / count, 1) if count else 0, "maxMs": max_ms}
+        for kind, kind_steps in timings.items() for step, (count, ms, max_ms) in kind_steps.items()
+    ]
+    steps.sort(key=lambda step: step["ms"], reverse=True)
+    company_rows = [
+        {"company": name, "value": value, "ms": duration,
+         "waitMs": timing[0] if timing else None, "workMs": timing[1] if timing else None}
+        for name, value, duration, timing in companies
+    ]
+    company_rows.sort(key=lambda row: row["ms"], reverse=True)
+    return {
+        "run_id": run_id,
+        "saved": datetime.now().isoformat(),
+        "status": result["status"],
+        "durationMs": result["durationMs"],
+        "waitMs": sum(step["ms"] for step in steps if step["kind"] == "wait"),
+        "workMs": sum(step["ms"] for step in steps if step["kind"] == "work"),
+        "steps": steps,
+        "companies": company_rows,
+    }
+
+def format_timing_report(report, top=10):
+    """The timing breakdown as a fixed-width table, with the slowest companies."""
+    timed = report["waitMs"] + report["workMs"]
+    share = lambda ms: f"{ms * 100 / timed:.0f}%" if timed else "-"
+    lines = [
+        f"Timing breakdown for run {report['run_id']} ({report['durationMs'] / 1000:.1f} s, {report['status']})",
+        f"Wait {report['waitMs'] / 1000:.1f} s ({share(report['waitMs'])}), "
+        f"work {report['workMs'] / 1000:.1f} s ({share(report['workMs'])})",
+    ]
+    if report["steps"]:
+        lines.append(f"{'step':<36} {'kind':<5} {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>8} {'share':>6}")
+        for step in report["steps"]:
+            lines.append(
+                f"{step['step'][:36]:<36} {step['kind']:<5} {step['count']:>7} {step['ms']:>10} "
+                f"{step['meanMs']:>9} {step['maxMs']:>8} {share(step['ms']):>6}"
+            )
+    else:
+        lines.append("No step timings were reported for this run.")
+    if report["companies"]:
+        lines.append(f"Slowest companies (of {len(report['companies'])}):")
+        for row in report["companies"][:top]:
+            split = f" (wait {row['waitMs']} ms, work {row['workMs']} ms)" if row["waitMs"] is not None else ""
+            lines.append(f"  {row['company']}: {row['ms']} ms{split}")
+    return "\n".join(lines)
+
+def save_timing_report(report):
+    """Atomically write a run's timing breakdown next to the log; returns its path, or None."""
+    path = timing_report_path(report["run_id"])
+    return path if save_json(path, report, "the timing report", indent=2) else None
+
+# Helpers shared with the injected script's API mode: fill endpoint templates
+# and read listing responses the same way the JavaScript side does
+def fill_template(template, values):
+    """Return (url, body) with the {company}/{group}/{members} placeholders filled."""
+    url = template["url"]
+    body = template.get("body")
+    for name, value in values.items():
+        if name == "members":
+            continue
+        url = url.replace("{" + name + "}", quote(str(value), safe=""))
+        if body:
+            body = body.replace("{" + name + "}", str(value))
+    if body and values.get("members") is not None:
+        members = values["members"]
+        if template.get("members") == "json":
+            ids = [int(member) for member in members] if template.get("membersNumeric") else [str(member) for member in members]
+            body = body.replace('"{members}"', json.dumps(ids))
+        elif template.get("members") == "form":
+            body = body.replace("{members}", "&".join(
+                f"{quote(template['membersKey'], safe='')}={quote(str(member), safe='')}" for member in members
+            ))
+    return url, body
+
+def find_records(data, keys):
+    """First list of records (breadth-first) whose entries have one of the keys."""
+    pending = [data]
+    empty_list = None
+    while pending:
+        value = pending.pop(0)
+        if isinstance(value, list):
+            if not value:
+                empty_list = value if empty_list is None else empty_list
+            elif isinstance(value[0], dict) and any(key in value[0] for key in keys):
+                return value
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+    return empty_list
+
+def member_count(value):
+    """A member count from a listing field (a number, numeric string or member list), or None."""
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_group_listing(data, fields):
+    """
+    Normalise a group listing to [{"id", "name", "members"}], or None. A field
+    the record lacks is None; see listing_usable.
+    """
+    records = find_records(data, fields["name"])
+    if records is None:
+        return None
+    groups = []
+    for record in records:
+        id_key = next((key for key in fields["id"] if key in record), None)
+        name_key = next((key for key in fields["name"] if key in record), None)
+        members_key = next((key for key in fields["members"] if key in record), None)
+        members = record.get(members_key) if members_key else None
+        groups.append({
+            "id": str(record[id_key]) if id_key else None,
+            "name": str(record[name_key]).strip() if name_key else None,
+            "members": member_count(members),
+        })
+    return groups
+
+def listing_usable(groups):
+    """
+    True if every group has an id, a name and a member count. A listing
+    missing any of them is not acted on: a group without a member count
+    could otherwise be taken for an empty one and deleted.
+    """
+    return groups is not None and all(
+        group["id"] and group["name"] is not None and group["members"] is not None for group in groups
+    )
+
+def parse_user_ids(data, fields):
+    """Ids from an available-users response."""
+    records = find_records(data, fields["user_id"]) or []
+    ids = []
+    for record in records:
+        id_key = next((key for key in fields["user_id"] if key in record), None)
+        if id_key:
+            ids.append(str(record[id_key]))
+    return ids
+
+def plan_company_actions(groups):
+    """
+    Apply the cleanup rules to a company's groups. The first 'everyone' group
+    with members is kept (and gets every user added); other 'everyone' groups
+    and empty non-'everyone' groups are deleted.
+    """
+    kept_everyone = None
+    deletions = []
+    for group in groups:
+        if group["name"] == "everyone":
+            if group["members"] > 0 and kept_everyone is None:
+                kept_everyone = group
+            else:
+                deletions.append(group)
+        elif group["members"] == 0:
+            deletions.append(group)
+    return kept_everyone, deletions
+
+def group_fingerprint(groups):
+    """Same fingerprint as groupFingerprint in the injected script."""
+    lines = [
+        f"{group['name']}:{('+' if group['members'] > 0 else '0') if group['name'] == 'everyone' else group['members']}"
+        for group in groups
+    ]
+    lines.sort(key=lambda line: line.encode("utf-16-be"))  # JavaScript's sort order
+    text = json.dumps(lines, ensure_ascii=False, separators=(",", ":"))  # Same text as JSON.stringify
+    encoded = text.encode("utf-16-le")
+    value = 0x811c9dc5
+    for i in range(0, len(encoded), 2):
+        value = ((value ^ (encoded[i] | encoded[i + 1] << 8)) * 0x01000193) & 0xFFFFFFFF
+    return f"{len(groups)}-{value:x}"
+
+# Headless engine: runs the group inventory and cleanup from Python over the
+# endpoints learned by the API mode, using the browser session's cookies
+class HttpEngineError(Exception):
+    """Raised when an endpoint is missing or a request fails."""
+
+class HttpConnectionPool:
+    """Keep-alive HTTP(S) connections to one origin, shared by the engine's workers."""
+    def __init__(self, scheme, netloc, size, timeout=30):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def new_connection(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def request(self, method, path, body, headers):
+        """Send one request on an idle connection (blocking); returns (status, body bytes)."""
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self.new_connection()
+        for attempt in range(2):
+            try:
+                connection.request(method, path, body=body.encode("utf-8") if body else None, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                connection.close()  # The server dropped the keep-alive connection; reconnect once
+                if attempt == 1:
+                    raise
+                connection = self.new_connection()
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, data
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+class HttpEngine:
+    """
+    Pure-Python group inventory and cleanup. Companies are processed
+    concurrently with asyncio; the blocking keep-alive requests run on a
+    thread pool sized to the request concurrency. Progress is reported through
+    emit(event_type, event) with the same events the injected script sends.
+    """
+    def __init__(self, endpoints, cookies, settings, emit=None, stop_event=None, company_cache=None,
+                 session_headers=None):
+        missing = [kind for kind in ("list", "delete") if not endpoints.get(kind)]
+        if missing:
+            raise HttpEngineError(f"Endpoints not learned yet: {', '.join(missing)}. Run once with execution_mode 'api'.")
+        self.endpoints = endpoints
+        self.company_cache = company_cache  # {company value: fingerprint}, or None when disabled
+        self.cookies = cookies
+        self.session_headers = session_headers or {}  # Current credential/anti-forgery headers from the page
+        self.fields = settings["api_fields"]
+        self.request_concurrency = settings["http_engine"]["request_concurrency"]
+        self.company_concurrency = settings["http_engine"]["company_concurrency"]
+        self.structured_log = settings["structured_log"]
+        self.emit = emit or (lambda event_type, event: None)
+        self.stop_event = stop_event or threading.Event()
+        self.pools = {}
+        self.requests = 0
+        self.stats = {"companies": 0, "inspected": 0, "deleted": 0, "errors": 0, "cacheHits": 0, "cacheMisses": 0}
+        self.step_timings = {"wait": {}, "work": {}}  # Same shape as the injected script's step timers
+
+    def cookie_header(self, host, secure):
+        """Cookie header value for a request to host."""
+        pairs = []
+        for cookie in self.cookies:
+            domain = cookie["domain"].lstrip(".")
+            if host != domain and not host.endswith("." + domain):
+                continue
+            if cookie.get("secure") and not secure:
+                continue
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+        return "; ".join(pairs)
+
+    async def call(self, kind, values):
+        """Replay one endpoint and return its decoded JSON response."""
+        template = self.endpoints.get(kind)
+        if not template:
+            raise HttpEngineError(f"The {kind} endpoint has not been learned yet.")
+        url, body = fill_template(template, values)
+        parts = urlsplit(url)
+        pool = self.pools.get((parts.scheme, parts.netloc))
+        if pool is None:
+            pool = self.pools[(parts.scheme, parts.netloc)] = HttpConnectionPool(
+                parts.scheme, parts.netloc, self.request_concurrency
+            )
+        headers = dict(template.get("headers") or {})
+        headers.update(self.session_headers)
+        cookie_header = self.cookie_header(parts.hostname or "", parts.scheme == "https")
+        if cookie_header:
+            headers["Cookie"] = cookie_header
+        method = template["method"]
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        start_time = time.perf_counter()
+        async with self.request_slots:
+            status, data = await asyncio.get_running_loop().run_in_executor(
+                self.executor, pool.request, method, path, None if method in ("GET", "HEAD") else body, headers
+            )
+        self.requests += 1
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        totals = self.step_timings["wait"].setdefault(f"http {kind}", [0, 0, 0])
+        totals[0] += 1
+        totals[1] += elapsed_ms
+        totals[2] = max(totals[2], elapsed_ms)
+        if self.structured_log:
+            self.emit("step", {
+                "step": f"http {kind}", "value": values.get("company"), "groupId": values.get("group"),
+                "ms": round(elapsed_ms, 1),
+                "outcome": "ok" if 200 <= status < 300 else f"http {status}",
+            })
+        if not 200 <= status < 300:
+            raise HttpEngineError(f"{kind} request failed with HTTP {status}")
+        return json.loads(data) if data else None
+
+    async def process_company(self, index, total, value, name):
+        """
+        List a company's groups, add members to the kept 'everyone' group and
+        delete the rest. Returns True once the company is finished.
+        """
+        async with self.company_slots:
+            if self.stop_event.is_set():
+                return False
+            start = time.monotonic()
+            self.emit("company_started", {"index": index, "total": total, "company": name, "value": value})
+            inspected = deleted = failed = 0
+            cache_hit = None
+            try:
+                groups = parse_group_listing(await self.call("list", {"company": value}), self.fields)
+                if not listing_usable(groups):
+                    raise HttpEngineError("group listing could not be parsed, or a group has no id, name or member count")
+                for group in groups:
+                    inspected += 1
+                    self.emit("group_inspected", {
+                        "company": name, "groupIndex": None, "groupId": group["id"],
+                        "group": group["name"], "members": group["members"],
+                    })
+                kept_everyone, deletions = plan_company_actions(groups)
+                if self.company_cache is not None:
+                    cache_hit = self.company_cache.get(value) == group_fingerprint(groups)
+                    self.stats["cacheHits" if cache_hit else "cacheMisses"] += 1
+                    if cache_hit:
+                        deletions = []  # Unchanged since it was last checked in full; the top-up waits for that too
+                        kept_everyone = None
+                if kept_everyone and self.endpoints.get("users") and self.endpoints.get("add_members"):
+                    user_ids = parse_user_ids(
+                        await self.call("users", {"company": value, "group": kept_everyone["id"]}), self.fields
+                    )
+                    if user_ids:
+                        await self.call("add_members", {"company": value, "group": kept_everyone["id"], "members": user_ids})
+                results = await asyncio.gather(
+                    *(self.call("delete", {"company": value, "group": group["id"]}) for group in deletions),
+                    return_exceptions=True
+                )
+                for group, result in zip(deletions, results):
+                    if isinstance(result, Exception):
+                        failed += 1
+                        self.report_error(f"Deleting group {group['name']} ({group['id']}) failed: {result}", name)
+                    else:
+                        deleted += 1
+                        self.emit("group_deleted", {
+                            "company": name, "value": value, "groupIndex": None,
+                            "groupId": group["id"], "group": group["name"],
+                        })
+            except (HttpEngineError, OSError, ValueError, http.client.HTTPException) as e:
+                self.report_error(f"Processing company {name} failed: {e}", name)
+                return False  # Leave the company unfinished so a resumed run retries it
+            self.stats["companies"] += 1
+            self.stats["inspected"] += inspected
+            self.stats["deleted"] += deleted
+            remaining = [group for group in groups if group not in deletions]
+            self.emit("company_finished", {
+                "index": index, "company": name, "value": value, "inspected": inspected,
+                "deleted": deleted, "errors": failed, "durationMs": round((time.monotonic() - start) * 1000),
+                "fingerprint": group_fingerprint(remaining) if not failed else None, "cacheHit": cache_hit,
+            })
+            return True
+
+    def open(self):
+        """Create the concurrency limits and request threads; call from inside the event loop."""
+        self.request_slots = asyncio.Semaphore(self.request_concurrency)
+        self.company_slots = asyncio.Semaphore(self.company_concurrency)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.request_concurrency)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for pool in self.pools.values():
+            pool.close()
+
+    def report_error(self, message, company=None):
+        self.stats["errors"] += 1
+        self.emit("error", {"message": message, "company": company})
+
+    async def run(self, companies, skip_companies=()):
+        """Process [(value, name), ...] and return the run summary (also emitted as run_complete)."""
+        start = time.monotonic()
+        self.open()
+        skip = set(skip_companies)
+        try:
+            await asyncio.gather(*(
+                self.process_company(index, len(companies), value, name)
+                for index, (value, name) in enumerate(companies) if value not in skip
+            ))
+        finally:
+            self.close()
+        elapsed = max(time.monotonic() - start, 1e-6)
+        summary = dict(self.stats)
+        summary.update({
+            "status": "stopped" if self.stop_event.is_set() else ("completed" if not self.stats["errors"] else "failed"),
+            "durationMs": round(elapsed * 1000),
+            "requests": self.requests,
+            "requestsPerSec": round(self.requests / elapsed, 1),
+            "groupsPerSec": round(self.stats["inspected"] / elapsed, 1),
+            "stepTimings": {kind: {step: [count, round(ms), round(max_ms)] for step, (count, ms, max_ms) in steps.items()}
+                            for kind, steps in self.step_timings.items()},
+        })
+        self.emit("run_complete", summary)
+        return summary
+
+# Durable work queue shared by the worker processes of a multi-process run
+work_queue_path = os.path.join(data_folder, "work_queue.db")
+
+class WorkQueue:
+    """
+    SQLite-backed queue of companies for one run. Workers claim companies one
+    at a time, so a few very large companies cannot leave other workers idle.
+    Companies claimed by a worker that dies are put back with requeue_worker.
+    """
+    def __init__(self, path=work_queue_path):
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS work (
+                run_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                company_value TEXT NOT NULL,
+                company_name TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at TEXT,
+                finished_at TEXT,
+                PRIMARY KEY (run_id, company_value)
+            );
+        """)
+
+    def fill(self, run_id, companies, skip_companies=()):
+        """Queue [(value, name), ...] for run_id, leaving out skipped companies."""
+        skip = set(skip_companies)
+        with self.db:
+            self.db.execute("DELETE FROM work WHERE run_id = ?", (run_id,))
+            self.db.executemany(
+                "INSERT INTO work (run_id, position, total, company_value, company_name) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, index, len(companies), value, name)
+                 for index, (value, name) in enumerate(companies) if value not in skip]
+            )
+
+    def claim(self, run_id, worker):
+        """Claim the next pending company; returns (index, total, value, name) or None."""
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")  # Serialise claims across processes
+            row = self.db.execute(
+                "SELECT position, total, company_value, company_name FROM work "
+                "WHERE run_id = ? AND status = 'pending' ORDER BY position LIMIT 1",
+                (run_id,)
+            ).fetchone()
+            if row:
+                self.db.execute(
+                    "UPDATE work SET status = 'claimed', worker = ?, attempts = attempts + 1, claimed_at = ? "
+                    "WHERE run_id = ? AND company_value = ?",
+                    (worker, datetime.now().isoformat(), run_id, row[2])
+                )
+        return row
+
+    def finish(self, run_id, company_value, ok):
+        """Mark a claimed company done, or failed if ok is False."""
+        with self.db:
+            self.db.execute(
+                "UPDATE work SET status = ?, finished_at = ? WHERE run_id = ? AND company_value = ?",
+                ("done" if ok else "failed", datetime.now().isoformat(), run_id, company_value)
+            )
+
+    def requeue_worker(self, run_id, worker, max_attempts):
+        """
+        Put the companies a dead worker had claimed back in the queue. Returns
+        (requeued, abandoned) company names; companies that already used
+        max_attempts are marked failed instead of being retried again.
+        """
+        with self.db:
+            rows = self.db.execute(
+                "SELECT company_value, company_name, attempts FROM work "
+                "WHERE run_id = ? AND worker = ? AND status = 'claimed'",
+                (run_id, worker)
+            ).fetchall()
+            requeued, abandoned = [], []
+            for value, name, attempts in rows:
+                status = "pending" if attempts < max_attempts else "failed"
+                self.db.execute(
+                    "UPDATE work SET status = ?, worker = NULL WHERE run_id = ? AND company_value = ?",
+                    (status, run_id, value)
+                )
+                (requeued if status == "pending" else abandoned).append(name)
+        return requeued, abandoned
+
+    def pending_count(self, run_id):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM work WHERE run_id = ? AND status IN ('pending', 'claimed')", (run_id,)
+        ).fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+def work_queue_worker(queue_path, run_id, worker, endpoints, cookies, settings, events, stop_event, company_cache,
+                      session_headers):
+    """
+    Worker process entry point: claim companies from the queue and process
+    them with an HttpEngine until the queue is empty or a stop is requested.
+    Events go to the runner through the events queue, tagged with the worker,
+    and so do log records: the runner writes them to the parent's log files.
+    """
+    log_forwarder = QueueHandler(events)
+    log_forwarder.setFormatter(logging.Formatter("%(message)s"))  # The parent's log_handler adds the time and level
+    logging.basicConfig(handlers=[log_forwarder], level=logging.INFO, force=True)
+    work = WorkQueue(queue_path)
+    engine = HttpEngine(endpoints, cookies, settings,
+                        emit=lambda event_type, event: events.put(dict(event, type=event_type, worker=worker)),
+                        stop_event=stop_event, company_cache=company_cache, session_headers=session_headers)
+
+    reported = {"requests": 0}
+
+    async def claim_loop():
+        while not stop_event.is_set():
+            claimed = work.claim(run_id, worker)
+            if claimed is None:
+                return
+            index, total, value, name = claimed
+            ok = await engine.process_company(index, total, value, name)
+            work.finish(run_id, value, ok)
+            events.put({"type": "worker_stats", "worker": worker, "requests": engine.requests - reported["requests"]})
+            reported["requests"] = engine.requests
+
+    async def run():
+        engine.open()
+        try:
+            await asyncio.gather(*(claim_loop() for _ in range(engine.company_concurrency)))
+        finally:
+            engine.close()
+
+    asyncio.run(run())
+    work.close()
+
+class WorkQueueRunner:
+    """
+    Runs a company list across several worker processes, each with its own
+    HttpEngine. Workers take companies from a WorkQueue as they become free.
+    A worker that exits abnormally has its claimed companies requeued and is
+    replaced while work remains.
+    """
+    def __init__(self, endpoints, cookies, settings, emit=None, stop_event=None, queue_path=work_queue_path,
+                 company_cache=None):
+        missing = [kind for kind in ("list", "delete") if not endpoints.get(kind)]
+        if missing:
+            raise HttpEngineError(f"Endpoints not learned yet: {', '.join(missing)}. Run once with execution_mode 'api'.")
+        self.endpoints = endpoints
+        self.cookies = cookies
+        self.settings = settings
+        self.worker_count = settings["work_queue"]["workers"]
+        self.max_attempts = settings["work_queue"]["max_attempts"]
+        self.emit = emit or (lambda event_type, event: None)
+        self.stop_event = stop_event or threading.Event()
+        self.queue_path = queue_path
+        self.company_cache = company_cache
+        self.session_headers = {}  # Set from the page before run()
+        self.context = multiprocessing.get_context("spawn")  # Never fork a process that runs Qt
+
+    def start_worker(self, run_id, worker, events, worker_stop):
+        process = self.context.Process(
+            target=work_queue_worker, name=f"augd-{worker}", daemon=True,
+            args=(self.queue_path, run_id, worker, self.endpoints, self.cookies, self.settings, events, worker_stop,
+                  self.company_cache, self.session_headers)
+        )
+        process.start()
+        return process
+
+    def run(self, run_id, companies, skip_companies=()):
+        """Process [(value, name), ...] and return the run summary (also emitted as run_complete)."""
+        start = time.monotonic()
+        work = WorkQueue(self.queue_path)
+        work.fill(run_id, companies, skip_companies)
+        events = self.context.Queue()
+        worker_stop = self.context.Event()
+        stats = {"companies": 0, "inspected": 0, "deleted": 0, "errors": 0, "cacheHits": 0, "cacheMisses": 0}
+        workers = {}
+        processes = {}
+        for number in range(self.worker_count):
+            worker = f"worker-{number + 1}"
+            workers[worker] = {"companies": 0, "groups": 0, "requests": 0, "requeued": 0, "started": time.monotonic()}
+            processes[worker] = self.start_worker(run_id, worker, events, worker_stop)
+        restarts = 0
+
+        while processes:
+            if self.stop_event.is_set():
+                worker_stop.set()
+            try:
+                event = events.get(timeout=0.2)
+            except queue.Empty:
+                event = None
+            if isinstance(event, logging.LogRecord):
+                logging.getLogger(event.name).handle(event)  # A worker's log record
+                continue
+            if event is not None:
+                event_type = event.pop("type")
+                worker_stats = workers[event["worker"]]
+                if event_type == "worker_stats":
+                    worker_stats["requests"] += event["requests"]
+                    continue
+                if event_type == "company_finished":
+                    stats["companies"] += 1
+                    stats["inspected"] += event["inspected"]
+                    stats["deleted"] += event["deleted"]
+                    worker_stats["companies"] += 1
+                    worker_stats["groups"] += event["inspected"]
+                    if event.get("cacheHit") is not None:
+                        stats["cacheHits" if event["cacheHit"] else "cacheMisses"] += 1
+                elif event_type == "error":
+                    stats["errors"] += 1
+                self.emit(event_type, event)
+                continue
+
+            # Nothing to forward; check on the workers
+            for worker, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del processes[worker]
+                if process.exitcode == 0:
+                    continue
+                requeued, abandoned = work.requeue_worker(run_id, worker, self.max_attempts)
+                workers[worker]["requeued"] += len(requeued)
+                stats["errors"] += 1
+                self.emit("error", {
+                    "message": f"{worker} exited with code {process.exitcode}; requeued {len(requeued)} companies"
+                               + (f", gave up on {', '.join(abandoned)}" if abandoned else ""),
+                    "company": None, "worker": worker,
+                })
+                if not worker_stop.is_set() and work.pending_count(run_id) and restarts < self.worker_count * self.max_attempts:
+                    restarts += 1
+                    processes[worker] = self.start_worker(run_id, worker, events, worker_stop)
+        work.close()
+
+        elapsed = max(time.monotonic() - start, 1e-6)
+        for worker, worker_stats in workers.items():
+            worker_elapsed = max(time.monotonic() - worker_stats.pop("started"), 1e-6)
+            worker_stats["companiesPerSec"] = round(worker_stats["companies"] / worker_elapsed, 2)
+            worker_stats["groupsPerSec"] = round(worker_stats["groups"] / worker_elapsed, 1)
+        requests = sum(worker_stats["requests"] for worker_stats in workers.values())
+        summary = dict(stats)
+        summary.update({
+            "status": "stopped" if self.stop_event.is_set() else ("completed" if not stats["errors"] else "failed"),
+            "durationMs": round(elapsed * 1000),
+            "requests": requests,
+            "requestsPerSec": round(requests / elapsed, 1),
+            "groupsPerSec": round(stats["inspected"] / elapsed, 1),
+            "workers": workers,
+        })
+        self.emit("run_complete", summary)
+        return summary
+
 # Define the stylesheet for dark mode
 dark_mode_style = """
     QMainWindow {
@@ -58,29 +1640,421 @@ dark_mode_style = """
     }
 """
 
+# Persistent browser profile shared by every page
+def create_browser_profile(settings):
+    """Create the named profile with a capped disk HTTP cache and persistent cookies."""
+    profile_folder = os.path.join(data_folder, "Browser Profile")
+    profile = QWebEngineProfile(settings["name"], QApplication.instance())  # Outlives every page using it
+    profile.setPersistentStoragePath(os.path.join(profile_folder, "Storage"))
+    profile.setCachePath(os.path.join(profile_folder, "Cache"))
+    profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+    profile.setHttpCacheMaximumSize(settings["cache_size_mb"] * 1024 * 1024)
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)  # Keep session cookies too
+    logging.info(f"Using browser profile '{settings['name']}' in {profile_folder}")
+    return profile
+
+def strip_debug_logging(script, detail_company=""):
+    """
+    Production verbosity: remove the script's console.log statements (the
+    per-company and per-group detail) before it is injected. With a detail
+    company they are routed through debugLog instead, which only logs while
+    that company is processed. Statements become ";" so a statement that is
+    the body of an if stays one.
+    """
+    lines = []
+    for line in script.split("\n"):
+        statement = line.lstrip()
+        if statement.startswith("console.log(") and statement.endswith(");"):
+            indent = line[:len(line) - len(statement)]
+            line = indent + ("debugLog(" + statement[len("console.log("):] if detail_company else ";")
+        lines.append(line)
+    return "\n".join(lines)
+
 # Custom class to capture JavaScript console messages
 class WebEnginePage(QWebEnginePage):
+    console_levels = {
+        QWebEnginePage.InfoMessageLevel: (logging.INFO, "Info"),
+        QWebEnginePage.WarningMessageLevel: (logging.WARNING, "Warning"),
+        QWebEnginePage.ErrorMessageLevel: (logging.ERROR, "Error"),
+    }
+
     def javaScriptConsoleMessage(self, level, message, line, source):
         """
-        Override method to log JavaScript console messages with appropriate levels.
+        Override method to log each JavaScript console message once, at its level.
+        """
+        log_level, label = self.console_levels.get(level, (logging.DEBUG, "Debug"))
+        if logging.getLogger().isEnabledFor(log_level):
+            logging.log(log_level, f"JS {label} [{source}:{line}]: {message}", extra={"console": True})
+
+# Blocks non-essential requests (images, fonts, trackers, ...) during runs
+class LeanModeInterceptor(QWebEngineUrlRequestInterceptor):
+    """
+    Request interceptor for the lean_mode setting. It only blocks while
+    active is set, and counts blocked requests by type. Saved bytes are
+    estimated from the sizes the page reported for the same URLs, or the
+    average size of that resource type when a URL has not been seen.
+    """
+    resource_type_names = {
+        QWebEngineUrlRequestInfo.ResourceTypeMainFrame: "main_frame",
+        QWebEngineUrlRequestInfo.ResourceTypeSubFrame: "sub_frame",
+        QWebEngineUrlRequestInfo.ResourceTypeStylesheet: "stylesheet",
+        QWebEngineUrlRequestInfo.ResourceTypeScript: "script",
+        QWebEngineUrlRequestInfo.ResourceTypeImage: "image",
+        QWebEngineUrlRequestInfo.ResourceTypeFontResource: "font",
+        QWebEngineUrlRequestInfo.ResourceTypeMedia: "media",
+        QWebEngineUrlRequestInfo.ResourceTypeFavicon: "favicon",
+        QWebEngineUrlRequestInfo.ResourceTypeXhr: "xhr",
+        QWebEngineUrlRequestInfo.ResourceTypePing: "ping",
+    }
+    never_blocked_by_type = {"main_frame", "sub_frame", "xhr"}
+    # Used to group reported sizes by type for the per-type averages
+    extension_types = {
+        "png": "image", "jpg": "image", "jpeg": "image", "gif": "image", "svg": "image", "webp": "image",
+        "ico": "favicon", "woff": "font", "woff2": "font", "ttf": "font", "otf": "font", "eot": "font",
+        "css": "stylesheet", "js": "script", "mp4": "media", "webm": "media", "mp3": "media",
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.active = False
+        self.rules = default_settings["lean_mode"]
+        self.sizes = {}
+        self.lock = threading.Lock()  # interceptRequest runs on the network thread
+        self.reset_counts()
+
+    def start(self, rules, sizes):
+        """Start blocking with the given lean_mode rules and known resource sizes."""
+        with self.lock:
+            self.rules = rules
+            self.sizes = sizes
+            self.reset_counts()
+            self.active = True
+
+    def stop(self):
+        """Stop blocking and return the counts for the run."""
+        with self.lock:
+            self.active = False
+            return {"blocked": self.blocked, "byType": dict(self.blocked_by_type),
+                    "bytesSaved": self.bytes_saved, "unknownSizes": self.unknown_sizes}
+
+    def reset_counts(self):
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.bytes_saved = 0
+        self.unknown_sizes = 0
+
+    def interceptRequest(self, info):
+        if not self.active:
+            return
+        url = info.requestUrl().toString()
+        resource_type = self.resource_type_names.get(info.resourceType(), "other")
+        if any(allowed in url for allowed in self.rules["allow_urls"]):
+            return
+        blocked_by_type = (resource_type in self.rules["block_types"]
+                           and resource_type not in self.never_blocked_by_type)
+        if not blocked_by_type and not any(denied in url for denied in self.rules["block_urls"]):
+            return
+        info.block(True)
+        with self.lock:
+            self.blocked += 1
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            size = self.sizes.get(url.split("?")[0])
+            if size is None:
+                size = self.sizes.get("average:" + resource_type)
+                self.unknown_sizes += 1
+            self.bytes_saved += size or 0
+
+# Bridge object exposed to the injected script over QWebChannel
+class AutomationBridge(QObject):
+    """
+    Receives batches of typed events from the injected script and re-emits
+    them one at a time as event_received(event_type, event).
+    """
+    event_received = pyqtSignal(str, dict)
+
+    @pyqtSlot(str)
+    def postEvents(self, batch_json):
+        """Called from JavaScript with a JSON array of events."""
+        try:
+            events = json.loads(batch_json)
+        except ValueError as e:
+            logging.error(f"Discarding malformed event batch from script: {e}")
+            return
+        for event in events:
+            if isinstance(event, dict) and "type" in event:
+                self.event_received.emit(event["type"], event)
+
+# Read the qwebchannel.js client library bundled with Qt
+def load_qwebchannel_js():
+    qwebchannel_file = QFile(":/qtwebchannel/qwebchannel.js")
+    if not qwebchannel_file.open(QIODevice.ReadOnly):
+        logging.error("Could not load qwebchannel.js from Qt resources.")
+        return ""
+    content = bytes(qwebchannel_file.readAll()).decode("utf-8")
+    qwebchannel_file.close()
+    return content
+
+# Pool of extra pages sharing the logged-in profile, so several companies can
+# be processed at the same time
+class PagePool(QObject):
+    """
+    Offscreen pages that share a profile with the visible page. Each page has
+    its own event bridge; events are re-emitted as event_received(slot,
+    event_type, event). Pages are kept between runs and reloaded when a
+    health check fails or their renderer dies.
+    """
+    event_received = pyqtSignal(int, str, dict)
+    page_crashed = pyqtSignal(int)
+
+    def __init__(self, profile, parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.slots = []
+
+    def ensure_size(self, size, url):
+        """Create pages until the pool has size of them; new pages load url."""
+        while len(self.slots) < size:
+            index = len(self.slots)
+            page = WebEnginePage(self.profile, self)
+            if hasattr(page, "setVisible"):
+                page.setVisible(True)  # Chromium throttles timers on hidden pages
+            bridge = AutomationBridge(page)
+            bridge.event_received.connect(lambda event_type, event, index=index: self.event_received.emit(index, event_type, event))
+            channel = QWebChannel(page)
+            channel.registerObject("augdBridge", bridge)
+            page.setWebChannel(channel)
+            # healthy is None while loading; checks queued in waiters run once it has loaded
+            slot = {"page": page, "bridge": bridge, "channel": channel, "healthy": None, "waiters": [], "url": url}
+            page.loadFinished.connect(lambda ok, slot=slot: self.on_load_finished(slot, ok))
+            page.renderProcessTerminated.connect(lambda status, code, index=index: self.on_render_process_terminated(index, code))
+            self.slots.append(slot)
+            self.reload(index)
+        return self.slots[:size]
+
+    def reload(self, index):
+        slot = self.slots[index]
+        slot["healthy"] = None
+        slot["page"].setUrl(QUrl(slot["url"]))
+
+    def on_load_finished(self, slot, ok):
+        slot["healthy"] = ok
+        waiters, slot["waiters"] = slot["waiters"], []
+        for waiter in waiters:
+            waiter()
+
+    def on_render_process_terminated(self, index, exit_code):
+        """Mark a page unhealthy and reload it after its renderer died."""
+        logging.error(f"Pool page {index + 1} renderer terminated (exit code {exit_code}). Reloading it.")
+        self.reload(index)
+        self.page_crashed.emit(index)
+
+    def check_health(self, size, callback, timeout_ms):
+        """
+        Check that the first size pages are loaded and still show the control
+        panel, waiting up to timeout_ms for pages that are still loading or do
+        not answer. Pages that fail are reloaded; callback(healthy_slots)
+        receives the indexes of those that passed.
         """
-        log_message = f"JavaScript Console - Level: {level}, Message: {message}, Line: {line}, Source: {source}"
-        logging.info(log_message)
-
-        # Log the message based on its level
-        if level == 3:  # Error level
-            logging.error(f"JS Error [{source}:{line}]: {message}")
-        elif level == 2:  # Warning level
-            logging.warning(f"JS Warning [{source}:{line}]: {message}")
-        elif level == 1:  # Info level
-            logging.info(f"JS Info [{source}:{line}]: {message}")
+        results = {}
+
+        def on_result(index, ok):
+            if index in results:
+                return  # Answered after timing out, or timed out after answering
+            results[index] = bool(ok) and bool(self.slots[index]["healthy"])
+            if not results[index]:
+                logging.warning(f"Pool page {index + 1} failed its health check. Reloading it.")
+                self.reload(index)
+            if len(results) == size:
+                callback([index for index in range(size) if results[index]])
+
+        for index in range(size):
+            slot = self.slots[index]
+            probe = lambda index=index, slot=slot: slot["page"].runJavaScript(
+                "document.readyState === 'complete' && !!document.querySelector('#header_nav')",
+                lambda ok: on_result(index, ok)
+            )
+            QTimer.singleShot(timeout_ms, lambda index=index: on_result(index, False))
+            if slot["healthy"] is None:
+                slot["waiters"].append(probe)
+            else:
+                probe()
+
+    def run_javascript(self, script):
+        """Run a script on every page in the pool."""
+        for slot in self.slots:
+            slot["page"].runJavaScript(script)
+
+# Bar chart of the last companies' durations, split into wait and work time
+# where the script reported it
+class CompanyLatencyChart(QWidget):
+    bar_count = 60
+    colors = {"total": QColor("#5b8bd9"), "wait": QColor("#d9a05b"), "axis": QColor("#696f75")}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.samples = deque(maxlen=self.bar_count)  # (duration ms, wait ms or None)
+        self.setMinimumSize(240, 60)
+        self.setToolTip("Last companies' durations; the orange part is time spent waiting")
+
+    def add(self, duration_ms, wait_ms=None):
+        self.samples.append((duration_ms, wait_ms))
+
+    def clear(self):
+        self.samples.clear()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        width, height = self.width(), self.height()
+        painter.setPen(self.colors["axis"])
+        painter.drawLine(0, height - 1, width, height - 1)
+        if not self.samples:
+            return
+        scale = (height - 2) / max(max(duration for duration, _ in self.samples), 1)
+        bar_width = width / self.bar_count
+        for position, (duration, wait) in enumerate(self.samples):
+            left = int(position * bar_width)
+            bar = max(int(bar_width) - 1, 1)
+            total_height = max(int(duration * scale), 1)
+            painter.fillRect(left, height - 1 - total_height, bar, total_height, self.colors["total"])
+            if wait:
+                wait_height = int(min(wait, duration) * scale)
+                painter.fillRect(left, height - 1 - wait_height, bar, wait_height, self.colors["wait"])
+
+# Live progress of a run: counters are updated from the script's events, and
+# the labels and chart are repainted at most every refresh_ms while the run is
+# active, however fast the events arrive
+class RunDashboard(QWidget):
+    refresh_ms = 250
+    rate_window = 300  # Seconds of history behind groups/min and the ETA
+    sample_interval = 1.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(24)
+        self.labels = {}
+        for name in ("companies", "groups", "rate", "eta", "step"):
+            label = QLabel("-", self)
+            layout.addWidget(label, 1 if name == "step" else 0)
+            self.labels[name] = label
+        self.chart = CompanyLatencyChart(self)
+        layout.addWidget(self.chart)
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.refresh_ms)
+        self.timer.timeout.connect(self.refresh)
+        self.handlers = {
+            "companies_selected": self.on_companies_selected,
+            "company_started": self.on_company_started,
+            "company_finished": self.on_company_finished,
+            "group_inspected": self.on_group_inspected,
+            "group_deleted": self.on_group_deleted,
+            "step_started": self.on_step_started,
+        }
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.done = 0
+        self.inspected = 0
+        self.deleted = 0
+        self.company = None
+        self.step = None
+        self.samples = deque()  # (time, companies done, groups inspected), one per sample_interval
+        self.started = time.monotonic()
+        self.chart.clear()
+        self.dirty = self.chart_dirty = True
+
+    def start_run(self):
+        """Clear the counters and start repainting; call when a run starts."""
+        self.reset()
+        self.show()
+        self.timer.start()
+
+    def finish_run(self):
+        """Show the final counters and stop repainting."""
+        self.timer.stop()
+        self.company = self.step = None
+        self.dirty = True
+        self.refresh()
+
+    def on_event(self, event_type, event):
+        handler = self.handlers.get(event_type)
+        if handler:
+            handler(event)
+            self.dirty = True
+
+    def on_companies_selected(self, event):
+        # One event per page or engine: the companies it will process, and those a resumed run already finished
+        self.total += event["selected"] + event["skipped"]
+        self.done += event["skipped"]
+
+    def on_company_started(self, event):
+        self.company = event["company"]
+
+    def on_company_finished(self, event):
+        self.done += 1
+        timing = event.get("timing")
+        self.chart.add(event["durationMs"], timing[0] if timing else None)
+        self.chart_dirty = True
+
+    def on_group_inspected(self, event):
+        self.inspected += 1
+
+    def on_group_deleted(self, event):
+        self.deleted += 1
+
+    def on_step_started(self, event):
+        self.step = event["step"]
+
+    def rates(self, now):
+        """(companies/sec, groups/min) over the last rate_window seconds, or None until there is history."""
+        if not self.samples or now - self.samples[-1][0] >= self.sample_interval:
+            self.samples.append((now, self.done, self.inspected))
+        while now - self.samples[0][0] > self.rate_window:
+            self.samples.popleft()
+        then, done_then, inspected_then = self.samples[0]
+        if now - then < self.sample_interval:
+            return None
+        return (self.done - done_then) / (now - then), (self.inspected - inspected_then) * 60 / (now - then)
+
+    def refresh(self):
+        now = time.monotonic()
+        if not self.dirty and self.samples and now - self.samples[-1][0] < self.sample_interval:
+            return  # Nothing new, and the rates are still current
+        rates = self.rates(now)
+        self.labels["companies"].setText(f"Companies {self.done}/{self.total or '?'}")
+        self.labels["groups"].setText(f"Groups {self.inspected} inspected, {self.deleted} deleted")
+        self.labels["rate"].setText(f"{rates[1]:.0f} groups/min" if rates else "- groups/min")
+        if not self.timer.isActive():
+            eta = f"Took {timedelta(seconds=round(now - self.started))}"
+        elif rates and rates[0] > 0:
+            eta = f"ETA {timedelta(seconds=round(max(self.total - self.done, 0) / rates[0]))}"
         else:
-            logging.debug(f"JS Debug [{source}:{line}]: {message}")
+            eta = "ETA -"
+        self.labels["eta"].setText(eta)
+        step = " / ".join(part for part in (self.company, self.step) if part)
+        self.labels["step"].setText(f"Now: {step}" if step else "Now: -")
+        if self.chart_dirty:
+            self.chart.update()  # Schedules a single repaint
+            self.chart_dirty = False
+        self.dirty = False
 
 # Main application window class
 class MainWindow(QMainWindow):
-    def __init__(self):
+    log_search_finished = pyqtSignal(str)  # Results of a log search run off the GUI thread
+
+    def __init__(self, headless=False, viewport=(1200, 800), resume=False):
+        """
+        With headless set, the run starts as soon as the page has loaded,
+        progress is printed to stdout and the application exits with one of
+        the exit_codes when the run ends.
+        """
         super().__init__()
+        self.headless = headless
+        self.headless_resume = resume
+        self.headless_started = False  # Set once the first page load has started the unattended run
+        self.progress_total = 0
         self.setWindowTitle("AUGD - Automated User Group Deletion")
         self.setGeometry(100, 100, 1200, 800)  # Set the window size and position
 
@@ -94,14 +2068,51 @@ class MainWindow(QMainWindow):
 
         # Initialize the QWebEngineView to display the webpage
         self.webview = QWebEngineView()
-        self.webview.setFixedSize(1200, 800)  # Set the size of the web view
+        self.webview.setFixedSize(*viewport)  # Set the size of the web view
 
-        # Use the custom WebEnginePage to capture console messages
-        self.page = WebEnginePage()
+        # Use the custom WebEnginePage to capture console messages, on the persistent profile
+        self.profile = create_browser_profile(load_settings()["browser_profile"])
+        self.page = WebEnginePage(self.profile, self.webview)
         self.webview.setPage(self.page)
+        self.warmup_page = None
+        self.warmed_up = False
+
+        # Collect the session cookies so the HTTP engine can reuse the login
+        self.cookies = {}
+        cookie_store = self.page.profile().cookieStore()
+        cookie_store.cookieAdded.connect(self.on_cookie_added)
+        cookie_store.cookieRemoved.connect(self.on_cookie_removed)
+        cookie_store.loadAllCookies()
+
+        # Lean mode request filter, active only while a run is in progress
+        self.interceptor = LeanModeInterceptor(self)
+        self.page.profile().setUrlRequestInterceptor(self.interceptor)
+
+        # Expose the event bridge to the page before it loads
+        self.bridge = AutomationBridge(self)
+        self.bridge.event_received.connect(self.on_bridge_event)
+        self.channel = QWebChannel(self.page)
+        self.channel.registerObject("augdBridge", self.bridge)
+        self.page.setWebChannel(self.channel)
+        self.event_handlers = {
+            "company_started": self.on_company_started,
+            "company_finished": self.on_company_finished,
+            "group_inspected": self.on_group_inspected,
+            "group_deleted": self.on_group_deleted,
+            "error": self.on_script_error,
+            "run_complete": self.on_script_finished,
+            "latency_profile": self.on_latency_profile,
+            "api_endpoints": self.on_api_endpoints,
+            "resource_sizes": self.on_resource_sizes,
+            "inventory_plan": self.on_inventory_plan,
+            "step": lambda event: None,  # Only written to the action log
+            "company_list": self.on_company_list,
+            "step_started": lambda event: None,  # Only shown on the dashboard
+            "companies_selected": lambda event: None,
+        }
 
         # Load the target URL into the web view
-        self.webview.setUrl(QUrl("https://cp.hivepbx.com"))
+        self.webview.setUrl(QUrl(load_settings()["start_url"]))
         self.webview.loadFinished.connect(self.on_page_load)  # Connect the load signal
         layout.addWidget(self.webview)  # Add the web view to the layout
 
@@ -113,6 +2124,11 @@ class MainWindow(QMainWindow):
         self.run_button.clicked.connect(self.run_script)  # Connect to run_script method
         hbox.addWidget(self.run_button)
 
+        # Resume Run button, enabled when an interrupted run can be continued
+        self.resume_button = QPushButton("Resume Run", self)
+        self.resume_button.clicked.connect(self.resume_script)  # Connect to resume_script method
+        hbox.addWidget(self.resume_button)
+
         # Stop Script button
         self.stop_button = QPushButton("Stop Script", self)
         self.stop_button.clicked.connect(self.stop_script)  # Connect to stop_script method
@@ -127,489 +2143,2741 @@ class MainWindow(QMainWindow):
         # Add the horizontal layout to the main layout
         layout.addLayout(hbox)
 
+        # Live progress of the current run, shown once a run starts
+        self.dashboard = RunDashboard(self)
+        self.dashboard.hide()
+        layout.addWidget(self.dashboard)
+
+        # Log search: query box, with results shown below it once a search ran
+        self.search_box = QLineEdit(self)
+        self.search_box.setPlaceholderText('Search logs, e.g. action:deleted company:"Acme" group:Sales')
+        self.search_box.returnPressed.connect(self.search_logs)
+        layout.addWidget(self.search_box)
+        self.search_results = QPlainTextEdit(self)
+        self.search_results.setReadOnly(True)
+        self.search_results.setMaximumHeight(200)
+        self.search_results.hide()
+        layout.addWidget(self.search_results)
+        self.log_search_finished.connect(self.on_log_search_finished)
+
+        # Timing breakdown of the last run, shown when the run ends
+        self.timing_view = QPlainTextEdit(self)
+        self.timing_view.setReadOnly(True)
+        self.timing_view.setMaximumHeight(240)
+        self.timing_view.setStyleSheet("font-family: monospace;")
+        self.timing_view.hide()
+        layout.addWidget(self.timing_view)
+
         # Initialize the status bar
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
 
-        # Flag to track if the script is running
+        # Flag to track if the script is running. After Stop, stopping stays set
+        # (and is_running with it) until the run's run_complete arrives.
         self.is_running = False
+        self.stopping = False
+        self.run_count = 0
+        self.run_token = None  # Tags the current run's events; events from older runs are ignored
+
+        # Journal of finished work, used to resume interrupted runs
+        self.journal = RunJournal()
+        self.run_id = None
+        self.engine_stop = threading.Event()  # Stops the HTTP engine between companies; a new one per run
+        self.pending_company_list = None  # Starts the HTTP engine once the script has listed the companies
+
+        # Fingerprints of compliant companies, loaded at the start of each run
+        self.company_cache = CompanyCache()
+        self.structured_log = False
+        self.production_logging = False
+        self.detail_company = ""
+        self.cache_fingerprints = None
+        self.cache_evicted = 0
+        self.company_timings = []  # (name, value, duration ms, [wait ms, work ms]) per finished company
+
+        # Extra pages for parallel runs, created on first use and kept between runs
+        self.page_pool = PagePool(self.profile, self)
+        self.page_pool.event_received.connect(self.on_pool_event)
+        self.page_pool.page_crashed.connect(self.on_pool_page_crashed)
+        self.pool_progress = None  # Per-page progress while a pooled run is active
+        self.resume_button.setEnabled(self.journal.resumable_run() is not None)
 
-    def inject_javascript(self):
-        """Directly inject JavaScript into the webpage."""
+    def inject_javascript(self, skip_companies=(), page=None, company_slice=(0, 1), list_companies=False):
+        """
+        Directly inject JavaScript into the webpage, or into page if given.
+        company_slice (index, count) limits the page to every count-th company.
+        With list_companies, the script only opens the User Groups page and
+        sends its company list as a company_list event.
+        """
         logging.info("Injecting JavaScript...")
         self.status_label.setText(f"Status: Injecting JavaScript... [{get_timestamp()}]")
 
         # JavaScript code to automate user group management
         script = """
-let hasProcessedEveryoneGroupWithMembers = false;
+var hasProcessedEveryoneGroupWithMembers = false;
+var skipCompanies = new Set(AUGD_CONFIG.skip_companies);  // Already finished in the run being resumed
+var companySlice = AUGD_CONFIG.company_slice;  // [index, count]: this page takes every count-th company
 
-// Function to introduce a delay
-async function delay(ms) {
-    return new Promise(resolve => setTimeout(resolve, ms));
+// Apply the company_filter setting (value or name, case-insensitive)
+function companyAllowed(value, name) {
+    const keys = [String(value).toLowerCase(), name.toLowerCase()];
+    const include = AUGD_CONFIG.company_filter.include.map(entry => String(entry).toLowerCase());
+    const exclude = AUGD_CONFIG.company_filter.exclude.map(entry => String(entry).toLowerCase());
+    return (include.length === 0 || keys.some(key => include.includes(key))) && !keys.some(key => exclude.includes(key));
 }
+var currentCompany = null;  // Company being processed, with its running counters
 
-// Function to wait for an element to appear
-async function waitForElementAppear(selector, timeout = 20000) {
-    return new Promise((resolve, reject) => {
-        const startTime = Date.now();
-        const checkExist = setInterval(() => {
-            const element = document.querySelector(selector);
-            if (element) {
-                clearInterval(checkExist);
-                resolve(element);
-            } else if (Date.now() - startTime >= timeout) {
-                clearInterval(checkExist);
-                console.error(`Element ${selector} did not appear within ${timeout} ms`);
-                reject(new Error(`Element ${selector} did not appear within ${timeout} ms`));
-            }
-        }, 100);
-    });
+// Logging convention: console.info is for run-level summaries and always
+// kept; console.log is per-company and per-group detail, which production
+// verbosity removes before injection (or routes through debugLog)
+
+// Detail logging for log_detail_company only, used by production verbosity
+function debugLog(...args) {
+    const detail = String(AUGD_CONFIG.log_detail_company).toLowerCase();
+    if (currentCompany && (String(currentCompany.value).toLowerCase() === detail || currentCompany.name.toLowerCase() === detail)) {
+        console.log.apply(console, args);  // Not a console.log( statement, so never stripped itself
+    }
 }
+var activeGroup = null;  // Group being changed, for the structured action log
+var runStats = { companies: 0, inspected: 0, deleted: 0, errors: 0, cacheHits: 0, cacheMisses: 0, startTime: performance.now() };
+var companyCache = AUGD_CONFIG.company_fingerprints;  // {company value: fingerprint} of compliant companies, or null when disabled
 
-// Function to wait for an element to be removed
-async function waitForElementRemoved(selector, timeout = 10000) {
-    return new Promise((resolve, reject) => {
-        const startTime = Date.now();
-        const checkExist = setInterval(() => {
-            const element = document.querySelector(selector);
-            if (!element) {
-                clearInterval(checkExist);
-                resolve();
-            } else if (Date.now() - startTime >= timeout) {
-                clearInterval(checkExist);
-                reject(new Error(`Element ${selector} did not disappear within ${timeout} ms`));
-            }
-        }, 100);
-    });
+// Structured event bridge to Python over QWebChannel. Events are queued and
+// sent in batches so high-volume runs do not flood the IPC channel.
+var bridge = window.augdBridge || (window.augdBridge = { queue: [], timer: null, target: null, ready: null });
+if (!bridge.ready) {
+    bridge.ready = new Promise(resolve => {
+        new QWebChannel(qt.webChannelTransport, channel => {
+            bridge.target = channel.objects.augdBridge;
+            resolve(bridge.target);
+        });
+    }).then(flushEvents);
 }
 
-// Function to reopen a group by its index
-async function reopenGroup(groupIndex) {
-    let clickableElement = document.querySelector(`#groupID${groupIndex} > div.panel-heading > h4 > a`);
-    
-    // Check if the group name is null
-    await waitForElementRemoved('.spinner', 10000);
-    if (clickableElement && clickableElement.textContent.trim() !== "") {
-        clickableElement.click();
-        console.log(`Reopened group ID ${groupIndex}`);
-        await waitForElementRemoved('.spinner', 10000);
-        await delay(75);
-    } else {
-        console.warn(`Skipping group ID ${groupIndex} because the group name is null or empty.`);
-        return false;
+// Queue a typed event for Python, tagged with the run it belongs to
+function emitEvent(type, data) {
+    bridge.queue.push(Object.assign({ type: type, time: Date.now(), runToken: AUGD_CONFIG.run_token }, data));
+    if (bridge.queue.length >= AUGD_CONFIG.bridge_batch_size) {
+        flushEvents();
+    } else if (!bridge.timer) {
+        bridge.timer = setTimeout(flushEvents, AUGD_CONFIG.bridge_flush_ms);
     }
-    return true;
 }
 
-// Main automation function
-async function automateUserGroupManagement() {
-    console.log(`Inside automateUserGroupManagement function...`);
-    let dropdown = await waitForElementAppear('#header_nav > div > div.row.top-menu > div > ul > li.profile > div > div.media-body.dropdown > a');
-    console.log(`Dropdown element found:`, dropdown);
-    dropdown.click();  // Open the navigation dropdown
-    console.log(`Opened navigation dropdown.`);
-    await waitForElementRemoved('.spinner', 10000);
-    await delay(75);
-
-    let userGroupsLink = await waitForElementAppear('#header_nav > div > div.row.top-menu > div > ul > li.profile > div > div.media-body.dropdown > ul > li:nth-child(5) > a');
-    console.log(`User groups link found:`, userGroupsLink);
-    userGroupsLink.click();  // Navigate to User Groups page
-    console.log(`Navigated to User Groups page.`);
-    await waitForElementRemoved('.spinner', 10000);
-    await delay(75);
-
-    await processAllCompanies();  // Start processing companies
+// Send all queued events in one call (kept queued until the channel is ready)
+function flushEvents() {
+    clearTimeout(bridge.timer);
+    bridge.timer = null;
+    if (!bridge.target || bridge.queue.length === 0) {
+        return;
+    }
+    const batch = bridge.queue;
+    bridge.queue = [];
+    bridge.target.postEvents(JSON.stringify(batch));
 }
 
-// Function to wait for user groups to appear
-async function waitForUserGroups(timeout = 500) {
-    return new Promise((resolve, reject) => {
-        const startTime = Date.now();
-        const checkExist = setInterval(() => {
-            let groups = document.querySelectorAll('.panel-collapse');  // Update this selector if needed
-            if (groups.length > 0) {
-                console.log(`User groups found: ${groups.length}`);
-                clearInterval(checkExist);
-                resolve(groups);
-            } else if (Date.now() - startTime >= timeout) {
-                clearInterval(checkExist);
-                console.warn(`No user groups found within ${timeout} ms for this company.`);
-                resolve(null);  // Resolve with null if no user groups found
-            }
-        }, 100); // Check every 100ms
-    });
+// True once the user has clicked "Stop Script" for this run. Each run has
+// its own token, so starting a run never clears an earlier run's stop.
+function stopRequested() {
+    return !!(window.augdStopTokens && window.augdStopTokens[AUGD_CONFIG.run_token]);
 }
 
-// Function to process all companies
-async function processAllCompanies() {
-    console.log(`Inside processAllCompanies function...`);
-    let companySelect = document.querySelector('#company_data');
-    await waitForElementRemoved('.spinner', 10000);  // Wait for the spinner to disappear before proceeding
-    if (!companySelect) {
-        console.error("Company select element not found!");
-        return;
+// Log an error and report it to Python
+function reportError(message, error) {
+    const detail = error ? `${message} ${error.message || error}` : message;
+    console.error(detail);
+    runStats.errors++;
+    if (currentCompany) {
+        currentCompany.errors++;
     }
+    emitEvent('error', { message: detail, company: currentCompany ? currentCompany.name : null });
+}
 
-    let companies = document.querySelectorAll('#company_data option');
-    console.log(`Found ${companies.length} companies in the hidden dropdown.`);
-
-    // Iterate over each company
-    for (let i = 0; i < companies.length; i++) {
-        const option = companies[i];
-        const companyName = option.textContent.trim();
-        const companyValue = option.value;
+// Function to introduce a delay
+async function delay(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
 
-        console.log(`Processing company (${i + 1}/${companies.length}): ${companyName}`);
+// Event-driven wait engine. Every wait registers a condition with one shared
+// MutationObserver; pending conditions are re-checked whenever the DOM changes
+// and resolve as soon as they hold, instead of polling on a fixed interval.
+var waitEngine = window.augdWaitEngine || (window.augdWaitEngine = {
+    pending: new Set(),
+    observer: null,
+    stats: { resolved: 0, timedOut: 0, totalMs: 0, maxMs: 0, byName: {}, recent: [] }
+});
 
-        // Reset the flag for each new company
-        hasProcessedEveryoneGroupWithMembers = false;
-        console.log(`Flag set: hasProcessedEveryoneGroupWithMembers = false for company: ${companyName}`);
+// Wait names are grouped with group indices folded out, e.g. "appear #collapse#"
+function waitStatsEntry(name) {
+    const key = name.replace(/[0-9]+/g, '#');
+    return waitEngine.stats.byName[key] || (waitEngine.stats.byName[key] = { count: 0, totalMs: 0, maxMs: 0, timedOut: 0 });
+}
 
-        companySelect.value = companyValue;  // Select the company
-        await waitForElementRemoved('.spinner', 10000);  // Wait for spinner to disappear
-        await delay(500); // Added delay to ensure company data is fully loaded
-        companySelect.dispatchEvent(new Event('change'));  // Trigger change event
+// Record how long a resolved wait took
+function recordWait(name, elapsed) {
+    const stats = waitEngine.stats;
+    stats.resolved++;
+    stats.totalMs += elapsed;
+    stats.maxMs = Math.max(stats.maxMs, elapsed);
+    const entry = waitStatsEntry(name);
+    entry.count++;
+    entry.totalMs += elapsed;
+    entry.maxMs = Math.max(entry.maxMs, elapsed);
+    stats.recent.push({ name: name, ms: Math.round(elapsed) });
+    if (stats.recent.length > 200) {
+        stats.recent.shift();  // Keep only the most recent waits
+    }
+}
 
-        await waitForElementRemoved('.spinner', 10000);
-        await delay(1000); // Extra delay after the spinner disappears
+// Remove a wait from the pending set and release the observer when idle
+function releaseWait(wait) {
+    clearTimeout(wait.timer);
+    waitEngine.pending.delete(wait);
+    if (waitEngine.pending.size === 0 && waitEngine.observer) {
+        waitEngine.observer.disconnect();
+        waitEngine.observer = null;
+    }
+}
+
+// Re-check every pending wait after a batch of DOM mutations
+function checkPendingWaits() {
+    for (const wait of Array.from(waitEngine.pending)) {
+        let result = null;
+        try {
+            result = wait.check();
+        } catch (error) {
+            result = null;
+        }
+        if (result) {
+            releaseWait(wait);
+            recordWait(wait.name, performance.now() - wait.startTime);
+            wait.resolve(result);
+        }
+    }
+}
+
+// Wait until check() returns a truthy value, or reject after the timeout
+function waitForCondition(name, check, timeout) {
+    const startTime = performance.now();
+    const immediate = check();
+    if (immediate) {
+        recordWait(name, 0);
+        return Promise.resolve(immediate);
+    }
+    return new Promise((resolve, reject) => {
+        const wait = { name: name, check: check, resolve: resolve, startTime: startTime, timer: null };
+        wait.timer = setTimeout(() => {
+            releaseWait(wait);
+            waitEngine.stats.timedOut++;
+            waitStatsEntry(name).timedOut++;
+            const error = new Error(`${name} did not complete within ${timeout} ms`);
+            error.name = 'WaitTimeout';
+            reject(error);
+        }, timeout);
+        addPendingWait(wait);
+    });
+}
+
+// Register a wait and connect the shared observer if it is not already running
+function addPendingWait(wait) {
+    waitEngine.pending.add(wait);
+    if (!waitEngine.observer) {
+        waitEngine.observedSince = performance.now();
+        waitEngine.observer = new MutationObserver(() => {
+            waitEngine.lastMutation = performance.now();
+            checkPendingWaits();
+        });
+        waitEngine.observer.observe(document.documentElement, {
+            childList: true,
+            subtree: true,
+            characterData: true,
+            attributes: true,
+            attributeFilter: ['style', 'class', 'disabled']
+        });
+    }
+}
+
+// Keep the shared observer connected for ms and resolve with the time of the
+// last DOM mutation seen in that window (0 if the DOM did not change)
+function watchMutations(ms) {
+    return new Promise(resolve => {
+        const startTime = performance.now();
+        const wait = { name: 'watch', check: () => false, resolve: null, startTime: startTime, timer: null };
+        wait.timer = setTimeout(() => {
+            const lastMutation = waitEngine.lastMutation || 0;
+            releaseWait(wait);
+            resolve(lastMutation > startTime ? lastMutation : 0);
+        }, ms);
+        addPendingWait(wait);
+    });
+}
+
+// Log a summary of all waits resolved so far
+function logWaitStats() {
+    const stats = waitEngine.stats;
+    const average = stats.resolved ? (stats.totalMs / stats.resolved).toFixed(1) : 0;
+    console.info(`Wait engine: ${stats.resolved} waits resolved (avg ${average} ms, max ${Math.round(stats.maxMs)} ms), ${stats.timedOut} timed out.`);
+    for (const [name, entry] of Object.entries(stats.byName)) {
+        const entryAverage = entry.count ? (entry.totalMs / entry.count).toFixed(1) : 0;
+        console.info(`Wait engine: ${name} - ${entry.count} resolved, avg ${entryAverage} ms, max ${Math.round(entry.maxMs)} ms, ${entry.timedOut} timed out.`);
+    }
+}
+
+// Function to wait for an element to appear
+async function waitForElementAppear(selector, timeout = 20000) {
+    try {
+        return await waitForCondition(`appear ${selector}`, () => document.querySelector(selector), timeout);
+    } catch (error) {
+        console.error(`Element ${selector} did not appear within ${timeout} ms`);
+        throw new Error(`Element ${selector} did not appear within ${timeout} ms`);
+    }
+}
+
+// Function to wait for an element to be removed
+async function waitForElementRemoved(selector, timeout = 10000) {
+    try {
+        await waitForCondition(`removed ${selector}`, () => !document.querySelector(selector), timeout);
+    } catch (error) {
+        throw new Error(`Element ${selector} did not disappear within ${timeout} ms`);
+    }
+}
+
+// In-page request tracker. XMLHttpRequest and fetch are wrapped once per page
+// so the script knows how many requests are in flight and when the last one
+// started or finished.
+var requestTracker = window.augdRequestTracker || (window.augdRequestTracker = installRequestTracker());
+
+// Request headers that carry credentials or anti-forgery tokens. They are
+// never saved with a learned endpoint; replays send the page's current ones.
+var credentialHeaderPattern = /^(authorization|proxy-authorization|cookie)$|csrf|xsrf/i;
+
+function withoutCredentialHeaders(headers) {
+    return Object.fromEntries(Object.entries(headers || {}).filter(([name]) => !credentialHeaderPattern.test(name)));
+}
+
+// The credential and anti-forgery headers the page currently sends: the last
+// values seen on its own requests, else a csrf-token meta tag or XSRF-TOKEN cookie
+function sessionHeaders() {
+    const headers = Object.assign({}, requestTracker.credentials);
+    if (!Object.keys(headers).some(name => /csrf|xsrf/.test(name))) {
+        const meta = document.querySelector('meta[name="csrf-token"]');
+        const cookie = document.cookie.split('; ').find(pair => pair.startsWith('XSRF-TOKEN='));
+        if (meta && meta.content) {
+            headers['x-csrf-token'] = meta.content;
+        } else if (cookie) {
+            headers['x-xsrf-token'] = decodeURIComponent(cookie.slice('XSRF-TOKEN='.length));
+        }
+    }
+    return headers;
+}
+
+function installRequestTracker() {
+    // active maps each request that can hold up a settle to its start time
+    const tracker = { active: new Map(), total: 0, lastActivity: performance.now(), seq: 0, log: [], credentials: {} };
+    const notify = () => {
+        tracker.lastActivity = performance.now();
+        // Let pending waits (e.g. waitForPageSettled) react to the change
+        if (window.augdWaitEngine && window.augdWaitEngine.pending.size > 0) {
+            queueMicrotask(checkPendingWaits);
+        }
+    };
+    const begin = entry => {
+        if (!(AUGD_CONFIG.settle_ignore_urls || []).some(part => entry.url.includes(part))) {
+            tracker.active.set(entry, performance.now());
+        }
+        tracker.total++;
+        notify();
+    };
+    const end = entry => {
+        tracker.active.delete(entry);
+        notify();
+    };
+
+    // Keep the most recent requests so the API execution mode can learn the
+    // endpoints the page itself uses
+    const record = (method, url, body, headers) => {
+        const entry = {
+            seq: ++tracker.seq,
+            method: (method || 'GET').toUpperCase(),
+            url: new URL(String(url), location.href).href,
+            body: typeof body === 'string' ? body : null,
+            headers: headers || {},
+            status: null,
+            response: null
+        };
+        tracker.log.push(entry);
+        if (tracker.log.length > 50) {
+            tracker.log.shift();
+        }
+        for (const [name, value] of Object.entries(entry.headers)) {
+            if (credentialHeaderPattern.test(name) && name.toLowerCase() !== 'cookie') {
+                tracker.credentials[name.toLowerCase()] = value;  // Kept in memory only, for replays
+            }
+        }
+        return entry;
+    };
+    const keepResponse = text => (typeof text === 'string' && text.length <= 200000 ? text : null);
+
+    const originalOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.augdRequest = { method: method, url: url, headers: {} };
+        return originalOpen.apply(this, arguments);
+    };
+    const originalSetRequestHeader = XMLHttpRequest.prototype.setRequestHeader;
+    XMLHttpRequest.prototype.setRequestHeader = function (name, value) {
+        if (this.augdRequest) {
+            this.augdRequest.headers[name] = value;
+        }
+        return originalSetRequestHeader.apply(this, arguments);
+    };
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function (body) {
+        const info = this.augdRequest || {};
+        const entry = record(info.method, info.url || '', body, info.headers);
+        begin(entry);
+        this.addEventListener('loadend', () => {
+            entry.status = this.status;
+            if (this.responseType === '' || this.responseType === 'text') {
+                entry.response = keepResponse(this.responseText);
+            }
+            end(entry);
+        }, { once: true });
+        try {
+            return originalSend.apply(this, arguments);
+        } catch (error) {
+            end(entry);
+            throw error;
+        }
+    };
+
+    const originalFetch = window.fetch;
+    window.fetch = function (input, init) {
+        const options = init || {};
+        const url = typeof input === 'string' ? input : (input && input.url) || String(input);
+        const headers = {};
+        if (options.headers) {
+            new Headers(options.headers).forEach((value, name) => {
+                headers[name] = value;
+            });
+        }
+        const entry = record(options.method || (input && input.method), url, options.body, headers);
+        begin(entry);
+        return originalFetch.apply(this, arguments).then(response => {
+            entry.status = response.status;
+            response.clone().text().then(text => {
+                entry.response = keepResponse(text);
+            }, () => {});
+            return response;
+        }).finally(() => end(entry));
+    };
+    return tracker;
+}
+
+// Milliseconds until the youngest request still holding up a settle passes
+// settle_request_cap_ms, or 0 when none is
+function requestHoldMs(now) {
+    let hold = 0;
+    for (const started of requestTracker.active.values()) {
+        hold = Math.max(hold, AUGD_CONFIG.settle_request_cap_ms - (now - started));
+    }
+    return hold;
+}
+
+// Wait until no request is in flight and the DOM has stopped changing
+async function waitForPageSettled(label, timeout = AUGD_CONFIG.settle_timeout_ms) {
+    const networkQuiet = AUGD_CONFIG.network_quiet_ms;
+    const domQuiet = AUGD_CONFIG.dom_quiet_ms;
+    let recheckTimer = null;
+    try {
+        await waitForCondition(`settled ${label}`, () => {
+            clearTimeout(recheckTimer);
+            const now = performance.now();
+            const hold = requestHoldMs(now);
+            if (hold > 0) {
+                // The tracker re-checks when a request ends; this covers one outliving the cap
+                recheckTimer = setTimeout(checkPendingWaits, hold);
+                return false;
+            }
+            // Mutations are only seen while the shared observer is connected
+            const observedSince = waitEngine.observer ? waitEngine.observedSince : now;
+            const lastMutation = Math.max(waitEngine.lastMutation || 0, observedSince);
+            const remaining = Math.max(
+                networkQuiet - (now - requestTracker.lastActivity),
+                domQuiet - (now - lastMutation)
+            );
+            if (remaining <= 0) {
+                return true;
+            }
+            // Nothing else will wake us once the page goes quiet, so schedule a re-check
+            recheckTimer = setTimeout(checkPendingWaits, remaining);
+            return false;
+        }, timeout);
+    } finally {
+        clearTimeout(recheckTimer);
+    }
+}
+
+// Wait for the page to settle after a step, or sleep the fixed fallback delay
+async function settle(label, fallbackMs) {
+    await waitSpinner(label);
+    const startTime = performance.now();
+    if (!AUGD_CONFIG.wait_for_network_idle) {
+        await delay(fallbackMs);
+        reportStep(`settle ${label}`, performance.now() - startTime, 'ok');
+        return;
+    }
+    try {
+        await waitForPageSettled(label);
+        reportStep(`settle ${label}`, performance.now() - startTime, 'ok');
+    } catch (error) {
+        console.warn(`Page did not settle (${label}) within ${AUGD_CONFIG.settle_timeout_ms} ms. Falling back to a fixed ${fallbackMs} ms delay.`);
+        await delay(fallbackMs);
+        reportStep(`settle ${label}`, performance.now() - startTime, 'timeout');
+    }
+}
+
+// Adaptive step-latency controller. Every named step records how long its
+// waits and the page activity after it actually took. Once a step has enough
+// samples, its delay and timeout come from a rolling percentile of those samples
+// plus a safety margin instead of the hard-coded values. The profile is handed
+// back to Python at the end of the run and passed in again on the next one.
+var latency = window.augdLatency || (window.augdLatency = { steps: {}, loaded: false });
+if (!latency.loaded) {
+    const savedProfile = AUGD_CONFIG.latency_profile;
+    latency.steps = savedProfile && savedProfile.steps ? savedProfile.steps : {};
+    latency.loaded = true;
+}
+
+// Return the p-th percentile of a list of samples
+function percentile(values, p) {
+    const sorted = values.slice().sort((a, b) => a - b);
+    const index = Math.ceil(p / 100 * sorted.length) - 1;
+    return sorted[Math.min(sorted.length - 1, Math.max(0, index))];
+}
+
+// Add a sample for a step ('waits' or 'pauses'), keeping a rolling window
+function recordStepSample(step, kind, ms) {
+    const entry = latency.steps[step] || (latency.steps[step] = { waits: [], pauses: [] });
+    entry[kind].push(Math.round(ms));
+    if (entry[kind].length > AUGD_CONFIG.latency.window) {
+        entry[kind].shift();
+    }
+}
+
+// Samples to learn from, or null while the step is still using its fixed value
+function learnedSamples(step, kind) {
+    if (!AUGD_CONFIG.adaptive_latency) {
+        return null;
+    }
+    const entry = latency.steps[step];
+    const samples = entry ? entry[kind] : null;
+    return samples && samples.length >= AUGD_CONFIG.latency.min_samples ? samples : null;
+}
+
+// Timeout for a step's wait: a high percentile of past waits times the
+// margin. The fixed timeout is the floor, so learning can only raise it.
+function stepTimeout(step, fallbackMs) {
+    const samples = learnedSamples(step, 'waits');
+    if (!samples) {
+        return fallbackMs;
+    }
+    const config = AUGD_CONFIG.latency;
+    const learned = percentile(samples, config.timeout_percentile) * config.timeout_margin;
+    const floor = Math.max(config.min_timeout_ms, fallbackMs);
+    return Math.round(Math.max(floor, Math.min(config.max_timeout_ms, learned)));
+}
+
+// Delay after a step: how long the page kept changing after it, plus the margin
+function stepDelay(step, fallbackMs) {
+    const samples = learnedSamples(step, 'pauses');
+    if (!samples) {
+        return fallbackMs;
+    }
+    const config = AUGD_CONFIG.latency;
+    const learned = percentile(samples, config.delay_percentile) * config.delay_margin;
+    return Math.round(Math.min(fallbackMs * config.delay_ceiling_factor, Math.max(config.min_delay_ms, learned)));
+}
+
+// Run a wait with a learned timeout and record how long it took. Timeouts are
+// recorded as a longer sample so the step's timeout grows on slow tenants.
+async function timedWait(step, fallbackTimeout, waitFn, timeoutIsFailure = true) {
+    const timeout = stepTimeout(step, fallbackTimeout);
+    const startTime = performance.now();
+    try {
+        const result = await waitFn(timeout);
+        if (result !== null) {
+            recordStepSample(step, 'waits', performance.now() - startTime);
+        }
+        reportStep(step, performance.now() - startTime, result === null ? 'empty' : 'ok');
+        return result;
+    } catch (error) {
+        if (timeoutIsFailure) {
+            recordStepSample(step, 'waits', timeout * 1.5);
+        }
+        reportStep(step, performance.now() - startTime, 'timeout');
+        throw error;
+    }
+}
+
+// Report a wait step's duration and outcome: it goes to the step timers, the
+// structured action log, and the company's step totals in production verbosity
+function reportStep(step, ms, outcome) {
+    addStepTime('wait', step, ms, currentCompany);
+    if (stepTimer.stack.length > 0) {
+        stepTimer.stack[stepTimer.stack.length - 1].nestedMs += ms;
+    }
+    if (AUGD_CONFIG.log_verbosity === 'production' && currentCompany) {
+        const totals = currentCompany.steps[step] || (currentCompany.steps[step] = [0, 0, 0]);  // [count, ms, timeouts]
+        totals[0]++;
+        totals[1] += ms;
+        if (outcome === 'timeout') {
+            totals[2]++;
+        }
+    }
+    if (AUGD_CONFIG.structured_log) {
+        emitEvent('step', {
+            step: step,
+            ms: Math.round(ms),
+            outcome: outcome,
+            value: currentCompany ? currentCompany.value : null,
+            groupId: activeGroup ? activeGroup.id : null
+        });
+    }
+}
+
+// Step timers. The main steps run inside timeStep, which brackets them with
+// performance marks and measures them; waits (timedWait, pause, settle and API
+// requests) are reported as they finish. A step's work time leaves out its
+// waits and any steps nested in it, so the totals add up to the time spent in
+// timed steps. Totals are kept per step for the run and as [wait, work] per
+// company, and are sent to Python with company_finished and run_complete.
+var stepTimer = { stack: [], seq: 0, totals: { wait: {}, work: {} } };
+
+function addStepTime(kind, step, ms, record) {
+    const totals = stepTimer.totals[kind][step] || (stepTimer.totals[kind][step] = [0, 0, 0]);  // [count, ms, max ms]
+    totals[0]++;
+    totals[1] += ms;
+    totals[2] = Math.max(totals[2], ms);
+    if (record) {
+        record.timing[kind === 'wait' ? 0 : 1] += ms;
+    }
+}
+
+async function timeStep(step, fn) {
+    const frame = { mark: `augd step ${++stepTimer.seq}`, nestedMs: 0, startTime: performance.now() };
+    const record = currentCompany;
+    performance.mark(frame.mark);
+    stepTimer.stack.push(frame);
+    emitEvent('step_started', { step: step });
+    try {
+        return await fn();
+    } finally {
+        stepTimer.stack.splice(stepTimer.stack.lastIndexOf(frame), 1);
+        const measure = performance.measure(`augd ${step}`, frame.mark);
+        const ms = measure ? measure.duration : performance.now() - frame.startTime;
+        performance.clearMarks(frame.mark);
+        performance.clearMeasures(`augd ${step}`);
+        addStepTime('work', step, Math.max(0, ms - frame.nestedMs), record);
+        if (stepTimer.stack.length > 0) {
+            stepTimer.stack[stepTimer.stack.length - 1].nestedMs += ms;
+        }
+    }
+}
+
+// Step totals with whole milliseconds, for run_complete
+function roundStepTimings() {
+    const rounded = { wait: {}, work: {} };
+    for (const kind of ['wait', 'work']) {
+        for (const [step, totals] of Object.entries(stepTimer.totals[kind])) {
+            rounded[kind][step] = [totals[0], Math.round(totals[1]), Math.round(totals[2])];
+        }
+    }
+    return rounded;
+}
+
+// Wait for the spinner to go away as part of a named step. A timeout is
+// recorded (so the step's timeout grows) and the spinner is waited for again,
+// up to spinner_retries times; after that the script carries on.
+async function waitSpinner(step, fallbackTimeout = 10000) {
+    for (let attempt = 0; ; attempt++) {
+        try {
+            return await timedWait(step, fallbackTimeout, timeout => waitForElementRemoved('.spinner', timeout));
+        } catch (error) {
+            if (attempt >= AUGD_CONFIG.spinner_retries) {
+                console.warn(`Spinner still shown after ${step} (${error.message}); continuing.`);
+                return null;
+            }
+            console.warn(`Spinner still shown after ${step} (${error.message}); waiting again.`);
+        }
+    }
+}
+
+// Pause after a step for its learned delay, recording how long the DOM kept
+// changing. If it was still changing at the end, record a longer sample.
+async function pause(step, fallbackMs) {
+    const ms = stepDelay(step, fallbackMs);
+    if (!AUGD_CONFIG.adaptive_latency) {
+        await delay(ms);
+        reportStep(`pause ${step}`, ms, 'ok');
+        return;
+    }
+    const startTime = performance.now();
+    const lastMutation = await watchMutations(ms);
+    const busyFor = lastMutation ? lastMutation - startTime : 0;
+    recordStepSample(step, 'pauses', busyFor >= ms * 0.9 ? ms * 1.5 : busyFor);
+    reportStep(`pause ${step}`, performance.now() - startTime, 'ok');
+}
+
+// Hand the learned profile to Python so it is saved for the next run
+function exportLatencyProfile() {
+    emitEvent('latency_profile', { profile: { saved: new Date().toISOString(), steps: latency.steps } });
+}
+
+// Report the transfer size of each resource the page has loaded, so lean
+// mode can estimate the bytes it saves by blocking them
+function exportResourceSizes() {
+    const sizes = {};
+    for (const entry of performance.getEntriesByType('resource')) {
+        const size = entry.transferSize || entry.encodedBodySize;
+        if (size) {
+            sizes[entry.name.split('?')[0]] = size;
+        }
+    }
+    emitEvent('resource_sizes', { sizes: sizes });
+}
+
+// Log the delay and timeout each step is currently using
+function logLatencyProfile() {
+    for (const step of Object.keys(latency.steps)) {
+        const entry = latency.steps[step];
+        console.info(`Latency: ${step} - ${entry.waits.length} wait samples, ${entry.pauses.length} pause samples, timeout ${stepTimeout(step, 10000)} ms, delay ${stepDelay(step, 75)} ms.`);
+    }
+}
+
+// Direct API execution mode. The page's own list/delete/users/add-member
+// endpoints are either configured in settings or learned by watching the
+// requests the UI makes the first time it does each action. Once the list and
+// delete endpoints are known, companies are processed with fetch calls from
+// the authenticated page instead of by clicking through the UI.
+var apiEndpoints = Object.assign(
+    { list: null, delete: null, users: null, add_members: null },
+    AUGD_CONFIG.learned_api_endpoints || {},
+    Object.fromEntries(Object.entries(AUGD_CONFIG.api_endpoints || {}).filter(([kind, template]) => template))
+);
+
+// True if token appears in text, delimited by non-alphanumeric characters
+function containsToken(text, token) {
+    return typeof text === 'string' && new RegExp(`(^|[^A-Za-z0-9])${token}([^A-Za-z0-9]|$)`).test(text);
+}
+
+// Replace every delimited occurrence of token with a placeholder
+function replaceToken(text, token, placeholder) {
+    return text.replace(new RegExp(`(^|[^A-Za-z0-9])${token}(?=[^A-Za-z0-9]|$)`, 'g'), `$1${placeholder}`);
+}
+
+// Identifier-like values on a group's panel (data attributes, hidden inputs,
+// inline handlers). One of them is the server's id for the group.
+function groupTokenCandidates(panel) {
+    if (!panel) {
+        return [];
+    }
+    const tokens = new Set();
+    for (const element of [panel, ...panel.querySelectorAll('*')]) {
+        if (element.id && element.id.startsWith('memberCounter')) {
+            continue;  // The member count is not an identifier
+        }
+        for (const attribute of Array.from(element.attributes)) {
+            const name = attribute.name;
+            if (name.startsWith('data-') || name.startsWith('on') || name === 'value' || name === 'href') {
+                for (const token of attribute.value.match(/[A-Za-z0-9_-]+/g) || []) {
+                    if (/[0-9]/.test(token) && token.length <= 64) {
+                        tokens.add(token);
+                    }
+                }
+            }
+        }
+    }
+    return Array.from(tokens).sort((a, b) => b.length - a.length);  // Prefer the most specific
+}
+
+// First array of records (breadth-first) whose entries have one of the keys
+function findRecords(data, keys) {
+    const queue = [data];
+    let emptyList = null;
+    while (queue.length > 0) {
+        const value = queue.shift();
+        if (Array.isArray(value)) {
+            if (value.length === 0) {
+                emptyList = emptyList || value;
+            } else if (value[0] && typeof value[0] === 'object' && keys.some(key => key in value[0])) {
+                return value;
+            }
+        } else if (value && typeof value === 'object') {
+            queue.push(...Object.values(value));
+        }
+    }
+    return emptyList;
+}
+
+// Normalise a group listing response to [{ id, name, members }], or null
+function parseGroupListing(text) {
+    let data;
+    try {
+        data = JSON.parse(text);
+    } catch (error) {
+        return null;
+    }
+    const fields = AUGD_CONFIG.api_fields;
+    const records = findRecords(data, fields.name);
+    if (!records) {
+        return null;
+    }
+    return records.map(record => {
+        const idKey = fields.id.find(key => key in record);
+        const nameKey = fields.name.find(key => key in record);
+        const membersKey = fields.members.find(key => key in record);
+        const members = membersKey ? record[membersKey] : null;
+        return {
+            id: idKey ? String(record[idKey]) : null,
+            name: nameKey ? String(record[nameKey]).trim() : null,
+            members: Array.isArray(members) ? members.length : parseInt(members)
+        };
+    });
+}
+
+// True if every group has an id, a name and a member count; other listings
+// are left to the UI rather than risk deleting a group with members
+function listingUsable(groups) {
+    return groups !== null && groups.every(group => group.id && group.name !== null && !Number.isNaN(group.members));
+}
+
+// Ids from an available-users response
+function parseUserIds(text) {
+    const fields = AUGD_CONFIG.api_fields;
+    const records = findRecords(JSON.parse(text), fields.user_id) || [];
+    return records.map(record => {
+        const idKey = fields.user_id.find(key => key in record);
+        return idKey ? String(record[idKey]) : null;
+    }).filter(id => id !== null);
+}
+
+// Replace the member ids in a captured add-members body with a {members}
+// placeholder; supports JSON arrays and repeated form fields
+function templateMembers(body, memberIds) {
+    const wanted = new Set(memberIds.map(String));
+    const matches = list => list.length === wanted.size && list.every(id => wanted.has(String(id)));
+    try {
+        const data = JSON.parse(body);
+        const queue = [data];
+        while (queue.length > 0) {
+            const value = queue.shift();
+            if (!value || typeof value !== 'object') {
+                continue;
+            }
+            for (const [key, child] of Object.entries(value)) {
+                if (Array.isArray(child) && matches(child)) {
+                    value[key] = '{members}';
+                    return { body: JSON.stringify(data), members: 'json', membersNumeric: typeof child[0] === 'number' };
+                }
+                queue.push(child);
+            }
+        }
+    } catch (error) {
+        const params = new URLSearchParams(body);
+        for (const key of new Set(params.keys())) {
+            if (matches(params.getAll(key))) {
+                params.delete(key);
+                const rest = params.toString();
+                return { body: rest ? `${rest}&{members}` : '{members}', members: 'form', membersKey: key };
+            }
+        }
+    }
+    return null;
+}
+
+// Turn the first successful request since sinceSeq that passes accept() into
+// a template, replacing each token with its placeholder ({company}, {group})
+function learnEndpoint(kind, sinceSeq, tokens, accept, prepare = null) {
+    for (const entry of requestTracker.log) {
+        if (entry.seq <= sinceSeq || !(entry.status >= 200 && entry.status < 300) || !accept(entry)) {
+            continue;
+        }
+        const template = { method: entry.method, url: entry.url, body: entry.body, headers: withoutCredentialHeaders(entry.headers) };
+        if (prepare) {
+            const prepared = prepare(entry);
+            if (!prepared) {
+                continue;
+            }
+            Object.assign(template, prepared);
+        }
+        let complete = true;
+        for (const [placeholder, candidates] of Object.entries(tokens)) {
+            const token = candidates.find(candidate => containsToken(template.url, candidate) || containsToken(template.body, candidate));
+            if (!token) {
+                complete = false;
+                break;
+            }
+            template.url = replaceToken(template.url, token, `{${placeholder}}`);
+            if (template.body) {
+                template.body = replaceToken(template.body, token, `{${placeholder}}`);
+            }
+        }
+        if (!complete) {
+            continue;
+        }
+        // A request that also names the company must target the company of each replay
+        const company = currentCompany ? String(currentCompany.value) : '';
+        if (!tokens.company && /^[A-Za-z0-9_-]+$/.test(company)) {
+            template.url = replaceToken(template.url, company, '{company}');
+            if (template.body) {
+                template.body = replaceToken(template.body, company, '{company}');
+            }
+        }
+        apiEndpoints[kind] = template;
+        console.info(`Learned ${kind} endpoint: ${template.method} ${template.url}`);
+        emitEvent('api_endpoints', { endpoints: apiEndpoints });
+        return template;
+    }
+    console.warn(`Could not learn the ${kind} endpoint from the requests made by the page.`);
+    return null;
+}
+
+// True while the API mode still needs to watch the UI to learn an endpoint
+function learningEndpoint(kind) {
+    return AUGD_CONFIG.execution_mode === 'api' && !apiEndpoints[kind];
+}
+
+// Fill a template's placeholders with values
+function fillTemplate(template, values) {
+    let url = template.url;
+    let body = template.body;
+    for (const [name, value] of Object.entries(values)) {
+        if (name === 'members') {
+            continue;
+        }
+        url = url.split(`{${name}}`).join(encodeURIComponent(value));
+        if (body) {
+            body = body.split(`{${name}}`).join(String(value));
+        }
+    }
+    if (body && values.members) {
+        if (template.members === 'json') {
+            const ids = template.membersNumeric ? values.members.map(Number) : values.members.map(String);
+            body = body.split('"{members}"').join(JSON.stringify(ids));
+        } else if (template.members === 'form') {
+            const fields = values.members.map(id => `${encodeURIComponent(template.membersKey)}=${encodeURIComponent(id)}`);
+            body = body.split('{members}').join(fields.join('&'));
+        }
+    }
+    return { url: url, body: body };
+}
+
+// Replay a learned endpoint from the authenticated page
+async function apiRequest(kind, values) {
+    const template = apiEndpoints[kind];
+    const request = fillTemplate(template, values);
+    const startTime = performance.now();
+    const response = await fetch(request.url, {
+        method: template.method,
+        headers: Object.assign({}, template.headers, sessionHeaders()),
+        body: template.method === 'GET' || template.method === 'HEAD' ? undefined : request.body,
+        credentials: 'same-origin'
+    });
+    // Requests overlap (and listings are prefetched), so only the current
+    // company's own requests are charged to it
+    addStepTime('wait', `api ${kind}`, performance.now() - startTime,
+        currentCompany && currentCompany.value === values.company ? currentCompany : null);
+    if (!response.ok) {
+        throw new Error(`${kind} request failed with HTTP ${response.status}`);
+    }
+    return response.text();
+}
+
+// Run async tasks with at most `limit` in flight; resolves with every outcome
+async function runPool(tasks, limit) {
+    const results = new Array(tasks.length);
+    let next = 0;
+    async function worker() {
+        while (next < tasks.length) {
+            const index = next++;
+            try {
+                results[index] = { ok: true, value: await tasks[index]() };
+            } catch (error) {
+                results[index] = { ok: false, error: error };
+            }
+        }
+    }
+    await Promise.all(Array.from({ length: Math.min(limit, tasks.length) }, worker));
+    return results;
+}
+
+// Group listings requested ahead of time, keyed by company value. Only the
+// current company and the next prefetch_depth companies are kept.
+var listingPrefetch = new Map();
+
+// Request the listings of the company at position in selected and of the
+// companies after it, dropping any prefetched listing outside that window
+function prefetchListings(selected, position) {
+    // Only the API path uses listings; in dom mode they would be wasted requests
+    // that also hold up waitForPageSettled
+    const apiPath = AUGD_CONFIG.execution_mode === 'api' && apiEndpoints.list && apiEndpoints.delete;
+    if (!(AUGD_CONFIG.prefetch_depth > 0 && apiPath)) {
+        return;
+    }
+    const upcoming = selected.slice(position, position + 1 + AUGD_CONFIG.prefetch_depth);
+    const wanted = new Set(upcoming.map(company => company.value));
+    for (const value of Array.from(listingPrefetch.keys())) {
+        if (!wanted.has(value)) {
+            listingPrefetch.delete(value);
+        }
+    }
+    for (const company of upcoming) {
+        if (!listingPrefetch.has(company.value)) {
+            listingPrefetch.set(company.value, apiRequest('list', { company: company.value }).then(parseGroupListing, () => null));
+        }
+    }
+}
+
+// A company's group listing, from the prefetch if there is one; a listing
+// is only used once
+async function companyListing(companyValue) {
+    const pending = listingPrefetch.get(companyValue);
+    listingPrefetch.delete(companyValue);
+    const groups = pending ? await pending : null;
+    return groups || parseGroupListing(await apiRequest('list', { company: companyValue }));
+}
+
+// Process one company through the page's API. Returns false if the API
+// cannot handle this company yet, so the caller falls back to the UI.
+async function processCompanyViaApi(companyName, companyValue) {
+    const groups = await companyListing(companyValue);
+    if (!groups || !listingUsable(groups)) {
+        console.warn(`Group listing for ${companyName} could not be parsed. Falling back to the UI.`);
+        return false;
+    }
+
+    // Apply the same rules as the UI path
+    const actions = planGroups(groups);
+    currentCompany.fingerprint = groupFingerprint(remainingGroups(groups, actions));
+    if (checkCompanyCache(currentCompany, groups)) {
+        console.log(`${companyName} is unchanged since it was last checked in full. Skipping it.`);
+        return true;
+    }
+    if (actions.keep && !(apiEndpoints.users && apiEndpoints.add_members)) {
+        console.log(`Member endpoints not learned yet. Processing ${companyName} through the UI.`);
+        return false;
+    }
+
+    for (const group of groups) {
+        currentCompany.inspected++;
+        runStats.inspected++;
+        emitEvent('group_inspected', { company: companyName, groupIndex: null, groupId: group.id, group: group.name, members: group.members });
+    }
+
+    await applyApiActions(companyName, companyValue, actions);
+    console.log(`Processed ${companyName} through the API: ${groups.length} groups, ${actions.deletions.length} deletions.`);
+    return true;
+}
+
+// Add every user to the kept 'everyone' group and delete the planned groups
+// with direct requests. Throws if the member endpoints are needed but unknown.
+async function applyApiActions(companyName, companyValue, actions) {
+    if (actions.keep) {
+        if (!(apiEndpoints.users && apiEndpoints.add_members)) {
+            throw new Error('The member endpoints have not been learned yet.');
+        }
+        const userIds = parseUserIds(await apiRequest('users', { company: companyValue, group: actions.keep.id }));
+        if (userIds.length > 0) {
+            await apiRequest('add_members', { company: companyValue, group: actions.keep.id, members: userIds });
+            console.log(`Added ${userIds.length} members to 'everyone' group ${actions.keep.id} in ${companyName}.`);
+        }
+    }
+
+    const results = await runPool(
+        actions.deletions.map(group => () => apiRequest('delete', { company: companyValue, group: group.id })),
+        AUGD_CONFIG.api_concurrency
+    );
+    results.forEach((result, index) => {
+        const group = actions.deletions[index];
+        if (result.ok) {
+            currentCompany.deleted++;
+            runStats.deleted++;
+            emitEvent('group_deleted', { company: companyName, value: companyValue, groupIndex: null, groupId: group.id, group: group.name });
+        } else {
+            reportError(`API deletion of group ${group.name} (${group.id}) in ${companyName} failed:`, result.error);
+        }
+    });
+}
+
+// Function to expand a group's panel from the group model, unless it is already open
+async function reopenGroup(group) {
+    return timeStep('expand group', async () => {
+        // Check if the group name is null
+        await waitSpinner('before expand group');
+        const panel = groupPanel(group);
+        let clickableElement = panel ? panel.querySelector(':scope > div.panel-heading > h4 > a') : null;
+        if (clickableElement && clickableElement.textContent.trim() !== "") {
+            if (panel.querySelector('.panel-collapse.in')) {
+                // The heading toggles the panel, so clicking an open one would collapse it
+                console.log(`Group ID ${group.index} is already expanded.`);
+                return true;
+            }
+            clickableElement.click();
+            console.log(`Reopened group ID ${group.index}`);
+            await waitSpinner('expand group');
+            await pause('expand group', 75);
+        } else {
+            console.warn(`Skipping group ID ${group.index} because the group is gone or its name is null or empty.`);
+            return false;
+        }
+        return true;
+    });
+}
+
+// Main automation function
+async function automateUserGroupManagement() {
+    console.log(`Inside automateUserGroupManagement function...`);
+    await timeStep('open user groups page', openUserGroupsPage);
+    await processAllCompanies();  // Start processing companies
+}
+
+// Navigate to the User Groups page through the profile dropdown
+async function openUserGroupsPage() {
+    let dropdown = await waitForElementAppear('#header_nav > div > div.row.top-menu > div > ul > li.profile > div > div.media-body.dropdown > a');
+    console.log(`Dropdown element found:`, dropdown);
+    dropdown.click();  // Open the navigation dropdown
+    console.log(`Opened navigation dropdown.`);
+    await settle('navigation dropdown', AUGD_CONFIG.fallback_delays_ms.navigation);
+
+    let userGroupsLink = await waitForElementAppear('#header_nav > div > div.row.top-menu > div > ul > li.profile > div > div.media-body.dropdown > ul > li:nth-child(5) > a');
+    console.log(`User groups link found:`, userGroupsLink);
+    userGroupsLink.click();  // Navigate to User Groups page
+    console.log(`Navigated to User Groups page.`);
+    await settle('user groups page', AUGD_CONFIG.fallback_delays_ms.navigation);
+}
+
+// Function to wait for user groups to appear
+async function waitForUserGroups(timeout = 500) {
+    try {
+        const groups = await waitForCondition('user groups', () => {
+            const found = document.querySelectorAll('.panel-collapse');  // Update this selector if needed
+            return found.length > 0 ? found : null;
+        }, timeout);
+        console.log(`User groups found: ${groups.length}`);
+        return groups;
+    } catch (error) {
+        console.warn(`No user groups found within ${timeout} ms for this company.`);
+        return null;  // Resolve with null if no user groups found
+    }
+}
+
+// Function to process all companies
+async function processAllCompanies() {
+    console.log(`Inside processAllCompanies function...`);
+    let companySelect = document.querySelector('#company_data');
+    await waitSpinner('company list');  // Wait for the spinner to disappear before proceeding
+    if (!companySelect) {
+        reportError("Company select element not found!");
+        return;
+    }
+
+    let companies = document.querySelectorAll('#company_data option');
+    console.info(`Found ${companies.length} companies in the hidden dropdown.`);
+
+    // Pick this page's companies
+    const selected = [];
+    let alreadyFinished = 0;
+    for (let i = 0; i < companies.length; i++) {
+        if (i % companySlice[1] !== companySlice[0]) {
+            continue;  // Another page in the pool handles this company
+        }
+        const option = companies[i];
+        const companyName = option.textContent.trim();
+        const companyValue = option.value;
+        if (skipCompanies.has(companyValue)) {
+            console.log(`Skipping company (${i + 1}/${companies.length}): ${companyName}, already finished in this run.`);
+            alreadyFinished++;
+            continue;
+        }
+        if (!companyAllowed(companyValue, companyName)) {
+            console.log(`Skipping company (${i + 1}/${companies.length}): ${companyName}, excluded by the company filter.`);
+            continue;
+        }
+        selected.push({ index: i, total: companies.length, name: companyName, value: companyValue });
+    }
+    emitEvent('companies_selected', { selected: selected.length, skipped: alreadyFinished });
+
+    if (AUGD_CONFIG.two_phase.enabled) {
+        const plan = await scanCompanies(companySelect, selected);
+        await executePlan(companySelect, plan);
+    } else {
+        // Iterate over each company
+        for (let position = 0; position < selected.length; position++) {
+            if (stopRequested()) {
+                console.info("Stop requested. Ending the company loop.");
+                break;
+            }
+            prefetchListings(selected, position);
+            await processCompany(companySelect, selected[position]);
+        }
+        listingPrefetch.clear();
+    }
+    console.info("Company processing loop finished.");
+}
+
+// A company's running counters; timing is [wait ms, work ms]
+function companyRecord(company) {
+    return { index: company.index, name: company.name, value: company.value, inspected: 0, deleted: 0, errors: 0, fingerprint: null, cacheHit: null, steps: {}, timing: [0, 0], startTime: performance.now() };
+}
+
+// Start the bookkeeping for a company
+function beginCompany(company) {
+    console.log(`Processing company (${company.index + 1}/${company.total}): ${company.name}`);
+    currentCompany = companyRecord(company);
+    emitEvent('company_started', { index: company.index, total: company.total, company: company.name, value: company.value });
+
+    // Reset the flag for each new company
+    hasProcessedEveryoneGroupWithMembers = false;
+    console.log(`Flag set: hasProcessedEveryoneGroupWithMembers = false for company: ${company.name}`);
+    return currentCompany;
+}
+
+// Report a company as finished
+function finishCompany(record) {
+    runStats.companies++;
+    emitEvent('company_finished', {
+        index: record.index,
+        company: record.name,
+        value: record.value,
+        inspected: record.inspected,
+        deleted: record.deleted,
+        errors: record.errors,
+        durationMs: Math.round(performance.now() - record.startTime),
+        timing: [Math.round(record.timing[0]), Math.round(record.timing[1])],
+        // Cached only when the company ended up compliant without errors
+        fingerprint: record.errors === 0 ? record.fingerprint : null,
+        cacheHit: record.cacheHit,
+        steps: AUGD_CONFIG.log_verbosity === 'production' ? roundStepTotals(record.steps) : undefined
+    });
+
+    // Save what has been learned so far in case the run is interrupted
+    if (runStats.companies % 25 === 0) {
+        exportLatencyProfile();
+    }
+}
+
+// Step totals with whole milliseconds, for the company_finished event
+function roundStepTotals(steps) {
+    const rounded = {};
+    for (const [step, totals] of Object.entries(steps)) {
+        rounded[step] = [totals[0], Math.round(totals[1]), totals[2]];
+    }
+    return rounded;
+}
+
+// Select a company in the dropdown and wait for its groups; returns the
+// group panels, or null if the company has none
+async function switchToCompany(companySelect, companyValue) {
+    return timeStep('company switch', async () => {
+        companySelect.value = companyValue;  // Select the company
+        await settle('before company change', AUGD_CONFIG.fallback_delays_ms.before_company_change);
+        const changeSeq = requestTracker.seq;
+        companySelect.dispatchEvent(new Event('change'));  // Trigger change event
+
+        // Wait until the company's data has loaded and rendered
+        await settle('after company change', AUGD_CONFIG.fallback_delays_ms.after_company_change);
 
         // Wait for user groups to appear
-        let groups = await waitForUserGroups(500);
-        
-        if (!groups) {
-            console.log(`No user groups found for company index ${i}. Moving to the next company.`);
-            continue;  // Move to the next company if no user groups are found
+        let groups = await timedWait('user groups', 500, timeout => waitForUserGroups(timeout), false);
+
+        // Learn the listing request from the company switch; it must agree with the page
+        if (learningEndpoint('list') && /^[A-Za-z0-9_-]+$/.test(companyValue)) {
+            const shownGroups = groups ? groups.length : 0;
+            learnEndpoint('list', changeSeq, { company: [companyValue] }, entry => {
+                const listing = entry.method === 'GET' ? parseGroupListing(entry.response) : null;
+                return listing !== null && listing.length === shownGroups;
+            });
+        }
+        return groups;
+    });
+}
+
+// Process one company group by group
+async function processCompany(companySelect, company) {
+    beginCompany(company);
+
+    // In API mode, process the company with direct requests once the
+    // endpoints are known; otherwise (or on failure) drive the UI
+    let handledViaApi = false;
+    if (AUGD_CONFIG.execution_mode === 'api' && apiEndpoints.list && apiEndpoints.delete) {
+        try {
+            handledViaApi = await processCompanyViaApi(company.name, company.value);
+        } catch (error) {
+            reportError(`API processing failed for ${company.name}, falling back to the UI:`, error);
+        }
+    }
+
+    if (!handledViaApi) {
+        if (await cachedListing(currentCompany)) {
+            console.log(`${company.name} is unchanged since it was last checked in full. Skipping it without switching to it.`);
+        } else {
+            let groups = await switchToCompany(companySelect, company.value);
+            const inventory = groups ? await readGroupInventory() : [];
+            currentCompany.fingerprint = groupFingerprint(remainingGroups(inventory, planGroups(inventory)));
+            if (checkCompanyCache(currentCompany, inventory)) {
+                console.log(`${company.name} is unchanged since it was last checked in full. Skipping it.`);
+            } else {
+                // Process the user groups
+                await processUserGroupsInCompany(company.index, company.name, inventory);
+            }
         }
+    }
+    finishCompany(currentCompany);
+}
 
-        // Process the user groups
-        await processUserGroupsInCompany(i, companyName, groups);
+// The cleanup rules: the first 'everyone' group with members is kept (and
+// gets every user added); other 'everyone' groups and empty groups are deleted
+function planGroups(groups) {
+    let keep = null;
+    const deletions = [];
+    for (const group of groups) {
+        if (group.name === 'everyone') {
+            if (group.members > 0 && !keep) {
+                keep = group;
+            } else {
+                deletions.push(group);
+            }
+        } else if (group.members === 0) {
+            deletions.push(group);
+        }
     }
-    console.log("Company processing loop finished.");
+    return { keep: keep, deletions: deletions };
 }
 
-// Function to process user groups within a company
-async function processUserGroupsInCompany(companyIndex, companyName, groups) {
-    console.log(`Processing user groups for company index: ${companyIndex}`);
-    
-    if (groups.length === 0) {
-        console.log(`No user groups found for company index ${companyIndex}. Moving to the next company.`);
-        return;
+// The groups left once the planned deletions are done
+function remainingGroups(groups, actions) {
+    return groups.filter(group => !actions.deletions.includes(group));
+}
+
+// Fingerprint of a company's groups for the company cache (32-bit FNV-1a of
+// the sorted names and counts). 'everyone' groups only count as empty or
+// not, so topping one up does not change the fingerprint. group_fingerprint
+// in Python computes the same value.
+function groupFingerprint(groups) {
+    const text = JSON.stringify(groups
+        .map(group => `${group.name}:${group.name === 'everyone' ? (group.members > 0 ? '+' : '0') : group.members}`)
+        .sort());
+    let hash = 0x811c9dc5;
+    for (let i = 0; i < text.length; i++) {
+        hash = Math.imul(hash ^ text.charCodeAt(i), 0x01000193) >>> 0;
     }
+    return `${groups.length}-${hash.toString(16)}`;
+}
 
-    console.log(`Found ${groups.length} user groups for company index ${companyIndex}`);
+// Whether the kept 'everyone' group is topped up when nothing else in the
+// company changes. Cache hits are never topped up: new users are added when
+// the company's cache entry expires and it is checked in full again.
+function topUpWanted(actions) {
+    return actions.keep !== null && AUGD_CONFIG.two_phase.visit_everyone_companies;
+}
 
-    // Iterate over each group
-    for (let i = 0; i < groups.length; i++) {
-        let group = groups[i];
-        if (!group) {
-            console.error(`Group element not found for group ID ${i}. Skipping group.`);
-            continue;
+// True if the company is unchanged since a run last checked it in full and
+// left it compliant. The answer is kept on the company's record, so a
+// company is only counted once.
+function checkCompanyCache(record, groups) {
+    if (!companyCache) {
+        return false;
+    }
+    if (record.cacheHit === null) {
+        record.cacheHit = companyCache[record.value] === groupFingerprint(groups);
+        if (record.cacheHit) {
+            runStats.cacheHits++;
+        } else {
+            runStats.cacheMisses++;
         }
+    }
+    return record.cacheHit;
+}
 
-        let groupReopened = await reopenGroup(i);
-        if (!groupReopened) {
-            console.error(`Could not reopen group ${i}. Skipping.`);
-            continue;
+// Outside API mode, a cached company is checked with one listing request
+// when the list endpoint is known. Returns the groups on a cache hit, so the
+// company switch and inventory read are skipped; otherwise null.
+async function cachedListing(record) {
+    if (AUGD_CONFIG.execution_mode === 'api' || !companyCache || !(record.value in companyCache) || !apiEndpoints.list) {
+        return null;
+    }
+    try {
+        const groups = await companyListing(record.value);
+        if (!groups || !listingUsable(groups)) {
+            return null;
         }
+        const listed = groups.map((group, index) => Object.assign({ index: index }, group));
+        return checkCompanyCache(record, listed) ? listed : null;
+    } catch (error) {
+        console.warn(`Could not list ${record.name} for the company cache (${error.message}). Reading it from the page.`);
+        return null;
+    }
+}
 
-        let groupNameElement = document.querySelector(`#groupNameLabel${i}`);
-        let groupName = groupNameElement ? groupNameElement.innerText.trim() : null;
-        console.log(`Group ID ${i} Name: ${groupName ? groupName : 'No Name Found'}`);
+// Elements whose id is prefix + number, keyed by the number, from one query
+function elementsByIndex(prefix) {
+    const found = new Map();
+    for (const element of document.querySelectorAll(`[id^="${prefix}"]`)) {
+        const index = element.id.slice(prefix.length);
+        if (/^[0-9]+$/.test(index)) {
+            found.set(Number(index), element);
+        }
+    }
+    return found;
+}
 
-        let memberCounter = document.querySelector(`#memberCounter${i}`);
+// In-page model of the current company's groups. Entries are keyed by the
+// server's group id (by panel position when a panel carries no id) and hold
+// the group's live panel. A mutation observer on the group list re-points
+// entries when panels are re-rendered, so actions find their elements
+// directly instead of through positional selectors that shift after a
+// deletion.
+var groupModel = { entries: new Map(), observer: null };
 
-        if (groupName === 'everyone') {
-            // Special handling for 'everyone' group
-            if (parseInt(memberCounter.value) > 0) {
-                if (!hasProcessedEveryoneGroupWithMembers) {
-                    console.log(`Processing 'everyone' group ${i} that already has members.`);
-                    await handleEveryoneGroupWithMembers(i);
-                    hasProcessedEveryoneGroupWithMembers = true;
-                    console.log(`Flag set: hasProcessedEveryoneGroupWithMembers = true for group ID ${i}, group name: ${groupName}, company: ${companyName}`);
-                } else {
-                    console.log(`Deleting 'everyone' group ${i}, as another group has already been processed.`);
-                    await deleteGroup(i);
-                }
-            } else {
-                console.log(`Processing 'everyone' group ${i} with no members.`);
-                await deleteGroup(i);
-            }
-        } else {
-            // Handling for other groups
-            console.log(`Processing non-'everyone' group ${i}: ${groupName}`);
-            
-            if (parseInt(memberCounter.value) === 0) {
-                console.log(`Deleting non-'everyone' group ${i}: ${groupName} as it has no members.`);
-                await deleteGroup(i);
-            } else {
-                console.log(`Skipping non-'everyone' group ${i}: ${groupName} as it has members.`);
-            }
-            
-            await waitForElementRemoved('.spinner', 10000);
-            await delay(75);
+// The server's id for a group panel, if the page exposes one
+function panelGroupId(panel) {
+    return panel.getAttribute('data-group-id') || panel.getAttribute('data-id');
+}
+
+// Point model entries at the group panels in (or at) an added node
+function trackGroupPanels(node) {
+    if (node.nodeType !== Node.ELEMENT_NODE) {
+        return;
+    }
+    const panels = node.id && node.id.startsWith('groupID') ? [node] : node.querySelectorAll('[id^="groupID"]');
+    for (const panel of panels) {
+        const index = panel.id.slice('groupID'.length);
+        if (!/^[0-9]+$/.test(index)) {
+            continue;
+        }
+        const id = panelGroupId(panel);
+        const entry = groupModel.entries.get(id ? `id:${id}` : `index:${index}`);
+        if (entry) {
+            entry.panel = panel;
+            entry.group.index = Number(index);
         }
     }
 }
 
+// Start a model for freshly read groups and watch their list for re-renders
+function buildGroupModel(groups, panels) {
+    if (groupModel.observer) {
+        groupModel.observer.disconnect();
+        groupModel.observer = null;
+    }
+    groupModel.entries = new Map();
+    for (const group of groups) {
+        group.key = group.id ? `id:${group.id}` : `index:${group.index}`;
+        groupModel.entries.set(group.key, { group: group, panel: panels.get(group.index) || null });
+    }
+    const first = panels.values().next().value;
+    if (first && first.parentElement) {
+        groupModel.observer = new MutationObserver(records => {
+            for (const record of records) {
+                record.addedNodes.forEach(trackGroupPanels);
+            }
+        });
+        groupModel.observer.observe(first.parentElement, { childList: true });
+    }
+}
 
-// Function to process user groups within a company
-async function processUserGroupsInCompany(companyIndex, companyName) {
-    console.log(`Processing user groups for company index: ${companyIndex}`);
-    await waitForElementRemoved('.spinner', 10000);
-    await delay(75)
+// A group's live panel, or null once it is gone. Panels without a server id
+// are only trusted while they still show the group's name.
+function groupPanel(group) {
+    const entry = groupModel.entries.get(group.key);
+    if (!entry) {
+        return null;
+    }
+    if (!entry.panel || !entry.panel.isConnected) {
+        // The list was replaced outside the observed container
+        entry.panel = group.id
+            ? document.querySelector(`[data-group-id="${CSS.escape(group.id)}"], [data-id="${CSS.escape(group.id)}"]`)
+            : document.querySelector(`#groupID${group.index}`);
+        if (entry.panel && /^groupID[0-9]+$/.test(entry.panel.id)) {
+            group.index = Number(entry.panel.id.slice('groupID'.length));
+        }
+    }
+    if (entry.panel && !group.id && group.name !== null) {
+        const label = entry.panel.querySelector('[id^="groupNameLabel"]');
+        if (label && label.innerText.trim() !== group.name) {
+            return null;
+        }
+    }
+    return entry.panel;
+}
 
-    let groups = document.querySelectorAll('.panel-collapse');
-        await waitForElementRemoved('.spinner', 10000);
-    if (groups.length === 0) {
-        console.log(`No user groups found for company index ${companyIndex}. Moving to the next company.`);
-        return;
+// Wait for an element inside a group's live panel
+async function waitForGroupElement(group, selector, timeout = 20000) {
+    try {
+        return await waitForCondition(`group ${selector}`, () => {
+            const panel = groupPanel(group);
+            return panel ? panel.querySelector(selector) : null;
+        }, timeout);
+    } catch (error) {
+        console.error(`Element ${selector} of group ${group.name} did not appear within ${timeout} ms`);
+        throw new Error(`Element ${selector} of group ${group.name} did not appear within ${timeout} ms`);
     }
+}
 
-    // Iterate over each group
-    for (let i = 0; i < groups.length; i++) {
-        let group = groups[i];
-        if (!group) {
-            console.error(`Group element not found for group ID ${i}. Skipping group.`);
-            continue;
+// Read every group's id, name and member count in one pass over the page,
+// without expanding the panels, and build the group model from them. A panel
+// is only expanded when its name or counter is missing.
+async function readGroupInventory() {
+    return timeStep('read groups', async () => {
+        const count = document.querySelectorAll('.panel-collapse').length;
+        const panels = elementsByIndex('groupID');
+        const labels = elementsByIndex('groupNameLabel');
+        const counters = elementsByIndex('memberCounter');
+        const read = (group, label, counter) => {
+            const members = counter ? parseInt(counter.value) : NaN;
+            group.name = label ? label.innerText.trim() : null;
+            group.members = Number.isNaN(members) ? null : members;
+            return group;
+        };
+        const groups = [];
+        for (let i = 0; i < count; i++) {
+            const panel = panels.get(i);
+            groups.push(read({ index: i, id: panel ? panelGroupId(panel) : null }, labels.get(i), counters.get(i)));
+        }
+        buildGroupModel(groups, panels);
+        for (const group of groups) {
+            if ((group.name === null || group.members === null) && await reopenGroup(group)) {
+                read(group, document.querySelector(`#groupNameLabel${group.index}`), document.querySelector(`#memberCounter${group.index}`));
+            }
+        }
+        return groups;
+    });
+}
+
+// Inventory phase: record each company's groups and the actions the rules
+// call for. Nothing is changed, and no group panel is opened unless needed.
+// Companies with nothing to do are finished here.
+async function scanCompanies(companySelect, selected) {
+    const plan = [];
+    const startTime = performance.now();
+    const recordCompany = (company, groups, listedViaApi = false, record = companyRecord(company)) => {
+        emitEvent('company_started', { index: company.index, total: company.total, company: company.name, value: company.value });
+        for (const group of groups) {
+            record.inspected++;
+            runStats.inspected++;
+            emitEvent('group_inspected', { company: company.name, groupIndex: group.index, groupId: group.id, group: group.name, members: group.members });
         }
+        const actions = planGroups(groups);
+        record.fingerprint = groupFingerprint(remainingGroups(groups, actions));
+        const unchanged = checkCompanyCache(record, groups);
+        const deletionsDue = !unchanged && actions.deletions.length > 0;
+        const topUpDue = !unchanged && topUpWanted(actions);
+        // A company scanned through the UI is topped up right away, while the
+        // page is on it, so it is only visited again for deletions
+        const needsVisit = deletionsDue || (listedViaApi && topUpDue);
+        const entry = { company: company, record: record, groups: groups, actions: actions, needsVisit: needsVisit, topUpDue: topUpDue, listedViaApi: listedViaApi };
+        plan.push(entry);
+        return entry;
+    };
 
-        let groupReopened = await reopenGroup(i);
-        if (!groupReopened) {
-            console.error(`Could not reopen group ${i}. Skipping.`);
+    // With learned endpoints the listings are fetched concurrently; anything
+    // the API cannot list is scanned through the UI afterwards
+    let remaining = selected;
+    if (AUGD_CONFIG.execution_mode === 'api' && apiEndpoints.list && apiEndpoints.delete) {
+        const listings = await runPool(selected.map(company => async () => {
+            if (stopRequested()) {
+                return null;
+            }
+            const groups = parseGroupListing(await apiRequest('list', { company: company.value }));
+            return groups && listingUsable(groups) ? groups : null;
+        }), AUGD_CONFIG.api_concurrency);
+        remaining = [];
+        listings.forEach((result, index) => {
+            if (result.ok && result.value) {
+                const entry = recordCompany(selected[index], result.value.map((group, groupIndex) => Object.assign({ index: groupIndex }, group)), true);
+                if (!entry.needsVisit) {
+                    finishCompany(entry.record);
+                }
+            } else if (!stopRequested()) {
+                remaining.push(selected[index]);
+            }
+        });
+    }
+
+    for (const company of remaining) {
+        if (stopRequested()) {
+            console.info("Stop requested. Ending the inventory.");
+            break;
+        }
+        currentCompany = companyRecord(company);  // Charged with the switch, the inventory read and any top-up
+        const cached = await cachedListing(currentCompany);
+        if (cached) {
+            finishCompany(recordCompany(company, cached, true, currentCompany).record);
             continue;
         }
+        const panels = await switchToCompany(companySelect, company.value);
+        const entry = recordCompany(company, panels ? await readGroupInventory() : [], false, currentCompany);
+        if (entry.topUpDue) {
+            hasProcessedEveryoneGroupWithMembers = false;
+            await applyGroupActions({ keep: entry.actions.keep, deletions: [] });
+            entry.toppedUp = true;
+        }
+        if (!entry.needsVisit) {
+            finishCompany(entry.record);
+        }
+    }
+
+    const planned = plan.filter(entry => entry.needsVisit);
+    const deletions = planned.reduce((total, entry) => total + entry.actions.deletions.length, 0);
+    console.info(`Inventory: ${plan.length} companies scanned in ${Math.round(performance.now() - startTime)} ms, ${planned.length} need changes (${deletions} planned deletions).`);
+    emitEvent('inventory_plan', {
+        scanned: plan.length,
+        planned: planned.length,
+        deletions: deletions,
+        durationMs: Math.round(performance.now() - startTime),
+        // Compact plan: [company value, name, [[group, members], ...], [deletion indexes], kept 'everyone' index]
+        companies: plan.map(entry => [
+            entry.company.value,
+            entry.company.name,
+            entry.groups.map(group => [group.name, group.members]),
+            entry.actions.deletions.map(group => group.index),
+            entry.actions.keep ? entry.actions.keep.index : null
+        ])
+    });
+    return planned;
+}
 
-        let groupNameElement = document.querySelector(`#groupNameLabel${i}`);
-        let groupName = groupNameElement ? groupNameElement.innerText.trim() : null;
-        let memberCounter = document.querySelector(`#memberCounter${i}`);
+function warnIfChangedSinceInventory(entry, actions) {
+    if (actions.deletions.length !== entry.actions.deletions.length) {
+        console.warn(`${entry.company.name} changed since the inventory: ${entry.actions.deletions.length} planned deletions, ${actions.deletions.length} now.`);
+    }
+}
 
-        if (groupName === 'everyone') {
-            // Special handling for 'everyone' group
-            if (parseInt(memberCounter.value) > 0) {
-                if (!hasProcessedEveryoneGroupWithMembers) {
-                    console.log(`Processing 'everyone' group ${i} that already has members.`);
-                    await handleEveryoneGroupWithMembers(i);
-                    hasProcessedEveryoneGroupWithMembers = true;
-                    console.log(`Flag set: hasProcessedEveryoneGroupWithMembers = true for group ID ${i}, group name: ${groupName}, company: ${companyName}`);
-                } else {
-                    console.log(`Deleting 'everyone' group ${i}, as another group has already been processed.`);
-                    await deleteGroup(i);
+// Execute phase: visit only the companies with planned changes. The groups
+// are read (or listed through the API) again on arrival and the rules
+// re-applied, so changes made since the inventory are respected.
+async function executePlan(companySelect, planned) {
+    for (const entry of planned) {
+        if (stopRequested()) {
+            console.info("Stop requested. Ending the execute phase.");
+            break;
+        }
+        currentCompany = entry.record;
+        hasProcessedEveryoneGroupWithMembers = false;
+
+        if (entry.listedViaApi) {
+            try {
+                const groups = await companyListing(entry.company.value);
+                if (!groups || !listingUsable(groups)) {
+                    throw new Error('the group listing could not be parsed');
                 }
-            } else {
-                console.log(`Processing 'everyone' group ${i} with no members.`);
-                await deleteGroup(i);
+                const actions = planGroups(groups);
+                entry.record.fingerprint = groupFingerprint(remainingGroups(groups, actions));
+                warnIfChangedSinceInventory(entry, actions);
+                await applyApiActions(entry.company.name, entry.company.value, actions);
+                finishCompany(entry.record);
+                continue;
+            } catch (error) {
+                reportError(`API processing failed for ${entry.company.name}, falling back to the UI:`, error);
             }
-        } else {
-            // Handling for other groups
-            console.log(`Processing non-'everyone' group ${i}: ${groupName}`);
-            
-            if (parseInt(memberCounter.value) === 0) {
-                console.log(`Deleting non-'everyone' group ${i}: ${groupName} as it has no members.`);
-                await deleteGroup(i);
-            } else {
-                console.log(`Skipping non-'everyone' group ${i}: ${groupName} as it has members.`);
-            }
-            
-            await waitForElementRemoved('.spinner', 10000);
-            await delay(75);
         }
+
+        const panels = await switchToCompany(companySelect, entry.company.value);
+        const inventory = panels ? await readGroupInventory() : [];
+        const actions = planGroups(inventory);
+        entry.record.fingerprint = groupFingerprint(remainingGroups(inventory, actions));
+        warnIfChangedSinceInventory(entry, actions);
+        if (entry.toppedUp) {
+            actions.keep = null;  // Already topped up during the inventory
+        }
+        await applyGroupActions(actions);
+        finishCompany(entry.record);
     }
 }
 
-// Function to delete a group
-async function deleteGroup(groupIndex) {
-    console.log(`Deleting group ID: ${groupIndex}`);
-    let groupReopened = await reopenGroup(groupIndex);
-    if (!groupReopened) {
-        console.error(`Could not reopen group ${groupIndex}. Skipping deletion.`);
+// Function to process user groups within a company. The groups come from
+// one bulk read; only the groups being changed have their panels expanded.
+async function processUserGroupsInCompany(companyIndex, companyName, inventory) {
+    console.log(`Processing user groups for company index: ${companyIndex}`);
+    if (inventory.length === 0) {
+        console.log(`No user groups found for company index ${companyIndex}. Moving to the next company.`);
         return;
     }
-    let deleteButton = await waitForElementAppear(`#collapse${groupIndex} > div > div > div.col-lg-12.pull-right > button`);
-    if (deleteButton) {
-        deleteButton.click();
-        console.log(`Clicked delete button for group ${groupIndex}.`);
-        await waitForElementRemoved('.spinner', 10000);
-        await delay(75);
 
-        let confirmButton = await waitForElementAppear('#deleteGroup');
-        if (confirmButton) {
-            await waitForElementRemoved('.spinner', 10000);
-            await delay(75);
-            confirmButton.click();
-            console.log(`Clicked confirm button for group deletion.`);
+    for (const group of inventory) {
+        currentCompany.inspected++;
+        runStats.inspected++;
+        emitEvent('group_inspected', {
+            company: companyName,
+            groupIndex: group.index,
+            groupId: group.id,
+            group: group.name,
+            members: group.members
+        });
+    }
+    const actions = planGroups(inventory);
+    console.log(`${companyName}: ${inventory.length} groups, ${actions.deletions.length} to delete, 'everyone' group to keep: ${actions.keep ? actions.keep.index : 'none'}.`);
+    await applyGroupActions(actions);
+}
+
+// Carry out planned actions through the UI: top up the kept 'everyone'
+// group, then delete the planned groups. Groups are found through the group
+// model; deleting from the last panel to the first keeps panels without a
+// server id at their positions.
+async function applyGroupActions(actions) {
+    activeGroup = actions.keep;
+    if (actions.keep && await reopenGroup(actions.keep)) {
+        console.log(`Processing 'everyone' group ${actions.keep.index} that already has members.`);
+        await handleEveryoneGroupWithMembers(actions.keep);
+        hasProcessedEveryoneGroupWithMembers = true;
+    }
+    for (const group of actions.deletions.slice().reverse()) {
+        if (stopRequested()) {
+            break;
         }
-    } else {
-        console.error(`Delete button not found for group ID ${groupIndex}`);
+        console.log(`Deleting group ${group.index}: ${group.name} (${group.members} members).`);
+        activeGroup = group;
+        await deleteGroup(group);
     }
+    activeGroup = null;
 }
 
-// Function to handle 'everyone' group with members
-async function handleEveryoneGroupWithMembers(groupIndex) {
-    await delay(150);
-
-    // Local function to check if the modal is visible
-    async function waitForModalVisible(selector, timeout = 5000) {
-        return new Promise((resolve, reject) => {
-            const startTime = Date.now();
-            const checkExist = setInterval(() => {
-                const modal = document.querySelector(selector);
-                if (modal && modal.style.display === 'block' && modal.style.visibility !== 'hidden') {
-                    clearInterval(checkExist);
-                    resolve(modal);
-                } else if (Date.now() - startTime >= timeout) {
-                    clearInterval(checkExist);
-                    console.error(`Modal ${selector} did not become visible within ${timeout} ms`);
-                    reject(new Error(`Modal ${selector} did not become visible within ${timeout} ms`));
+// Function to delete a group
+async function deleteGroup(group) {
+    return timeStep('delete group', async () => {
+        console.log(`Deleting group ID: ${group.index}`);
+        let groupReopened = await reopenGroup(group);
+        if (!groupReopened) {
+            reportError(`Could not reopen group ${group.index} (${group.name}). Skipping deletion.`);
+            return;
+        }
+        let deleteButton = await timedWait('delete button', 20000,
+            timeout => waitForGroupElement(group, '[id^="collapse"] > div > div > div.col-lg-12.pull-right > button', timeout));
+        if (deleteButton) {
+            deleteButton.click();
+            console.log(`Clicked delete button for group ${group.index}.`);
+            await waitSpinner('delete click');
+            await pause('delete click', 75);
+
+            let confirmButton = await timedWait('confirm dialog', 20000, timeout => waitForElementAppear('#deleteGroup', timeout));
+            if (confirmButton) {
+                await waitSpinner('confirm dialog');
+                await pause('confirm dialog', 75);
+                const groupTokens = learningEndpoint('delete') ? groupTokenCandidates(groupPanel(group)) : [];
+                const confirmSeq = requestTracker.seq;
+                confirmButton.click();
+                console.log(`Clicked confirm button for group deletion.`);
+                if (groupTokens.length > 0) {
+                    // Let the deletion request finish, then learn it
+                    await waitForPageSettled('learn delete').catch(() => null);
+                    learnEndpoint('delete', confirmSeq, { group: groupTokens }, entry => entry.method !== 'GET');
                 }
-            }, 100);
-        });
+                groupModel.entries.delete(group.key);
+                currentCompany.deleted++;
+                runStats.deleted++;
+                emitEvent('group_deleted', {
+                    company: currentCompany.name,
+                    value: currentCompany.value,
+                    groupIndex: group.index,
+                    groupId: group.id,
+                    group: group.name
+                });
+            }
+        } else {
+            reportError(`Delete button not found for group ID ${group.index}`);
+        }
+    });
+}
+
+// Select every enabled, unchecked member checkbox. The clicks go out in
+// chunks that yield to the event loop in between, without scrolling each box
+// into view, so the renderer stays responsive however many users there are.
+// Returns the number of checkboxes selected.
+async function selectMemberCheckboxes(checkboxes) {
+    const eligible = checkboxes.filter(checkbox => !checkbox.disabled && !checkbox.checked);
+    const chunkSize = 100;
+    for (let start = 0; start < eligible.length; start += chunkSize) {
+        for (const checkbox of eligible.slice(start, start + chunkSize)) {
+            checkbox.click();
+        }
+        await delay(0);
+    }
+    if (eligible.length < checkboxes.length) {
+        console.log(`${checkboxes.length - eligible.length} member checkboxes were disabled or already selected.`);
     }
+    return eligible.length;
+}
 
-    // Wait for the "+" button to open the modal
-    let addButton = await waitForElementAppear('.panel-collapse.in .indicator.glyphicon.glyphicon-plus[data-original-title="Add Member"]', 20000);
-    if (addButton) {
-        console.log(`Found the add button for group ID ${groupIndex}. Attempting to open modal.`);
-        addButton.click();
-        console.log(`Clicked add members button for group ID ${groupIndex}.`);
+// Function to handle 'everyone' group with members
+async function handleEveryoneGroupWithMembers(group) {
+    return timeStep('add members', async () => {
+        const groupIndex = group.index;
+        await pause('everyone group', 150);
 
-        // Wait for modal to be fully visible
-        try {
-            await waitForModalVisible('#availableUsers', 5000);
-            console.log(`Modal is visible for group ID ${groupIndex}.`);
-        } catch (error) {
-            console.error(`Stopping script because modal failed to open for group ID ${groupIndex}.`);
-            throw error;
+        // Local function to check if the modal is visible
+        async function waitForModalVisible(selector, timeout = 5000) {
+            try {
+                return await waitForCondition(`modal ${selector}`, () => {
+                    const modal = document.querySelector(selector);
+                    return modal && modal.style.display === 'block' && modal.style.visibility !== 'hidden' ? modal : null;
+                }, timeout);
+            } catch (error) {
+                console.error(`Modal ${selector} did not become visible within ${timeout} ms`);
+                throw new Error(`Modal ${selector} did not become visible within ${timeout} ms`);
+            }
+        }
+
+        // Wait for the "+" button to open the modal
+        let addButton = await timedWait('add member button', 20000,
+            timeout => waitForGroupElement(group, '.panel-collapse.in .indicator.glyphicon.glyphicon-plus[data-original-title="Add Member"]', timeout));
+        const groupTokens = learningEndpoint('users') || learningEndpoint('add_members') ? groupTokenCandidates(groupPanel(group)) : [];
+        const openSeq = requestTracker.seq;
+        if (addButton) {
+            console.log(`Found the add button for group ID ${groupIndex}. Attempting to open modal.`);
+            addButton.click();
+            console.log(`Clicked add members button for group ID ${groupIndex}.`);
+
+            // Wait for modal to be fully visible
+            try {
+                await timedWait('members modal', 5000, timeout => waitForModalVisible('#availableUsers', timeout));
+                console.log(`Modal is visible for group ID ${groupIndex}.`);
+            } catch (error) {
+                reportError(`Stopping script because modal failed to open for group ID ${groupIndex}.`);
+                throw error;
+            }
         }
-    }
-        
-    // Small wait for checkboxes to appear
-    const checkboxSelector = '#availableUsersForm > div.modal-body > ul > li > label > input[type=checkbox]';
-    let checkboxes;
-    try {
-        await waitForElementRemoved('.spinner', 10000);
         
-        // Wait for checkboxes with a longer timeout
-        checkboxes = await waitForElementAppear(checkboxSelector, 500);
+        // Small wait for checkboxes to appear
+        const checkboxSelector = '#availableUsersForm > div.modal-body > ul > li > label > input[type=checkbox]';
+        try {
+            await waitSpinner('members modal');
+            if (groupTokens.length > 0 && learningEndpoint('users')) {
+                learnEndpoint('users', openSeq, { group: groupTokens }, entry => {
+                    try {
+                        return entry.method === 'GET' && findRecords(JSON.parse(entry.response), AUGD_CONFIG.api_fields.user_id) !== null;
+                    } catch (error) {
+                        return false;
+                    }
+                });
+            }
         
-        if (checkboxes.length > 0) {
-            console.log(`Checkboxes found for group ID ${groupIndex}. Clicking them...`);
-
-            // Adding a small delay before interacting with checkboxes
-            await delay(200);
-
-            checkboxes.forEach(checkbox => {
-                // Ensure the checkbox is not disabled and interactable
-                if (checkbox && !checkbox.disabled) {
-                    checkbox.scrollIntoView();  // Scroll into view if needed
-                    checkbox.click();
-                    console.log(`Clicked checkbox for group ID ${groupIndex}`);
+            // Wait for the first checkbox; a timeout here means the group is
+            // already full. The wait returns one element, so the whole list is
+            // read afterwards.
+            await timedWait('member checkboxes', 500, timeout => waitForElementAppear(checkboxSelector, timeout), false)
+                .catch(() => null);
+            const checkboxes = Array.from(document.querySelectorAll(checkboxSelector));
+
+            if (checkboxes.length > 0) {
+                console.log(`${checkboxes.length} checkboxes found for group ID ${groupIndex}. Selecting them...`);
+
+                // Adding a small delay before interacting with checkboxes
+                await pause('member checkboxes', 200);
+
+                const selected = await selectMemberCheckboxes(checkboxes);
+                console.log(`Selected ${selected} of ${checkboxes.length} members for group ID ${groupIndex}.`);
+
+                // Find and click the add members confirmation button
+                let submitButton = document.querySelector('#availableUsersForm > div.modal-footer > button.btn.btn-primary');
+                if (submitButton) {
+                    const memberIds = Array.from(document.querySelectorAll(`${checkboxSelector}:checked`), checkbox => checkbox.value);
+                    const submitSeq = requestTracker.seq;
+                    submitButton.click();
+                    console.log(`Clicked add members confirmation button for group ID ${groupIndex}. Modal will close automatically.`);
+                    if (groupTokens.length > 0 && learningEndpoint('add_members') && memberIds.length > 0) {
+                        await waitForPageSettled('learn add members').catch(() => null);
+                        learnEndpoint('add_members', submitSeq, { group: groupTokens },
+                            entry => entry.method !== 'GET' && entry.body !== null,
+                            entry => templateMembers(entry.body, memberIds));
+                    }
+                    return;
                 } else {
-                    console.warn(`Checkbox not clickable or is disabled:`, checkbox);
+                    reportError(`Add Members button not found.`);
                 }
-            });
-
-            // Find and click the add members confirmation button
-            let submitButton = document.querySelector('#availableUsersForm > div.modal-footer > button.btn.btn-primary');
-            if (submitButton) {
-                submitButton.click();
-                console.log(`Clicked add members confirmation button for group ID ${groupIndex}. Modal will close automatically.`);
-                return;
             } else {
-                console.error(`Add Members button not found.`);
+                console.log(`No checkboxes found for group ID ${groupIndex} (already full). Proceeding to close the modal.`);
             }
-        } else {
-            console.log(`No checkboxes found for group ID ${groupIndex} (already full). Proceeding to close the modal.`);
+        } catch (error) {
+            reportError(`Error finding or clicking checkboxes for group ID ${groupIndex}:`, error);
         }
-    } catch (error) {
-        console.error(`Error finding or clicking checkboxes for group ID ${groupIndex}:`, error);
-    }
 
-    // Ensure the modal is closed manually if no members were added
-    let closeModalButton = document.querySelector('button.close[data-dismiss="modal"]');
-    if (closeModalButton) {
-        closeModalButton.click();
-        console.log(`Attempted to close modal for group ID ${groupIndex}`);
+        // Ensure the modal is closed manually if no members were added
+        let closeModalButton = document.querySelector('button.close[data-dismiss="modal"]');
+        if (closeModalButton) {
+            closeModalButton.click();
+            console.log(`Attempted to close modal for group ID ${groupIndex}`);
         
-        let modalClosed = false;
-        const maxRetries = 5;
-        let retryCount = 0;
-        while (!modalClosed && retryCount < maxRetries) {
-            await delay(250);
-            let modalElement = document.querySelector('#availableUsers');
-            if (!modalElement || modalElement.style.display === 'none') {
-                modalClosed = true;
-                console.log(`Modal successfully closed for group ID ${groupIndex}`);
-            } else {
-                retryCount++;
-                console.log(`Retrying to close modal... attempt ${retryCount}`);
-                closeModalButton.click();
+            let modalClosed = false;
+            const maxRetries = 5;
+            let retryCount = 0;
+            while (!modalClosed && retryCount < maxRetries) {
+                await pause('close modal', 250);
+                let modalElement = document.querySelector('#availableUsers');
+                if (!modalElement || modalElement.style.display === 'none') {
+                    modalClosed = true;
+                    console.log(`Modal successfully closed for group ID ${groupIndex}`);
+                } else {
+                    retryCount++;
+                    console.log(`Retrying to close modal... attempt ${retryCount}`);
+                    closeModalButton.click();
+                }
             }
-        }
         
-        if (!modalClosed) {
-            console.error(`Failed to close modal after ${maxRetries} attempts.`);
+            if (!modalClosed) {
+                reportError(`Failed to close modal after ${maxRetries} attempts.`);
+            }
+        } else {
+            reportError(`Close button not found for group ID ${groupIndex}.`);
         }
-    } else {
-        console.error(`Close button not found for group ID ${groupIndex}.`);
-    }
+    });
 }
 
 
-// Main entry point
+// Main entry point. With list_companies_only (HTTP engine runs), the script
+// only opens the User Groups page and reports its companies.
 (async function () {
+    if (AUGD_CONFIG.list_companies_only) {
+        await bridge.ready;
+        let companies = [];
+        try {
+            await timeStep('open user groups page', openUserGroupsPage);
+            await waitSpinner('company list');
+            companies = Array.from(document.querySelectorAll('#company_data option'), option => [option.value, option.textContent.trim()]);
+        } catch (error) {
+            reportError("Could not open the User Groups page to list the companies:", error);
+        }
+        emitEvent('company_list', { companies: companies, headers: sessionHeaders() });
+        flushEvents();
+        return;
+    }
+
+    let status = 'completed';
     try {
-        console.log("Starting automation process...");
+        await bridge.ready;
+        console.info("Starting automation process...");
         await automateUserGroupManagement();  // Start the automation
-        console.log("Automation process completed successfully.");
+        if (stopRequested()) {
+            status = 'stopped';
+            console.info("Automation process stopped by the user.");
+        } else {
+            console.info("Automation process completed successfully.");
+        }
     } catch (error) {
-        console.error("An error occurred during the automation process:", error);
+        status = 'failed';
+        reportError("An error occurred during the automation process:", error);
+    } finally {
+        logWaitStats();
+        logLatencyProfile();
+        exportLatencyProfile();
+        exportResourceSizes();
+        emitEvent('run_complete', {
+            status: status,
+            companies: runStats.companies,
+            inspected: runStats.inspected,
+            deleted: runStats.deleted,
+            errors: runStats.errors,
+            cacheHits: runStats.cacheHits,
+            cacheMisses: runStats.cacheMisses,
+            waitsResolved: waitEngine.stats.resolved,
+            waitsTimedOut: waitEngine.stats.timedOut,
+            stepTimings: roundStepTimings(),
+            durationMs: Math.round(performance.now() - runStats.startTime)
+        });
+        flushEvents();
     }
 })();
 """
 
+        # Pass the current settings to the script as window.AUGD_CONFIG
+        settings = load_settings()
+        settings["latency_profile"] = load_latency_profile()
+        settings["learned_api_endpoints"] = load_api_endpoints()
+        settings["skip_companies"] = list(skip_companies)
+        settings["run_id"] = self.run_id
+        settings["run_token"] = self.run_token
+        settings["company_slice"] = list(company_slice)
+        settings["company_fingerprints"] = self.cache_fingerprints
+        settings["list_companies_only"] = list_companies
+        if settings["log_verbosity"] == "production":
+            script = strip_debug_logging(script, settings["log_detail_company"])
+        script = f"window.AUGD_CONFIG = {json.dumps(settings)};\n" + script
+
+        # The QWebChannel client library must be defined before the script runs
+        script = load_qwebchannel_js() + "\n" + script
+
         # Inject the JavaScript into the webpage
-        self.webview.page().runJavaScript(script)
+        (page or self.webview.page()).runJavaScript(script)
 
-    def on_page_load(self):
+    def on_page_load(self, ok=True):
         """Handle page load completion."""
         logging.info("Page loaded successfully.")
         self.status_bar.showMessage(f"Page loaded at {get_timestamp()}")
+        if self.headless and not self.headless_started:
+            self.start_headless_run(ok)
+        elif ok and not self.warmed_up and load_settings()["browser_profile"]["warm_up"]:
+            self.warm_up()
+
+    def warm_up(self):
+        """
+        Once logged in, load the User Groups page in the background. With a
+        page pool the pool pages are created now; otherwise a temporary page
+        fills the HTTP cache and is then dropped.
+        """
+        settings = load_settings()
+        menu_link = "#header_nav > div > div.row.top-menu > div > ul > li.profile > div > div.media-body.dropdown > ul > li:nth-child(5) > a"
+
+        def on_link_found(href):
+            url = settings["browser_profile"]["user_groups_url"] or href
+            if not url or not url.startswith("http"):
+                return  # Not logged in yet, or the menu link is script-driven; try again on the next load
+            if url == self.page.url().toString() and settings["page_pool_size"] <= 1:
+                return  # Already loaded in the visible page, so the cache is warm
+            self.warmed_up = True
+            start = time.monotonic()
+            if settings["page_pool_size"] > 1:
+                logging.info(f"Warming up {settings['page_pool_size']} pool pages with {url}")
+                self.page_pool.ensure_size(settings["page_pool_size"], url)
+                return
+            logging.info(f"Warming up the browser cache with {url}")
+            self.warmup_page = WebEnginePage(self.profile, self)
+
+            def on_warmed(ok):
+                logging.info(f"Warm-up {'finished' if ok else 'failed'} in {time.monotonic() - start:.1f} s")
+                self.warmup_page.deleteLater()
+                self.warmup_page = None
+
+            self.warmup_page.loadFinished.connect(on_warmed)
+            self.warmup_page.setUrl(QUrl(url))
+
+        self.page.runJavaScript(f"(document.querySelector('{menu_link}') || {{}}).href || ''", on_link_found)
 
-    def run_script(self):
-        """Start the script."""
-        logging.info("Script started.")
+    def start_headless_run(self, ok):
+        """Start an unattended run once the saved session has loaded the control panel."""
+        def on_login_checked(logged_in):
+            if logged_in:
+                self.run_script(resume=self.headless_resume)
+            else:
+                print("Not logged in. Start the GUI once and log in; the session is kept in the browser profile.",
+                      file=sys.stderr, flush=True)
+                QApplication.instance().exit(exit_codes["not_logged_in"])
+
+        if not ok:
+            print(f"Could not load {load_settings()['start_url']}.", file=sys.stderr, flush=True)
+            QApplication.instance().exit(exit_codes["not_logged_in"])
+            return
+        self.headless_started = True  # Ignore further page loads
+        self.webview.page().runJavaScript("!!document.querySelector('#header_nav')", on_login_checked)
+
+    def print_progress(self, event_type, event):
+        """Stream run progress to stdout (errors to stderr) for unattended runs."""
+        if event_type == "company_started":
+            self.progress_total = event["total"]
+        elif event_type == "company_finished":
+            print(f"[{event['index'] + 1}/{self.progress_total}] {event['company']}: {event['inspected']} groups "
+                  f"inspected, {event['deleted']} deleted ({event['durationMs'] / 1000:.1f} s)", flush=True)
+        elif event_type == "group_deleted":
+            print(f"    deleted {event['company']} / {event['group']}", flush=True)
+        elif event_type == "error":
+            print(f"Error ({event.get('company') or '-'}): {event['message']}", file=sys.stderr, flush=True)
+
+    def run_script(self, resume=False):
+        """Start the script, or continue the last interrupted run if resume is True."""
+        if self.is_running:
+            if self.stopping:
+                logging.warning("The previous run is still stopping; wait for it to finish.")
+                self.status_bar.showMessage(f"The previous run is still stopping. [{get_timestamp()}]")
+            else:
+                logging.warning("A run is already in progress; stop it before starting another.")
+                self.status_bar.showMessage(f"A run is already in progress. [{get_timestamp()}]")
+            return
+        if self.webview.page().url().isEmpty():
+            logging.error("Web page not loaded.")
+            self.status_label.setText(f"Error: Web page not loaded. [{get_timestamp()}]")
+            return
+
+        skip_companies = []
+        resumable_run = self.journal.resumable_run() if resume else None
+        if resumable_run:
+            self.run_id = resumable_run
+            skip_companies = self.journal.resume_run(self.run_id)
+        else:
+            self.run_id = self.journal.start_run()
+        self.run_count += 1
+        self.run_token = f"{self.run_id}#{self.run_count}"  # A resumed run keeps its run_id
+        self.engine_stop = threading.Event()
+        start_run_logs(self.run_id)  # With per-run segments, the run's log starts here
+        if resumable_run:
+            logging.info(f"Resuming run {self.run_id}; skipping {len(skip_companies)} finished companies.")
+        else:
+            logging.info(f"Script started. Run ID: {self.run_id}")
         self.status_label.setText(f"Status: Running script... [{get_timestamp()}]")
+        if not self.headless:
+            self.dashboard.start_run()
         self.is_running = True
-        if not self.webview.page().url().isEmpty():
-            self.inject_javascript()  # Inject JavaScript if the page is loaded
+        self.resume_button.setEnabled(False)
+        settings = load_settings()
+        if settings["lean_mode"]["enabled"]:
+            self.interceptor.start(settings["lean_mode"], load_resource_sizes())
+        self.structured_log = settings["structured_log"]
+        self.production_logging = settings["log_verbosity"] == "production"
+        self.detail_company = str(settings["log_detail_company"]).lower()
+        self.company_timings = []
+        self.cache_fingerprints = None
+        if settings["company_cache"]["enabled"]:
+            self.cache_evicted = self.company_cache.evict(settings["company_cache"]["max_age_days"])
+            self.cache_fingerprints = self.company_cache.fingerprints()
+        if settings["execution_mode"] == "http":
+            self.start_http_engine(skip_companies)
+        elif settings["page_pool_size"] > 1:
+            self.start_page_pool(skip_companies, settings["page_pool_size"], settings["pool_health_timeout_ms"])
         else:
-            logging.error("Web page not loaded.")
-            self.status_label.setText(f"Error: Web page not loaded. [{get_timestamp()}]")
+            self.inject_javascript(skip_companies)  # Inject JavaScript if the page is loaded
+
+    def start_page_pool(self, skip_companies, size, health_timeout_ms):
+        """Run the script on a pool of pages, each taking a disjoint slice of the companies."""
+        self.page_pool.ensure_size(size, self.page.url().toString())
+
+        def start(healthy_slots):
+            if not healthy_slots:
+                self.on_script_error({"message": "No pool page passed its health check. Try again once they have loaded."})
+                self.on_script_finished({
+                    "status": "failed", "companies": 0, "inspected": 0, "deleted": 0, "errors": 1, "durationMs": 0
+                })
+                return
+            logging.info(f"Running on {len(healthy_slots)} pool pages.")
+            self.pool_progress = {
+                slot: {"company": None, "done": 0, "total": 0, "result": None} for slot in healthy_slots
+            }
+            for position, slot in enumerate(healthy_slots):
+                self.inject_javascript(
+                    skip_companies, self.page_pool.slots[slot]["page"], (position, len(healthy_slots))
+                )
+
+        self.page_pool.check_health(size, start, health_timeout_ms)
+
+    def on_pool_event(self, slot, event_type, event):
+        """Handle an event from a pool page and update the merged progress view."""
+        progress = self.pool_progress.get(slot) if self.pool_progress else None
+        if progress is None or not self.is_current_run(event):
+            return  # Late event from a page that is not part of the current run
+        if event_type == "run_complete":
+            progress["result"] = event
+            self.finish_pool_run_if_done()
+            return
+        if event_type == "company_started":
+            progress["company"] = event["company"]
+            progress["total"] = event["total"]
+        elif event_type == "company_finished":
+            progress["company"] = None
+            progress["done"] += 1
+        self.on_bridge_event(event_type, event)
+        if event_type in ("company_started", "company_finished"):
+            self.show_pool_progress()
+
+    def show_pool_progress(self):
+        """Show every pool page's current company and the overall count."""
+        done = sum(progress["done"] for progress in self.pool_progress.values())
+        total = max(progress["total"] for progress in self.pool_progress.values())
+        pages = ", ".join(
+            f"{slot + 1}: {progress['company'] or 'idle'}" for slot, progress in self.pool_progress.items()
+        )
+        self.status_label.setText(f"Status: {done}/{total} companies done - pages {pages} [{get_timestamp()}]")
+
+    def on_pool_page_crashed(self, slot):
+        """Close out the slice of a pool page whose renderer died; resuming the run retries it."""
+        progress = self.pool_progress.get(slot) if self.pool_progress else None
+        if progress is None or progress["result"] is not None:
+            return
+        self.on_script_error({"message": f"Pool page {slot + 1} crashed.", "company": progress["company"]})
+        progress["result"] = {"status": "failed", "companies": progress["done"], "inspected": 0,
+                              "deleted": 0, "errors": 1, "durationMs": 0}
+        self.finish_pool_run_if_done()
+
+    def finish_pool_run_if_done(self):
+        """Merge the pool pages' summaries once every page has finished."""
+        results = [progress["result"] for progress in self.pool_progress.values()]
+        if any(result is None for result in results):
+            return
+        self.pool_progress = None
+        statuses = {result["status"] for result in results}
+        merged = {key: sum(result.get(key, 0) for result in results)
+                  for key in ("companies", "inspected", "deleted", "errors", "cacheHits", "cacheMisses",
+                              "waitsResolved", "waitsTimedOut")}
+        merged["status"] = next(status for status in ("failed", "stopped", "completed") if status in statuses)
+        merged["durationMs"] = max(result["durationMs"] for result in results)
+        merged["stepTimings"] = merge_step_timings(result.get("stepTimings") for result in results)
+        self.on_script_finished(merged)
+
+    def start_http_engine(self, skip_companies):
+        """Have the script list the companies, then run the HTTP engine in a background thread."""
+        settings = load_settings()
+        endpoints = load_api_endpoints()
+        endpoints.update({kind: template for kind, template in settings["api_endpoints"].items() if template})
+        run_token = self.run_token
+        emit = lambda event_type, event: self.bridge.event_received.emit(event_type, dict(event, runToken=run_token))
+        try:
+            if settings["work_queue"]["workers"] > 1:
+                runner = WorkQueueRunner(endpoints, list(self.cookies.values()), settings,
+                                         emit=emit, stop_event=self.engine_stop,
+                                         company_cache=self.cache_fingerprints)
+            else:
+                engine = HttpEngine(endpoints, list(self.cookies.values()), settings,
+                                    emit=emit, stop_event=self.engine_stop,
+                                    company_cache=self.cache_fingerprints)
+        except HttpEngineError as e:
+            self.on_bridge_event("error", {"message": str(e), "company": None})
+            self.on_bridge_event("run_complete", {
+                "status": "failed", "companies": 0, "inspected": 0, "deleted": 0, "errors": 1, "durationMs": 0
+            })
+            return
+
+        def run_engine(companies, session_headers):
+            (runner if settings["work_queue"]["workers"] > 1 else engine).session_headers = session_headers
+            if not companies:
+                emit("error", {"message": "No companies found. Open the User Groups page before running.", "company": None})
+            companies = [tuple(company) for company in companies or []
+                         if company_allowed(company[0], company[1], settings["company_filter"])]
+            skipped = len({value for value, _ in companies} & set(skip_companies))
+            emit("companies_selected", {"selected": len(companies) - skipped, "skipped": skipped})
+            if settings["work_queue"]["workers"] > 1:
+                runner.run(run_id, companies, skip_companies)
+            else:
+                asyncio.run(engine.run(companies, skip_companies))
+
+        def start(companies, session_headers):
+            threading.Thread(target=run_engine, args=(companies, session_headers), daemon=True).start()
+
+        run_id = self.run_id
+        logging.info("Running the HTTP engine with the browser session's cookies.")
+        # The script opens the User Groups page (headless runs start elsewhere) and sends back
+        # the companies and the page's current credential headers as a company_list event
+        self.pending_company_list = start
+        self.inject_javascript(list_companies=True)
+
+    def on_company_list(self, event):
+        """Start the HTTP engine waiting for the company list from the User Groups page."""
+        start, self.pending_company_list = self.pending_company_list, None
+        if start:
+            start(event["companies"], event["headers"])
+
+    def resume_script(self):
+        """Continue the last interrupted run, skipping companies it already finished."""
+        self.run_script(resume=True)
+
+    # How long a stopped run has to send run_complete before it is closed out without it
+    stop_grace_ms = 60000
 
     def stop_script(self):
-        """Stop the running script."""
+        """
+        Ask the running script to stop after its current company. The run stays
+        in the stopping state, and Run stays unavailable, until its run_complete
+        arrives.
+        """
+        if not self.is_running or self.stopping:
+            return
         logging.info("Script stopped by user.")
-        self.is_running = False
-        # Inject a stop flag directly into the JavaScript code
-        self.webview.page().runJavaScript("window.stop = true;")
-        self.status_label.setText(f"Status: Script stopped. [{get_timestamp()}]")
+        self.stopping = True
+        # Set the run's stop token in the pages the script runs in
+        stop = f"(window.augdStopTokens = window.augdStopTokens || {{}})[{json.dumps(self.run_token)}] = true;"
+        self.webview.page().runJavaScript(stop)
+        self.page_pool.run_javascript(stop)
+        self.engine_stop.set()
+        self.status_label.setText(f"Status: Stopping after the current company... [{get_timestamp()}]")
+        run_token = self.run_token
+        QTimer.singleShot(self.stop_grace_ms, lambda: self.close_stopped_run(run_token))
+
+    def close_stopped_run(self, run_token):
+        """Finish a stopped run that never sent run_complete (its page was reloaded or crashed)."""
+        if not self.stopping or self.run_token != run_token:
+            return
+        logging.warning("The stopped run did not report back; closing it out.")
+        self.on_script_finished({
+            "status": "stopped", "companies": 0, "inspected": 0, "deleted": 0, "errors": 0, "durationMs": 0
+        })
+
+    def search_logs(self):
+        """Search the logs for the query in the search box, indexing new log lines first."""
+        query = self.search_box.text().strip()
+        if not query:
+            self.search_results.hide()
+            return
+        self.status_bar.showMessage(f"Searching logs: {query}")
+        threading.Thread(target=self.run_log_search, args=(query,), daemon=True).start()
+
+    def run_log_search(self, query):
+        """Update the index and run the query; runs on a worker thread with its own connection."""
+        try:
+            index = LogSearchIndex()
+            try:
+                index.update()
+                rows = index.search(query, 200)
+            finally:
+                index.close()
+            text = format_log_results(rows) or "No matching log entries."
+        except (ValueError, sqlite3.Error) as error:
+            text = f"Search failed: {error}"
+        self.log_search_finished.emit(text)
+
+    def on_log_search_finished(self, text):
+        self.search_results.setPlainText(text)
+        self.search_results.show()
+        self.status_bar.clearMessage()
+
+    def on_cookie_added(self, cookie):
+        """Track a cookie from the browser profile."""
+        name = bytes(cookie.name()).decode("utf-8", "replace")
+        self.cookies[(cookie.domain(), cookie.path(), name)] = {
+            "name": name,
+            "value": bytes(cookie.value()).decode("utf-8", "replace"),
+            "domain": cookie.domain(),
+            "path": cookie.path(),
+            "secure": cookie.isSecure(),
+        }
+
+    def on_cookie_removed(self, cookie):
+        """Forget a cookie removed from the browser profile."""
+        name = bytes(cookie.name()).decode("utf-8", "replace")
+        self.cookies.pop((cookie.domain(), cookie.path(), name), None)
+
+    def is_current_run(self, event):
+        """False for an event tagged with an earlier run's token."""
+        return event.get("runToken", self.run_token) == self.run_token
+
+    def on_bridge_event(self, event_type, event):
+        """Dispatch an event from the script to its handler."""
+        if not self.is_current_run(event):
+            return  # Late event from a finished or closed-out run
+        if self.structured_log and event_type != "step_started":
+            self.log_action(event_type, event)
+        self.dashboard.on_event(event_type, event)
+        if self.headless:
+            self.print_progress(event_type, event)
+        handler = self.event_handlers.get(event_type)
+        if handler:
+            handler(event)
+        else:
+            logging.warning(f"Unknown event from script: {event_type}")
+
+    # Event fields copied into action records, and the name they get there
+    action_fields = {
+        "value": "company", "company": "companyName", "groupId": "group", "group": "groupName",
+        "step": "step", "ms": "ms", "durationMs": "ms", "outcome": "outcome", "message": "message",
+        "inspected": "inspected", "deleted": "deleted", "members": "members",
+    }
+    action_outcomes = {"group_deleted": "deleted", "error": "error", "company_finished": "ok"}
+
+    def log_action(self, event_type, event):
+        """Write one record for a script event to the JSON-lines action log."""
+        if event_type in ("latency_profile", "api_endpoints", "resource_sizes", "inventory_plan"):
+            return  # Saved to their own files
+        action = {"run": self.run_id, "event": event_type}
+        for key, field in self.action_fields.items():
+            if event.get(key) is not None:
+                action[field] = event[key]
+        if event_type == "run_complete":
+            action["outcome"] = event["status"]
+        elif "outcome" not in action and event_type in self.action_outcomes:
+            action["outcome"] = self.action_outcomes[event_type]
+        log_action(action)
+
+    def on_company_started(self, event):
+        """Show which company the script is working on."""
+        self.journal.company_started(self.run_id, event["value"], event["company"])
+        logging.info(f"Company started ({event['index'] + 1}/{event['total']}): {event['company']}")
+        self.status_label.setText(
+            f"Status: Processing company {event['index'] + 1}/{event['total']}: {event['company']} [{get_timestamp()}]"
+        )
+
+    def on_company_finished(self, event):
+        """Log the per-company totals."""
+        if not event.get("errors"):  # A company with errors is left unfinished so a resumed run retries it
+            self.journal.company_finished(self.run_id, event["value"], event["inspected"], event["deleted"])
+        self.company_timings.append((event["company"], event["value"], event["durationMs"], event.get("timing")))
+        if event.get("fingerprint") and self.cache_fingerprints is not None and not event.get("cacheHit"):
+            self.company_cache.store(event["value"], event["fingerprint"])  # Only a full check renews an entry
+        logging.info(
+            f"Company finished: {event['company']} - {event['inspected']} groups inspected, "
+            f"{event['deleted']} deleted in {event['durationMs'] / 1000:.1f} s"
+            + (f", {event['errors']} errors" if event.get("errors") else "")
+        )
+        if event.get("steps"):
+            # Production verbosity: the company's step totals, most time first
+            steps = sorted(event["steps"].items(), key=lambda item: item[1][1], reverse=True)
+            logging.info("Company steps: " + ", ".join(
+                f"{step} {count}x {ms} ms" + (f" ({timeouts} timed out)" if timeouts else "")
+                for step, (count, ms, timeouts) in steps
+            ))
+
+    def is_detail_company(self, event):
+        """True if full detail is logged for the event's company."""
+        return bool(self.detail_company) and self.detail_company in (
+            str(event.get("value", "")).lower(), str(event.get("company", "")).lower()
+        )
+
+    def on_group_inspected(self, event):
+        """Log a group's name and member count (summarised per company in production verbosity)."""
+        if self.production_logging and not self.is_detail_company(event):
+            return
+        logging.info(f"Group inspected: {event['company']} / {event['group']} ({event['members']} members)")
+
+    def on_group_deleted(self, event):
+        """Log a group deletion for the audit trail."""
+        group_ref = event.get("groupId") or event["groupIndex"]
+        self.journal.group_deleted(self.run_id, event["value"], event["company"], event["group"], group_ref)
+        logging.info(f"Group deleted: {event['company']} / {event['group']} (group ID {group_ref})")
+        self.status_bar.showMessage(f"Deleted group '{event['group']}' in {event['company']} at {get_timestamp()}")
+
+    def on_script_error(self, event):
+        """Log an error reported by the script."""
+        company = event.get("company") or "-"
+        logging.error(f"Script error (company: {company}): {event['message']}")
+        self.status_bar.showMessage(f"Error: {event['message']} [{get_timestamp()}]")
+
+    def on_latency_profile(self, event):
+        """Save the latency profile learned by the script."""
+        save_latency_profile(event["profile"])
+
+    def on_api_endpoints(self, event):
+        """Save endpoints learned by the API execution mode."""
+        save_api_endpoints(event["endpoints"])
+
+    def on_inventory_plan(self, event):
+        """Log the inventory phase's summary and keep the plan for review."""
+        logging.info(
+            f"Inventory: {event['scanned']} companies scanned in {event['durationMs'] / 1000:.1f} s, "
+            f"{event['planned']} need changes ({event['deletions']} planned deletions)"
+        )
+        self.status_bar.showMessage(
+            f"Inventory done: {event['planned']} of {event['scanned']} companies need changes [{get_timestamp()}]"
+        )
+        save_json(inventory_plan_path, {"run_id": self.run_id, "saved": datetime.now().isoformat(), "plan": event},
+                  "the inventory plan")
+
+    def on_resource_sizes(self, event):
+        """Merge the resource sizes reported by the page, keeping a per-type average for unseen URLs."""
+        sizes = load_resource_sizes()
+        sizes.update(event["sizes"])
+        by_type = {}
+        for url, size in sizes.items():
+            if url.startswith("average:"):
+                continue
+            file_name = url.rsplit("/", 1)[-1]
+            extension = file_name.rsplit(".", 1)[-1].lower() if "." in file_name else ""
+            resource_type = LeanModeInterceptor.extension_types.get(extension)
+            if resource_type:
+                by_type.setdefault(resource_type, []).append(size)
+        for resource_type, type_sizes in by_type.items():
+            sizes["average:" + resource_type] = round(sum(type_sizes) / len(type_sizes))
+        save_resource_sizes(sizes)
 
-    @pyqtSlot()
     def on_script_finished(self, result):
         """Handle script completion."""
-        if self.is_running:
+        self.journal.finish_run(self.run_id, result["status"])
+        finish_run_logs(self.run_id)
+        self.dashboard.finish_run()
+        if self.interceptor.active:
+            lean = self.interceptor.stop()
+            by_type = ", ".join(f"{count} {resource_type}" for resource_type, count in sorted(lean["byType"].items()))
+            logging.info(
+                f"Lean mode blocked {lean['blocked']} requests ({by_type or 'none'}), saving about "
+                f"{lean['bytesSaved'] / 1024:.0f} KB ({lean['unknownSizes']} with estimated sizes)"
+            )
+        self.resume_button.setEnabled(self.journal.resumable_run() is not None)
+        logging.info(
+            f"Run {result['status']}: {result['companies']} companies, {result['inspected']} groups inspected, "
+            f"{result['deleted']} deleted, {result['errors']} errors in {result['durationMs'] / 1000:.1f} s"
+        )
+        if "requestsPerSec" in result:
+            logging.info(
+                f"HTTP engine throughput: {result['requests']} requests, "
+                f"{result['requestsPerSec']} requests/sec, {result['groupsPerSec']} groups/sec"
+            )
+        log_counts = log_queue_handler.counts()
+        if log_counts["dropped"] or log_counts["deduplicated"]:
+            logging.info(
+                f"Logging: {log_counts['dropped']} console messages dropped while the log queue was full, "
+                f"{log_counts['deduplicated']} repeated records collapsed"
+            )
+        if self.cache_fingerprints is not None:
+            logging.info(
+                f"Company cache: {result.get('cacheHits', 0)} hits, {result.get('cacheMisses', 0)} misses, "
+                f"{self.cache_evicted} stale entries evicted"
+            )
+        report = build_timing_report(self.run_id, result, self.company_timings)
+        report_path = save_timing_report(report)
+        logging.info(
+            f"Timing: wait {report['waitMs'] / 1000:.1f} s, work {report['workMs'] / 1000:.1f} s"
+            + (f", {report['steps'][0]['step']} took the most time ({report['steps'][0]['ms'] / 1000:.1f} s)" if report["steps"] else "")
+            + (f"; breakdown saved to {report_path}" if report_path else "")
+        )
+        self.timing_view.setPlainText(format_timing_report(report))
+        self.timing_view.show()
+        for worker, stats in result.get("workers", {}).items():
+            logging.info(
+                f"{worker}: {stats['companies']} companies, {stats['groups']} groups, {stats['requests']} requests, "
+                f"{stats['companiesPerSec']} companies/sec, {stats['requeued']} requeued after crashes"
+            )
+        if self.stopping:
+            logging.info("Script stopped early by user.")
+            self.status_label.setText(f"Status: Script stopped early. [{get_timestamp()}]")
+            outcome = "stopped"
+        elif result["status"] == "completed":
             logging.info("Script completed successfully.")
             self.status_label.setText(f"Status: Script completed. [{get_timestamp()}]")
+            outcome = "completed"
         else:
-            logging.info("Script stopped early by user.")
-            self.status_label.setText(f"Status: Script stopped early. [{get_timestamp()}]")
+            logging.error("Script failed. See the log for details.")
+            self.status_label.setText(f"Status: Script failed. [{get_timestamp()}]")
+            outcome = "failed"
+        self.is_running = False
+        self.stopping = False
+        self.run_token = None  # Anything the run still sends is ignored
+        if self.headless:
+            print(f"Run {outcome}: {result['companies']} companies, {result['inspected']} groups inspected, "
+                  f"{result['deleted']} deleted, {result['errors']} errors in {result['durationMs'] / 1000:.1f} s",
+                  flush=True)
+            QApplication.instance().exit(exit_codes[outcome])
+
+# Process exit codes for --headless runs
+exit_codes = {
+    "completed": 0,
+    "failed": 1,       # The run finished with errors; Resume Run retries unfinished companies
+    "usage": 2,        # Bad command-line options (also argparse's own code)
+    "not_logged_in": 3,
+    "stopped": 130,    # Interrupted with Ctrl+C
+}
+
+def run_headless(args, qt_args):
+    """Run the automation offscreen with the saved browser session and return the exit code."""
+    if args.mode:
+        settings_overrides["execution_mode"] = args.mode
+    mode = args.mode or load_settings()["execution_mode"]
+    if args.parallel:
+        if mode == "http":
+            settings_overrides["work_queue"] = {"workers": args.parallel}
+        else:
+            settings_overrides["page_pool_size"] = args.parallel
+    if args.verbosity:
+        settings_overrides["log_verbosity"] = args.verbosity
+    if args.log_detail:
+        settings_overrides["log_detail_company"] = args.log_detail
+    settings_overrides["company_filter"] = {
+        "include": [entry.strip() for entry in ",".join(args.companies).split(",") if entry.strip()],
+        "exclude": [entry.strip() for entry in ",".join(args.exclude_companies).split(",") if entry.strip()],
+    }
+    try:
+        viewport = tuple(int(size) for size in args.viewport.lower().split("x"))
+        if len(viewport) != 2:
+            raise ValueError
+    except ValueError:
+        print(f"Invalid --viewport {args.viewport!r}; expected WIDTHxHEIGHT.", file=sys.stderr)
+        return exit_codes["usage"]
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # No window system, nothing painted on screen
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(headless=True, viewport=viewport, resume=args.resume)
+    window.show()  # Shown on the offscreen platform so the page is not throttled as hidden
+
+    # Let Ctrl+C stop the run cleanly; the timer gives Python a chance to run the handler
+    signal.signal(signal.SIGINT, lambda signum, frame: window.stop_script() if window.is_running and not window.stopping
+                  else app.exit(exit_codes["stopped"]))
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(200)
+    return app.exec_()
+
+class LatencyHistogram:
+    """
+    Constant-memory latency distribution for the action log analysis. Samples
+    are counted in logarithmic buckets 2% wide, so percentiles are within
+    about 1% of the exact value however many samples there are.
+    """
+    growth = 1.02
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        bucket = int(math.log(ms, self.growth)) if ms >= 1 else -1  # -1 holds everything under 1 ms
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p):
+        """The p-th percentile in ms, taken as the middle of its bucket."""
+        target = self.count * p / 100
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return 0.0 if bucket < 0 else min(self.growth ** (bucket + 0.5), self.max_ms)
+        return self.max_ms
+
+def action_log_segments(path):
+    """
+    The action log's files, oldest first: numbered backups from before
+    segmented rotation, the segments in log_segments.json, then the file
+    itself.
+    """
+    folder, name = os.path.split(path)
+    backups = []
+    for entry in os.listdir(folder or "."):
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(name + ".") and suffix.isdigit():
+            backups.append((int(suffix), os.path.join(folder, entry)))
+    segments = [segment for _, segment in sorted(backups, reverse=True)]  # The highest number is the oldest
+    try:
+        with open(os.path.join(folder, os.path.basename(log_index_path)), "r") as index_file:
+            indexed = json.load(index_file)["segments"]
+    except (OSError, ValueError, KeyError):
+        indexed = []
+    for segment in sorted(indexed, key=lambda segment: segment["start"]):
+        segment_path = os.path.join(folder, segment["file"])
+        if segment["log"] != name:
+            continue
+        if not os.path.exists(segment_path) and os.path.exists(segment_path + ".gz"):
+            segment_path += ".gz"  # Compressed since the index was read
+        if os.path.exists(segment_path):
+            segments.append(segment_path)
+    return segments + ([path] if os.path.exists(path) else [])
+
+def analyze_action_log(path=action_log_path, top=10, run_id=None):
+    """
+    Stream the action log and its backups line by line and print per-step
+    latency percentiles, the slowest companies and the time spent in timeouts.
+    Memory use does not grow with the size of the log. Returns an exit code.
+    """
+    segments = action_log_segments(path)
+    if not segments:
+        print(f"No action log at {path}. Set \"structured_log\": true and run the script first.", file=sys.stderr)
+        return 1
+    steps = {}
+    timeouts = {}
+    slowest = []  # Min-heap of the top slowest companies: (ms, sequence, run, company)
+    records = unreadable = 0
+    for segment in segments:
+        opener = gzip.open if segment.endswith(".gz") else open
+        with opener(segment, "rt", encoding="utf-8", errors="replace") as lines:
+            for line in lines:
+                try:
+                    action = json.loads(line)
+                except ValueError:
+                    unreadable += 1
+                    continue
+                if run_id is not None and action.get("run") != run_id:
+                    continue
+                records += 1
+                ms = action.get("ms")
+                if not isinstance(ms, (int, float)):
+                    continue
+                if action.get("event") == "step":
+                    step = action.get("step") or "?"
+                    steps.setdefault(step, LatencyHistogram()).add(ms)
+                    if action.get("outcome") == "timeout":
+                        spent = timeouts.setdefault(step, [0, 0.0])
+                        spent[0] += 1
+                        spent[1] += ms
+                elif action.get("event") == "company_finished":
+                    entry = (ms, records, action.get("run"), action.get("companyName") or action.get("company"))
+                    if len(slowest) < top:
+                        heapq.heappush(slowest, entry)
+                    elif ms > slowest[0][0]:
+                        heapq.heapreplace(slowest, entry)
+
+    print(f"{records} records from {len(segments)} files" + (f" ({unreadable} unreadable lines skipped)" if unreadable else ""))
+    print()
+    print(f"{'Step':<40} {'count':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}")
+    for step, histogram in sorted(steps.items(), key=lambda item: item[1].total_ms, reverse=True):
+        print(f"{step[:40]:<40} {histogram.count:>8} {histogram.percentile(50):>9.0f} {histogram.percentile(90):>9.0f} "
+              f"{histogram.percentile(99):>9.0f} {histogram.max_ms:>9.0f} {histogram.total_ms / 1000:>9.1f}")
+    print()
+    print(f"Slowest {len(slowest)} companies:")
+    for ms, _, run, company in sorted(slowest, reverse=True):
+        print(f"  {ms / 1000:>8.1f} s  {company} ({run})")
+    print()
+    total_timeouts = sum(count for count, _ in timeouts.values())
+    print(f"Time spent in timeouts: {sum(ms for _, ms in timeouts.values()) / 1000:.1f} s over {total_timeouts} timeouts")
+    for step, (count, ms) in sorted(timeouts.items(), key=lambda item: item[1][1], reverse=True):
+        print(f"  {step[:40]:<40} {count:>6} timeouts {ms / 1000:>9.1f} s")
+    return 0
 
 # Main entry point
 def main():
-    app = QApplication(sys.argv)  # Create the application
+    parser = argparse.ArgumentParser(description="AUGD - Automated User Group Deletion")
+    parser.add_argument("--mock-server", action="store_true",
+                        help="Serve a local stand-in control panel instead of starting the GUI")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --mock-server")
+    parser.add_argument("--mock-companies", type=int, default=20, help="Number of companies in the mock data")
+    parser.add_argument("--mock-latency-ms", type=int, default=0, help="Delay added to every mock API request")
+    parser.add_argument("--benchmark-http-engine", action="store_true",
+                        help="Run the HTTP engine against an in-process mock server and report throughput")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for --benchmark-http-engine (uses the work queue when above 1)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run unattended offscreen with the saved login, printing progress to stdout")
+    parser.add_argument("--mode", choices=["dom", "api", "http"], help="Execution mode for --headless")
+    parser.add_argument("--parallel", type=int,
+                        help="Pool pages (dom/api) or worker processes (http) for --headless")
+    parser.add_argument("--companies", action="append", default=[], metavar="LIST",
+                        help="Comma-separated company values or names to process (default: all)")
+    parser.add_argument("--exclude-companies", action="append", default=[], metavar="LIST",
+                        help="Comma-separated company values or names to skip")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted run (--headless)")
+    parser.add_argument("--viewport", default="1024x768", help="Page size for --headless, as WIDTHxHEIGHT")
+    parser.add_argument("--verbosity", choices=["full", "production"], help="Log verbosity for --headless")
+    parser.add_argument("--log-detail", metavar="COMPANY",
+                        help="Company value or name logged in full detail under production verbosity (--headless)")
+    parser.add_argument("--analyze-log", nargs="?", const=action_log_path, metavar="PATH",
+                        help="Print step latency percentiles, the slowest companies and timeout time from the "
+                             "action log (default: actions.jsonl in the log folder) and its backups")
+    parser.add_argument("--run", metavar="RUN_ID", help="Limit --analyze-log or --search-log to one run")
+    parser.add_argument("--top", type=int, default=10, help="Slowest companies listed by --analyze-log")
+    parser.add_argument("--search-log", metavar="QUERY",
+                        help="Search the indexed logs, e.g. 'action:deleted company:\"Acme\" group:Sales'. "
+                             "Plain words are matched anywhere in the message")
+    parser.add_argument("--limit", type=int, default=50, help="Results shown by --search-log")
+    args, qt_args = parser.parse_known_args()  # Leave Qt's own options to QApplication
+    setup_logging()
+    configure_log_rotation(load_settings()["log_rotation"])
+
+    if args.analyze_log:
+        sys.exit(analyze_action_log(args.analyze_log, args.top, args.run))
+
+    if args.search_log:
+        query = args.search_log + (f" run:{shlex.quote(args.run)}" if args.run else "")
+        sys.exit(search_logs(query, args.limit))
+
+    if args.benchmark_http_engine or args.mock_server:
+        try:
+            import augd_mock  # Development tool, not part of the built application
+        except ImportError:
+            print("--mock-server and --benchmark-http-engine need augd_mock.py from the source checkout.", file=sys.stderr)
+            sys.exit(exit_codes["usage"])
+
+    if args.benchmark_http_engine:
+        sys.exit(augd_mock.benchmark_http_engine(args.mock_companies, args.mock_latency_ms, load_settings(),
+                                                 HttpEngine, WorkQueueRunner, args.workers))
+
+    if args.headless:
+        sys.exit(run_headless(args, qt_args))
+
+    if args.mock_server:
+        server = augd_mock.start_mock_server(args.port, args.mock_companies, args.mock_latency_ms)
+        print(f"Mock control panel at http://127.0.0.1:{server.server_port}/ (set start_url to use it). Ctrl+C to stop.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    app = QApplication(sys.argv[:1] + qt_args)  # Create the application
     window = MainWindow()         # Instantiate the main window
     window.show()                 # Show the main window
     sys.exit(app.exec_())         # Run the application event loop
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # In the frozen exe, a spawned worker runs its target here instead of main()
     main()
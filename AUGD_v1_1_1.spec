@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['augd_mock'],  # Development tool (--mock-server, --benchmark-http-engine)
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,347 @@
+"""
+Stand-in for the control panel, used to exercise the script, the API
+execution mode and the HTTP engine locally. It imitates the User Groups page
+markup and the list/delete/users/add-member endpoints behind it.
+
+Development tool only: it is not part of the built application. The script
+imports it for --mock-server and --benchmark-http-engine, and the tests use
+it directly.
+"""
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Markup of the stand-in User Groups page
+mock_control_panel_html = """<!DOCTYPE html>
+<html>
+<head><title>AUGD Mock Control Panel</title></head>
+<body>
+<div id="header_nav"><div><div class="row top-menu"><div><ul>
+  <li class="profile"><div><div class="media-body dropdown">
+    <a href="#" id="navToggle">Account</a>
+    <ul id="navMenu" style="display: none">
+      <li><a href="#">Dashboard</a></li>
+      <li><a href="#">Users</a></li>
+      <li><a href="#">Devices</a></li>
+      <li><a href="#">Queues</a></li>
+      <li><a href="#" id="userGroupsLink">User Groups</a></li>
+    </ul>
+  </div></div></li>
+</ul></div></div></div></div>
+<div id="userGroupsPage" style="display: none">
+  <select id="company_data"></select>
+  <div id="groups"></div>
+</div>
+<div id="availableUsers" class="modal" style="display: none">
+  <form id="availableUsersForm">
+    <div class="modal-header"><button type="button" class="close" data-dismiss="modal">&times;</button></div>
+    <div class="modal-body"><ul></ul></div>
+    <div class="modal-footer"><button type="button" class="btn btn-primary">Add Members</button></div>
+  </form>
+</div>
+<script>
+var currentGroups = [];
+var modalGroupId = null;
+
+function request(method, url, body, done) {
+    var spinner = document.createElement('div');
+    spinner.className = 'spinner';
+    document.body.appendChild(spinner);
+    var xhr = new XMLHttpRequest();
+    xhr.open(method, url);
+    xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+    if (body !== null) {
+        xhr.setRequestHeader('Content-Type', 'application/json');
+    }
+    xhr.onloadend = function () {
+        spinner.remove();
+        done(xhr.status === 200 ? JSON.parse(xhr.responseText) : null);
+    };
+    xhr.send(body);
+}
+
+function loadGroups() {
+    var company = document.getElementById('company_data').value;
+    request('GET', '/api/companies/' + company + '/groups', null, function (data) {
+        currentGroups = data ? data.groups : [];
+        renderGroups();
+    });
+}
+
+function renderGroups() {
+    var container = document.getElementById('groups');
+    container.innerHTML = '';
+    currentGroups.forEach(function (group, i) {
+        var panel = document.createElement('div');
+        panel.className = 'panel';
+        panel.id = 'groupID' + i;
+        panel.setAttribute('data-group-id', group.id);
+        panel.innerHTML =
+            '<div class="panel-heading"><h4><a href="#">' + group.name + '</a></h4></div>' +
+            '<div class="panel-collapse collapse" id="collapse' + i + '"><div><div>' +
+            '<label id="groupNameLabel' + i + '">' + group.name + '</label>' +
+            '<input id="memberCounter' + i + '" value="' + group.member_count + '">' +
+            '<span class="indicator glyphicon glyphicon-plus" data-original-title="Add Member"></span>' +
+            '<div class="col-lg-12 pull-right"><button type="button">Delete</button></div>' +
+            '</div></div></div>';
+        panel.querySelector('.panel-heading a').onclick = function (event) {
+            event.preventDefault();
+            request('GET', '/api/groups/' + group.id, null, function () {
+                document.getElementById('collapse' + i).classList.toggle('in');
+            });
+        };
+        panel.querySelector('.pull-right button').onclick = function () {
+            var confirm = document.createElement('div');
+            confirm.id = 'deleteModal';
+            confirm.innerHTML = '<button type="button" id="deleteGroup">Confirm</button>';
+            document.body.appendChild(confirm);
+            document.getElementById('deleteGroup').onclick = function () {
+                confirm.remove();
+                request('POST', '/api/groups/' + group.id + '/delete', '{}', loadGroups);
+            };
+        };
+        panel.querySelector('.glyphicon-plus').onclick = function () {
+            modalGroupId = group.id;
+            request('GET', '/api/groups/' + group.id + '/available_users', null, function (data) {
+                var list = document.querySelector('#availableUsersForm .modal-body ul');
+                list.innerHTML = '';
+                data.users.forEach(function (user) {
+                    list.insertAdjacentHTML('beforeend',
+                        '<li><label><input type="checkbox" value="' + user.id + '"> ' + user.name + '</label></li>');
+                });
+                document.getElementById('availableUsers').style.display = 'block';
+            });
+        };
+        container.appendChild(panel);
+    });
+}
+
+document.getElementById('navToggle').onclick = function (event) {
+    event.preventDefault();
+    document.getElementById('navMenu').style.display = 'block';
+};
+document.getElementById('userGroupsLink').onclick = function (event) {
+    event.preventDefault();
+    request('GET', '/api/companies', null, function (data) {
+        var select = document.getElementById('company_data');
+        data.companies.forEach(function (company) {
+            select.insertAdjacentHTML('beforeend', '<option value="' + company.id + '">' + company.name + '</option>');
+        });
+        document.getElementById('userGroupsPage').style.display = 'block';
+        loadGroups();
+    });
+};
+document.getElementById('company_data').onchange = loadGroups;
+document.querySelector('#availableUsersForm .close').onclick = function () {
+    document.getElementById('availableUsers').style.display = 'none';
+};
+document.querySelector('#availableUsersForm .btn-primary').onclick = function () {
+    var checked = document.querySelectorAll('#availableUsersForm input[type=checkbox]:checked');
+    var members = Array.prototype.map.call(checked, function (box) { return Number(box.value); });
+    request('POST', '/api/groups/' + modalGroupId + '/members', JSON.stringify({ members: members }), function () {
+        document.getElementById('availableUsers').style.display = 'none';
+        loadGroups();
+    });
+};
+</script>
+</body>
+</html>
+"""
+
+class MockControlPanel:
+    """In-memory companies, groups and users served by the mock server."""
+    group_names = ["Sales", "Support", "Billing", "Night Shift", "Managers", "Front Desk", "Overflow"]
+
+    def __init__(self, company_count=20, latency_ms=0, seed=1):
+        rng = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.request_counts = {}
+        self.companies = {}
+        self.groups = {}
+        next_group_id = 1000
+        next_user_id = 5000
+        for c in range(company_count):
+            company_id = str(100 + c)
+            users = {}
+            for _ in range(rng.randint(3, 30)):
+                users[next_user_id] = f"User {next_user_id}"
+                next_user_id += 1
+            group_ids = []
+            names = rng.sample(self.group_names, rng.randint(0, 5)) + ["everyone"] * rng.randint(0, 3)
+            rng.shuffle(names)
+            for name in names:
+                members = set(rng.sample(sorted(users), rng.randint(0, min(3, len(users)))))
+                self.groups[str(next_group_id)] = {"company": company_id, "name": name, "members": members}
+                group_ids.append(str(next_group_id))
+                next_group_id += 1
+            self.companies[company_id] = {"name": f"Company {c + 1:04d}", "users": users, "groups": group_ids}
+
+    def count(self, route):
+        with self.lock:
+            self.request_counts[route] = self.request_counts.get(route, 0) + 1
+
+    def list_groups(self, company_id):
+        company = self.companies.get(company_id)
+        if company is None:
+            return None
+        return {"groups": [
+            {"id": group_id, "name": self.groups[group_id]["name"], "member_count": len(self.groups[group_id]["members"])}
+            for group_id in company["groups"]
+        ]}
+
+    def available_users(self, group_id):
+        group = self.groups.get(group_id)
+        if group is None:
+            return None
+        users = self.companies[group["company"]]["users"]
+        return {"users": [{"id": user_id, "name": name} for user_id, name in users.items() if user_id not in group["members"]]}
+
+    def delete_group(self, group_id):
+        with self.lock:
+            group = self.groups.pop(group_id, None)
+            if group is None:
+                return None
+            self.companies[group["company"]]["groups"].remove(group_id)
+        return {"ok": True}
+
+    def add_members(self, group_id, members):
+        with self.lock:
+            group = self.groups.get(group_id)
+            if group is None:
+                return None
+            group["members"].update(int(member) for member in members)
+        return {"ok": True, "member_count": len(group["members"])}
+
+class MockControlPanelHandler(BaseHTTPRequestHandler):
+    """Routes requests to the MockControlPanel attached to the server."""
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real control panel
+
+    def log_message(self, format, *args):
+        logging.debug("Mock server: " + format % args)
+
+    def send_json(self, data):
+        if data is None:
+            self.send_error(404)
+            return
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        panel = self.server.panel
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == [""]:
+            body = mock_control_panel_html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        time.sleep(panel.latency_ms / 1000)
+        if parts == ["api", "companies"]:
+            panel.count("companies")
+            self.send_json({"companies": [
+                {"id": company_id, "name": company["name"]} for company_id, company in panel.companies.items()
+            ]})
+        elif len(parts) == 4 and parts[:2] == ["api", "companies"] and parts[3] == "groups":
+            panel.count("list")
+            self.send_json(panel.list_groups(parts[2]))
+        elif len(parts) == 3 and parts[:2] == ["api", "groups"]:
+            panel.count("group")
+            self.send_json({"ok": parts[2] in panel.groups})
+        elif len(parts) == 4 and parts[:2] == ["api", "groups"] and parts[3] == "available_users":
+            panel.count("users")
+            self.send_json(panel.available_users(parts[2]))
+        elif parts == ["api", "stats"]:
+            self.send_json(panel.request_counts)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        panel = self.server.panel
+        parts = self.path.split("?")[0].strip("/").split("/")
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400)
+            return
+        time.sleep(panel.latency_ms / 1000)
+        if len(parts) == 4 and parts[:2] == ["api", "groups"] and parts[3] == "delete":
+            panel.count("delete")
+            self.send_json(panel.delete_group(parts[2]))
+        elif len(parts) == 4 and parts[:2] == ["api", "groups"] and parts[3] == "members":
+            panel.count("add_members")
+            self.send_json(panel.add_members(parts[2], payload.get("members", [])))
+        else:
+            self.send_error(404)
+
+def start_mock_server(port=8765, company_count=20, latency_ms=0):
+    """Start the mock control panel in a background thread and return the server."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockControlPanelHandler)
+    server.daemon_threads = True
+    server.panel = MockControlPanel(company_count, latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Mock control panel serving {company_count} companies at http://127.0.0.1:{server.server_port}/")
+    return server
+
+def mock_server_endpoints(base_url):
+    """Endpoint templates for the mock control panel, as the API mode would learn them."""
+    return {
+        "list": {"method": "GET", "url": base_url + "/api/companies/{company}/groups", "body": None, "headers": {}},
+        "delete": {"method": "POST", "url": base_url + "/api/groups/{group}/delete", "body": "{}",
+                   "headers": {"Content-Type": "application/json"}},
+        "users": {"method": "GET", "url": base_url + "/api/groups/{group}/available_users", "body": None, "headers": {}},
+        "add_members": {"method": "POST", "url": base_url + "/api/groups/{group}/members",
+                        "body": '{"members": "{members}"}', "headers": {"Content-Type": "application/json"},
+                        "members": "json", "membersNumeric": True},
+    }
+
+def benchmark_http_engine(company_count, latency_ms, settings, engine_class, runner_class, workers=1):
+    """
+    Run the HTTP engine against an in-process mock server and print its
+    throughput. With workers above 1 the companies go through the
+    multi-process work queue. The engine and runner classes come from the
+    running script, so it is not imported a second time.
+    """
+    server = start_mock_server(0, company_count, latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    panel = server.panel
+    companies = [(company_id, company["name"]) for company_id, company in panel.companies.items()]
+    empty_before = sum(1 for group in panel.groups.values() if not group["members"])
+    if workers > 1:
+        settings["work_queue"]["workers"] = workers
+        runner = runner_class(mock_server_endpoints(base_url), [], settings)
+        summary = runner.run(f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}", companies)
+    else:
+        engine = engine_class(mock_server_endpoints(base_url), [], settings)
+        summary = asyncio.run(engine.run(companies))
+    server.shutdown()
+
+    leftover = [group for group in panel.groups.values() if not group["members"]]
+    everyone_per_company = {}
+    for group in panel.groups.values():
+        if group["name"] == "everyone":
+            everyone_per_company[group["company"]] = everyone_per_company.get(group["company"], 0) + 1
+    print(f"Companies: {summary['companies']}, groups inspected: {summary['inspected']}, "
+          f"deleted: {summary['deleted']} (empty before: {empty_before}), errors: {summary['errors']}")
+    print(f"Requests: {summary['requests']} in {summary['durationMs'] / 1000:.2f} s - "
+          f"{summary['requestsPerSec']} requests/sec, {summary['groupsPerSec']} groups/sec")
+    for worker, stats in summary.get("workers", {}).items():
+        print(f"  {worker}: {stats['companies']} companies, {stats['groups']} groups, "
+              f"{stats['requests']} requests, {stats['companiesPerSec']} companies/sec, {stats['requeued']} requeued")
+    print(f"Mock server request counts: {panel.request_counts}")
+    consistent = not leftover and all(count <= 1 for count in everyone_per_company.values())
+    print("Result: " + ("all empty groups removed, at most one 'everyone' group per company"
+                        if consistent else f"{len(leftover)} empty groups left"))
+    return 0 if consistent and not summary["errors"] else 1
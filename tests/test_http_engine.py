@@ -0,0 +1,199 @@
+"""
+Tests for the group listing parser, the cleanup rules, endpoint templates,
+the company fingerprint and the HTTP engine (against the mock control panel).
+
+Run from the repository root with:  python -m unittest discover tests
+"""
+import os
+import sys
+import copy
+import json
+import shutil
+import asyncio
+import unittest
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AUGD_v1_1_1 as augd
+import augd_mock
+
+fields = augd.default_settings["api_fields"]
+
+def listing(*groups):
+    return {"groups": [dict(group) for group in groups]}
+
+class ParseGroupListingTest(unittest.TestCase):
+    def test_member_count_field(self):
+        groups = augd.parse_group_listing(listing({"id": 7, "name": " Sales ", "member_count": "3"}), fields)
+        self.assertEqual(groups, [{"id": "7", "name": "Sales", "members": 3}])
+        self.assertTrue(augd.listing_usable(groups))
+
+    def test_member_list(self):
+        groups = augd.parse_group_listing(listing({"group_id": "a1", "title": "everyone", "members": [1, 2]}), fields)
+        self.assertEqual(groups, [{"id": "a1", "name": "everyone", "members": 2}])
+
+    def test_nested_records(self):
+        data = {"data": {"page": 1, "items": [{"id": 1, "name": "Support", "memberCount": 0}]}}
+        self.assertEqual(augd.parse_group_listing(data, fields), [{"id": "1", "name": "Support", "members": 0}])
+
+    def test_empty_listing(self):
+        groups = augd.parse_group_listing({"groups": []}, fields)
+        self.assertEqual(groups, [])
+        self.assertTrue(augd.listing_usable(groups))
+
+    def test_no_records(self):
+        groups = augd.parse_group_listing({"status": "ok"}, fields)
+        self.assertIsNone(groups)
+        self.assertFalse(augd.listing_usable(groups))
+
+    def test_missing_member_count_is_not_zero(self):
+        groups = augd.parse_group_listing(listing({"id": 1, "name": "Sales", "users_total": 4}), fields)
+        self.assertIsNone(groups[0]["members"])
+        self.assertFalse(augd.listing_usable(groups))
+
+    def test_unreadable_member_count(self):
+        for value in ("many", None, True, {"count": 2}):
+            groups = augd.parse_group_listing(listing({"id": 1, "name": "Sales", "member_count": value}), fields)
+            self.assertFalse(augd.listing_usable(groups), value)
+
+    def test_missing_id(self):
+        groups = augd.parse_group_listing(listing({"name": "Sales", "member_count": 0}), fields)
+        self.assertIsNone(groups[0]["id"])
+        self.assertFalse(augd.listing_usable(groups))
+
+class PlanCompanyActionsTest(unittest.TestCase):
+    def group(self, group_id, name, members):
+        return {"id": group_id, "name": name, "members": members}
+
+    def test_rules(self):
+        groups = [
+            self.group("1", "everyone", 0),
+            self.group("2", "everyone", 5),
+            self.group("3", "everyone", 2),
+            self.group("4", "Sales", 0),
+            self.group("5", "Support", 3),
+        ]
+        kept, deletions = augd.plan_company_actions(groups)
+        self.assertEqual(kept["id"], "2")
+        self.assertEqual([group["id"] for group in deletions], ["1", "3", "4"])
+
+    def test_no_populated_everyone(self):
+        kept, deletions = augd.plan_company_actions([self.group("1", "everyone", 0), self.group("2", "Sales", 1)])
+        self.assertIsNone(kept)
+        self.assertEqual([group["id"] for group in deletions], ["1"])
+
+    def test_compliant_company(self):
+        kept, deletions = augd.plan_company_actions([self.group("1", "everyone", 4), self.group("2", "Sales", 1)])
+        self.assertEqual(kept["id"], "1")
+        self.assertEqual(deletions, [])
+
+class FillTemplateTest(unittest.TestCase):
+    def test_url_and_body(self):
+        template = {"url": "https://cp.example/api/{company}/groups/{group}", "body": '{"company": "{company}"}'}
+        url, body = augd.fill_template(template, {"company": "a b/c", "group": "12"})
+        self.assertEqual(url, "https://cp.example/api/a%20b%2Fc/groups/12")
+        self.assertEqual(body, '{"company": "a b/c"}')
+
+    def test_no_body(self):
+        url, body = augd.fill_template({"url": "/api/{company}", "body": None}, {"company": "9"})
+        self.assertEqual((url, body), ("/api/9", None))
+
+    def test_json_members(self):
+        template = {"url": "/m", "body": '{"members": "{members}"}', "members": "json", "membersNumeric": True}
+        _, body = augd.fill_template(template, {"members": ["5", "6"]})
+        self.assertEqual(json.loads(body), {"members": [5, 6]})
+        template["membersNumeric"] = False
+        _, body = augd.fill_template(template, {"members": [5, 6]})
+        self.assertEqual(json.loads(body), {"members": ["5", "6"]})
+
+    def test_form_members(self):
+        template = {"url": "/m", "body": "group={group}&{members}", "members": "form", "membersKey": "users[]"}
+        _, body = augd.fill_template(template, {"group": "3", "members": ["1", "2"]})
+        self.assertEqual(body, "group=3&users%5B%5D=1&users%5B%5D=2")
+
+def injected_function(name):
+    """Source of a top-level function in the injected script."""
+    source = open(augd.__file__, encoding="utf-8").read()
+    start = source.index(f"\nfunction {name}(") + 1
+    return source[start:source.index("\n}\n", start) + 2]
+
+class FingerprintParityTest(unittest.TestCase):
+    cases = [
+        [],
+        [{"name": "Sales", "members": 0}],
+        [{"name": "everyone", "members": 12}, {"name": "Support", "members": 3}, {"name": "everyone", "members": 0}],
+        [{"name": "Zürich", "members": 1}, {"name": "zebra", "members": 2}, {"name": "Ärzte", "members": 0}],
+        [{"name": "Night \U0001F319", "members": 4}, {"name": "Night Ａ", "members": 5}, {"name": 'Quote "x"', "members": 1}],
+    ]
+
+    @unittest.skipIf(shutil.which("node") is None, "node is not installed")
+    def test_python_matches_javascript(self):
+        program = injected_function("groupFingerprint") + (
+            f"console.log(JSON.stringify({json.dumps(self.cases)}.map(groupFingerprint)));"
+        )
+        result = subprocess.run(["node", "-e", program], capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(result.stdout), [augd.group_fingerprint(groups) for groups in self.cases])
+
+    def test_order_does_not_matter(self):
+        groups = self.cases[2]
+        self.assertEqual(augd.group_fingerprint(groups), augd.group_fingerprint(list(reversed(groups))))
+
+    def test_everyone_member_count_is_not_part_of_it(self):
+        self.assertEqual(augd.group_fingerprint([{"name": "everyone", "members": 3}]),
+                         augd.group_fingerprint([{"name": "everyone", "members": 9}]))
+        self.assertNotEqual(augd.group_fingerprint([{"name": "Sales", "members": 3}]),
+                            augd.group_fingerprint([{"name": "Sales", "members": 9}]))
+
+class HttpEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = augd_mock.start_mock_server(0, company_count=15)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.panel = self.server.panel
+        self.endpoints = augd_mock.mock_server_endpoints(f"http://127.0.0.1:{self.server.server_port}")
+        self.settings = copy.deepcopy(augd.default_settings)
+        self.companies = [(company_id, company["name"]) for company_id, company in self.panel.companies.items()]
+        self.events = []
+
+    def run_engine(self, company_cache=None):
+        self.events = []
+        engine = augd.HttpEngine(self.endpoints, [], self.settings, company_cache=company_cache,
+                                 emit=lambda event_type, event: self.events.append((event_type, event)))
+        return asyncio.run(engine.run(self.companies))
+
+    def test_cleans_up_every_company(self):
+        empty_before = sum(1 for group in self.panel.groups.values() if not group["members"])
+        summary = self.run_engine()
+        self.assertEqual(summary["status"], "completed")
+        self.assertEqual(summary["companies"], len(self.companies))
+        self.assertEqual(summary["errors"], 0)
+        self.assertGreaterEqual(summary["deleted"], empty_before)
+        self.assertFalse([group for group in self.panel.groups.values() if not group["members"]])
+        for company_id, company in self.panel.companies.items():
+            everyone = [group_id for group_id in company["groups"] if self.panel.groups[group_id]["name"] == "everyone"]
+            self.assertLessEqual(len(everyone), 1, company_id)
+            if everyone:  # Every user was added to the kept group
+                self.assertEqual(self.panel.groups[everyone[0]]["members"], set(company["users"]))
+
+    def test_cache_hits_skip_the_company(self):
+        self.run_engine()
+        cache = {event["value"]: event["fingerprint"] for event_type, event in self.events if event_type == "company_finished"}
+        counts = dict(self.panel.request_counts)
+        summary = self.run_engine(company_cache=cache)
+        self.assertEqual(summary["cacheHits"], len(self.companies))
+        for route in ("delete", "users", "add_members"):  # Not even topped up
+            self.assertEqual(self.panel.request_counts.get(route, 0), counts.get(route, 0), route)
+        self.assertTrue(all(event["cacheHit"] for event_type, event in self.events if event_type == "company_finished"))
+
+    def test_unusable_listing_deletes_nothing(self):
+        self.settings["api_fields"] = dict(fields, members=["users_total"])  # Not in the mock's listing
+        groups_before = set(self.panel.groups)
+        summary = self.run_engine()
+        self.assertEqual(summary["companies"], 0)
+        self.assertEqual(summary["errors"], len(self.companies))
+        self.assertEqual(set(self.panel.groups), groups_before)
+        self.assertNotIn("delete", self.panel.request_counts)
+
+if __name__ == "__main__":
+    unittest.main()
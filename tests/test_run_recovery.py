@@ -0,0 +1,127 @@
+"""
+Tests for recovering from interruptions: the work queue requeueing the
+companies of a crashed worker, and resuming a run from the run journal.
+
+Run from the repository root with:  python -m unittest discover tests
+"""
+import os
+import sys
+import copy
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import AUGD_v1_1_1 as augd
+
+def crashing_worker(queue_path, run_id, worker, endpoints, cookies, settings, events, stop_event, company_cache,
+                    session_headers):
+    """Stands in for work_queue_worker: finishes every company but 'poison', which kills the worker."""
+    work = augd.WorkQueue(queue_path)
+    while True:
+        claimed = work.claim(run_id, worker)
+        if claimed is None:
+            return
+        index, total, value, name = claimed
+        if value == "poison":
+            events.close()
+            events.join_thread()  # Deliver the events already sent before dying
+            os._exit(3)
+        work.finish(run_id, value, True)
+        events.put({"type": "company_finished", "worker": worker, "index": index, "company": name, "value": value,
+                    "inspected": 1, "deleted": 0, "durationMs": 0})
+
+class CrashingRunner(augd.WorkQueueRunner):
+    def start_worker(self, run_id, worker, events, worker_stop):
+        process = self.context.Process(
+            target=crashing_worker, daemon=True,
+            args=(self.queue_path, run_id, worker, self.endpoints, self.cookies, self.settings, events, worker_stop,
+                  self.company_cache, self.session_headers)
+        )
+        process.start()
+        return process
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.queue_path = os.path.join(folder.name, "work_queue.db")
+
+    def test_requeue_until_max_attempts(self):
+        work = augd.WorkQueue(self.queue_path)
+        self.addCleanup(work.close)
+        work.fill("run", [("a", "A")])
+        for attempt in (1, 2):
+            self.assertEqual(work.claim("run", "worker-1")[2], "a")
+            self.assertEqual(work.requeue_worker("run", "worker-1", max_attempts=3), (["A"], []), attempt)
+        work.claim("run", "worker-1")
+        self.assertEqual(work.requeue_worker("run", "worker-1", max_attempts=3), ([], ["A"]))
+        self.assertIsNone(work.claim("run", "worker-1"))
+        self.assertEqual(work.pending_count("run"), 0)
+
+    def test_requeue_leaves_other_workers_alone(self):
+        work = augd.WorkQueue(self.queue_path)
+        self.addCleanup(work.close)
+        work.fill("run", [("a", "A"), ("b", "B")])
+        work.claim("run", "worker-1")
+        work.claim("run", "worker-2")
+        self.assertEqual(work.requeue_worker("run", "worker-1", max_attempts=3), (["A"], []))
+        self.assertEqual(work.claim("run", "worker-3")[2], "a")
+        self.assertIsNone(work.claim("run", "worker-3"))  # b is still worker-2's
+
+    def test_runner_replaces_crashed_workers(self):
+        settings = copy.deepcopy(augd.default_settings)
+        settings["work_queue"].update(workers=1, max_attempts=2)
+        events = []
+        runner = CrashingRunner({"list": {"url": "/list"}, "delete": {"url": "/delete"}}, [], settings,
+                                emit=lambda event_type, event: events.append((event_type, event)),
+                                queue_path=self.queue_path)
+        summary = runner.run("run", [("a", "A"), ("poison", "Poison"), ("b", "B")])
+        finished = [event["value"] for event_type, event in events if event_type == "company_finished"]
+        errors = [event["message"] for event_type, event in events if event_type == "error"]
+        self.assertEqual(sorted(finished), ["a", "b"])
+        self.assertEqual(len(errors), 2)  # One per crash: max_attempts counts the first attempt too
+        self.assertIn("gave up on Poison", errors[-1])
+        self.assertEqual(summary["workers"]["worker-1"]["requeued"], 1)
+        work = augd.WorkQueue(self.queue_path)
+        self.addCleanup(work.close)
+        self.assertEqual(work.db.execute("SELECT status, attempts FROM work WHERE company_value = 'poison'").fetchone(),
+                         ("failed", 2))
+
+class RunJournalTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.journal = augd.RunJournal(os.path.join(folder.name, "run_journal.sqlite"))
+        self.addCleanup(self.journal.connection.close)
+
+    def interrupted_run(self):
+        run_id = self.journal.start_run()
+        for value in ("a", "b", "c"):
+            self.journal.company_started(run_id, value, value.upper())
+        self.journal.company_finished(run_id, "a", 4, 1)
+        self.journal.company_finished(run_id, "c", 2, 0)
+        return run_id
+
+    def test_resume_skips_finished_companies(self):
+        run_id = self.interrupted_run()
+        self.journal.finish_run(run_id, "stopped")
+        self.assertEqual(self.journal.resumable_run(), run_id)
+        self.assertEqual(sorted(self.journal.resume_run(run_id)), ["a", "c"])
+
+    def test_crashed_run_is_resumable(self):
+        run_id = self.interrupted_run()  # Still 'running': the application never recorded an end
+        self.assertEqual(self.journal.resumable_run(), run_id)
+
+    def test_completed_run_is_not_resumable(self):
+        run_id = self.interrupted_run()
+        self.journal.finish_run(run_id, "completed")
+        self.assertIsNone(self.journal.resumable_run())
+
+    def test_started_company_is_not_finished(self):
+        run_id = self.interrupted_run()
+        self.journal.company_started(run_id, "a", "A")  # Retried by a resumed run
+        self.assertEqual(self.journal.resume_run(run_id), ["c"])
+
+if __name__ == "__main__":
+    unittest.main()